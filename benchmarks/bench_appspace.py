@@ -0,0 +1,351 @@
+"""
+Microbenchmarks for every AppSpace operation.
+
+Measures ops/sec and latency percentiles for each method, across payload
+sizes, one call at a time and pipelined in batches. Also times the pure
+Python paths (key building, codecs) that every call goes through.
+
+    python benchmarks/bench_appspace.py
+    python benchmarks/bench_appspace.py --json results.json
+    python benchmarks/bench_appspace.py --compare before.json
+    python benchmarks/bench_appspace.py --backend memory
+
+Run it on two commits with --json and compare the files (or pass the
+older one to --compare) to spot regressions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Add parent directory to path to import easy_redis
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import redis
+
+from easy_redis import EasyRedis, MetricsCollector, __version__
+
+APP_NAME = "bench_appspace"
+NAMES = [f"key_{i}" for i in range(100)]
+
+
+# -------- Cases --------
+#
+# Each case is (name, setup, call, sized):
+#   setup(app, payload) prepares the keys the call reads (or None)
+#   call(target, payload) runs the operation once; target is the app, or
+#       the Batch when pipelined, so every batchable method runs both ways
+#   sized: True if the payload size matters to the operation
+
+
+def _save(app, payload):
+    app.save("value", payload, expire_seconds=3600)
+
+
+def _save_dict(app, payload):
+    app.save_dict("dict", {"a": payload, "b": payload, "n": 1})
+
+
+def _fill_list(app, payload):
+    app.clear_list("list")
+    app.add_to_list("list", *[payload] * 100)
+
+
+def _save_many(app, payload):
+    app.save_many({name: payload for name in NAMES})
+
+
+def _push_pop(target, payload):
+    # Keeps the list the same length however long the case runs
+    target.add_to_list("queue", payload)
+    target.pop_from_list("queue")
+
+
+CASES = [
+    ("save", None, lambda t, p: t.save("value", p), True),
+    ("save_expire", None, lambda t, p: t.save("value", p, expire_seconds=60), True),
+    ("load", _save, lambda t, p: t.load("value"), True),
+    ("load_missing", None, lambda t, p: t.load("missing"), False),
+    ("exists", _save, lambda t, p: t.exists("value"), False),
+    ("delete", None, lambda t, p: t.delete("missing"), False),
+    ("incr", None, lambda t, p: t.incr("counter"), False),
+    ("incr_expire", None, lambda t, p: t.incr("counter", expire_seconds=60), False),
+    ("incr_by", None, lambda t, p: t.incr_by("counter", 5), False),
+    ("save_dict", None, lambda t, p: t.save_dict("dict", {"a": p, "b": p}), True),
+    ("load_dict", _save_dict, lambda t, p: t.load_dict("dict"), True),
+    ("load_fields", _save_dict, lambda t, p: t.load_fields("dict", "a", "n"), True),
+    ("update_dict", _save_dict, lambda t, p: t.update_dict("dict", a=p), True),
+    ("dict_size", _save_dict, lambda t, p: t.dict_size("dict"), False),
+    ("incr_field", _save_dict, lambda t, p: t.incr_field("dict", "n"), False),
+    ("add_pop_list", None, _push_pop, True),
+    ("get_list_10", _fill_list, lambda t, p: t.get_list("list", 0, 9), True),
+    ("list_length", _fill_list, lambda t, p: t.list_length("list"), False),
+    ("get_ttl", _save, lambda t, p: t.get_ttl("value"), False),
+    ("set_expire", _save, lambda t, p: t.set_expire("value", 3600), False),
+    ("load_many_100", _save_many, lambda t, p: t.load_many(NAMES), True),
+    (
+        "save_many_100",
+        None,
+        lambda t, p: t.save_many({name: p for name in NAMES}),
+        True,
+    ),
+    ("exists_many_100", _save_many, lambda t, p: t.exists_many(NAMES), False),
+]
+
+
+def payload_of(size):
+    """A string value of about size bytes."""
+    return "x" * size
+
+
+def batchable(app, call, payload):
+    """Whether the call only uses methods that can be queued in a batch."""
+    try:
+        with app.batch() as b:
+            call(b, payload)
+    except AttributeError:
+        return False
+    return True
+
+
+# -------- Measuring --------
+
+
+def percentile(ordered, fraction):
+    """Pick a percentile from an already sorted list."""
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
+
+
+def measure(fn, seconds, ops_per_call=1):
+    """
+    Call fn repeatedly for about the given time.
+
+    Returns ops/sec plus latency percentiles of one call in microseconds.
+    """
+    fn()  # warm up (connections, script loading, first allocation)
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    deadline = start + int(seconds * 1e9)
+    now = start
+    while now < deadline:
+        before = clock()
+        fn()
+        now = clock()
+        latencies.append(now - before)
+    elapsed = (now - start) / 1e9
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "ops_per_sec": round(len(latencies) * ops_per_call / elapsed, 1),
+        "latency_us": {
+            "p50": round(percentile(latencies, 0.50) / 1000, 2),
+            "p90": round(percentile(latencies, 0.90) / 1000, 2),
+            "p99": round(percentile(latencies, 0.99) / 1000, 2),
+            "max": round(latencies[-1] / 1000, 2),
+        },
+    }
+
+
+def bench_local(app, sizes, seconds, report):
+    """Time the pure Python paths every Redis call goes through."""
+    report("local", "_key", None, None, measure(lambda: app._key("user_42"), seconds))
+    report(
+        "local",
+        "_keys_100",
+        None,
+        None,
+        measure(lambda: app._keys(NAMES), seconds, ops_per_call=100),
+    )
+    codec = app.codec
+    if codec is None:
+        return
+    for size in sizes:
+        payload = payload_of(size)
+        data = codec.encode(payload)
+        report(
+            "local",
+            "encode",
+            size,
+            None,
+            measure(lambda: codec.encode(payload), seconds),
+        )
+        report(
+            "local", "decode", size, None, measure(lambda: codec.decode(data), seconds)
+        )
+
+
+def bench_app(app, cases, sizes, batch_sizes, seconds, report):
+    """Run every case one call at a time, then pipelined in batches."""
+    for name, setup, call, sized in cases:
+        for size in sizes if sized else sizes[:1]:
+            payload = payload_of(size)
+            shown_size = size if sized else None
+            app.delete_all()
+            if setup:
+                setup(app, payload)
+            report(
+                "single",
+                name,
+                shown_size,
+                None,
+                measure(lambda: call(app, payload), seconds),
+            )
+            if not batchable(app, call, payload):
+                continue
+            for batch_size in batch_sizes:
+
+                def run_batch():
+                    with app.batch() as b:
+                        for _ in range(batch_size):
+                            call(b, payload)
+
+                report(
+                    "pipeline",
+                    name,
+                    shown_size,
+                    batch_size,
+                    measure(run_batch, seconds, ops_per_call=batch_size),
+                )
+    app.delete_all()
+
+
+# -------- Setup and output --------
+
+
+def make_app(args):
+    """Build the AppSpace under test, on Redis or in memory."""
+    hooks = [MetricsCollector()] if args.metrics else None
+    db = EasyRedis(host=args.host, port=args.port, backend=args.backend)
+    db.client.ping()
+    app = db.app(APP_NAME, codec=args.codec, hooks=hooks)
+    return app, db.client.info("server")
+
+
+def git_commit():
+    """The current commit of the checkout, if there is one."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_id(result):
+    """Identify a result so runs can be matched up by --compare."""
+    return (result["mode"], result["op"], result["payload_bytes"], result["batch"])
+
+
+def describe(result):
+    size = result["payload_bytes"]
+    batch = result["batch"]
+    label = result["op"]
+    if size is not None:
+        label += f" {size}B"
+    if batch is not None:
+        label += f" x{batch}"
+    return f"{result['mode']:<8} {label:<28}"
+
+
+def print_result(result, baseline=None, out=sys.stdout):
+    latency = result["latency_us"]
+    line = (
+        f"  {describe(result)} {result['ops_per_sec']:>12,.0f} ops/s"
+        f"  p50 {latency['p50']:>9,.1f}us  p99 {latency['p99']:>9,.1f}us"
+    )
+    if baseline is not None:
+        change = result["ops_per_sec"] / baseline["ops_per_sec"] - 1
+        line += f"  {change:+7.1%}"
+    print(line, file=out)
+
+
+def parse_ints(text):
+    return [int(part) for part in text.split(",") if part]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=0.3, help="time per case")
+    parser.add_argument(
+        "--sizes", type=parse_ints, default=[16, 1024, 65536], help="payload bytes"
+    )
+    parser.add_argument(
+        "--batch-sizes", type=parse_ints, default=[10, 100], help="ops per pipeline"
+    )
+    parser.add_argument("--codec", help="app codec, e.g. json (default: none)")
+    parser.add_argument("--only", help="run only ops whose name contains this")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--backend", choices=["redis", "memory"], default="redis")
+    parser.add_argument(
+        "--metrics", action="store_true", help="attach a MetricsCollector"
+    )
+    parser.add_argument("--json", metavar="PATH", help="write results ('-': stdout)")
+    parser.add_argument("--compare", metavar="PATH", help="earlier --json output")
+    args = parser.parse_args()
+
+    try:
+        app, server = make_app(args)
+    except redis.ConnectionError:
+        sys.exit(
+            f"Redis not reachable on {args.host}:{args.port} (try --backend memory)"
+        )
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {case_id(r): r for r in json.load(f)["results"]}
+
+    # With JSON on stdout, keep the table on stderr
+    out = sys.stderr if args.json == "-" else sys.stdout
+    results = []
+
+    def report(mode, op, size, batch, stats):
+        result = {"mode": mode, "op": op, "payload_bytes": size, "batch": batch}
+        result.update(stats)
+        results.append(result)
+        print_result(result, baseline.get(case_id(result)), out)
+
+    cases = [case for case in CASES if not args.only or args.only in case[0]]
+    print(f"AppSpace microbenchmarks ({args.seconds}s per case)", file=out)
+    bench_local(app, args.sizes, args.seconds, report)
+    bench_app(app, cases, args.sizes, args.batch_sizes, args.seconds, report)
+
+    if args.json:
+        document = {
+            "meta": {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "commit": git_commit(),
+                "easy_redis": __version__,
+                "python": platform.python_version(),
+                "redis_py": redis.__version__,
+                "backend": args.backend,
+                "server": server.get("redis_version"),
+                "platform": platform.platform(),
+                "codec": args.codec,
+                "metrics": args.metrics,
+                "seconds": args.seconds,
+            },
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(document, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as f:
+                json.dump(document, f, indent=2)
+            print(f"\nWrote {len(results)} results to {args.json}", file=out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compare codec throughput.
+
+Measures encode+decode speed in memory, and save+load round trips
+through Redis when a server is reachable.
+
+    python benchmarks/bench_codecs.py
+    python benchmarks/bench_codecs.py --no-redis
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path to import easy_redis
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import redis
+
+from easy_redis import EasyRedis
+from easy_redis.codec import CODECS, get_codec
+
+PAYLOADS = {
+    "small": {"user_id": 42, "name": "Alice", "admin": True},
+    "medium": {"items": [{"id": i, "price": i * 1.5, "tag": "x"} for i in range(100)]},
+    "large": {"items": [{"id": i, "price": i * 1.5, "tag": "x"} for i in range(5000)]},
+}
+
+
+def available_codecs():
+    """Every codec that can be built here (msgpack only if installed)."""
+    codecs = {}
+    for name in CODECS:
+        try:
+            codecs[name] = get_codec(name)
+        except ImportError:
+            print(f"(skipping {name}: not installed)")
+    # raw and text store bytes/strings, so they can't take these payloads
+    codecs.pop("raw", None)
+    codecs.pop("text", None)
+    return codecs
+
+
+def ops_per_sec(fn, seconds):
+    """Call fn repeatedly for about the given time and return calls/sec."""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def bench_memory(codecs, seconds):
+    print("\nIn-memory encode+decode (ops/sec, encoded size)")
+    for payload_name, payload in PAYLOADS.items():
+        for name, codec in codecs.items():
+            data = codec.encode(payload)
+            rate = ops_per_sec(lambda: codec.decode(codec.encode(payload)), seconds)
+            print(f"  {payload_name:<7} {name:<8} {rate:>12,.0f}  {len(data):>9,} B")
+
+
+def bench_redis(codecs, seconds):
+    print("\nRedis save+load round trip (ops/sec)")
+    db = EasyRedis()
+    for payload_name, payload in PAYLOADS.items():
+        for name in codecs:
+            app = db.app("bench_codecs", codec=name)
+
+            def round_trip():
+                app.save("payload", payload)
+                app.load("payload")
+
+            print(
+                f"  {payload_name:<7} {name:<8} {ops_per_sec(round_trip, seconds):>12,.0f}"
+            )
+        app.delete_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=0.5, help="time per case")
+    parser.add_argument("--no-redis", action="store_true", help="skip round trips")
+    args = parser.parse_args()
+
+    codecs = available_codecs()
+    bench_memory(codecs, args.seconds)
+    if not args.no_redis:
+        try:
+            bench_redis(codecs, args.seconds)
+        except redis.ConnectionError:
+            print("\n(Redis not reachable on localhost:6379, skipped round trips)")
+
+
+if __name__ == "__main__":
+    main()
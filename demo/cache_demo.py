@@ -1,5 +1,6 @@
 import sys
 import os
+import threading
 import time
 
 # Add parent directory to path to import easy_redis
@@ -7,7 +8,13 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from easy_redis import EasyRedis
 
+# Initialize EasyRedis and connect to "cache_app" namespace
+redis = EasyRedis()
+app = redis.app("cache_app")
 
+
+# Results are cached in Redis for 5 minutes (300 seconds)
+@app.cached(ttl=300, key="user_profile_{user_id}")
 def expensive_database_query(user_id):
     """Simulates a slow database query"""
     print(f"  [Simulating expensive database query for user {user_id}...]")
@@ -20,61 +27,72 @@ def expensive_database_query(user_id):
     }
 
 
+# Hot key: after 2 seconds the old value keeps being served for up to a
+# minute while a background thread recomputes it
+@app.cached(ttl=2, stale_seconds=60, early_refresh=1.0)
+def homepage_stats():
+    """Simulates a slow aggregate query"""
+    time.sleep(1)
+    return {"visitors": 1234, "computed_at": time.strftime("%H:%M:%S")}
+
+
+def timed_request(user_id):
+    """Fetch a profile and print how long it took."""
+    start_time = time.time()
+    user_data = expensive_database_query(user_id)
+    elapsed = time.time() - start_time
+    print(f"  Response time: {elapsed:.2f} seconds")
+    print(f"  User data: {user_data}\n")
+
+
 def main():
     print("--- Simple Cache Demo ---")
     print("This demonstrates caching expensive operations with Redis\n")
 
-    # Initialize EasyRedis and connect to "cache_app" namespace
-    redis = EasyRedis()
-    app = redis.app("cache_app")
-
     user_id = "user_123"
-    cache_key = f"user_profile_{user_id}"
 
     # First request - cache miss
     print("1. First request (cache miss):")
-    start_time = time.time()
-
-    cached_data = app.load_dict(cache_key)
-    if not cached_data:
-        print("  Cache MISS - fetching from database...")
-        user_data = expensive_database_query(user_id)
-
-        # Cache the result for 5 minutes (300 seconds)
-        app.save_dict(cache_key, user_data, expire_seconds=300)
-        print(f"  Cached for 5 minutes")
-    else:
-        print("  Cache HIT - loaded from Redis")
-        user_data = cached_data
-
-    elapsed = time.time() - start_time
-    print(f"  Response time: {elapsed:.2f} seconds")
-    print(f"  User data: {user_data}\n")
+    timed_request(user_id)
 
     # Second request - cache hit
     print("2. Second request (cache hit):")
-    start_time = time.time()
-
-    cached_data = app.load_dict(cache_key)
-    if not cached_data:
-        print("  Cache MISS - fetching from database...")
-        user_data = expensive_database_query(user_id)
-        app.save_dict(cache_key, user_data, expire_seconds=300)
-    else:
-        print("  Cache HIT - loaded from Redis")
-        user_data = cached_data
-
-    elapsed = time.time() - start_time
-    print(f"  Response time: {elapsed:.2f} seconds")
-    print(f"  User data: {user_data}\n")
+    timed_request(user_id)
 
     # Check cache expiration time
+    cache_key = expensive_database_query.cache_name(user_id)
     ttl = app.get_ttl(cache_key)
-    print(f"3. Cache expires in {ttl} seconds")
+    print(f"3. Cache expires in {ttl} seconds\n")
+
+    # The cached value disappears; 10 workers ask for it at once
+    print("4. Cache cleared, then 10 concurrent requests (one query runs):")
+    expensive_database_query.invalidate(user_id)
+    start_time = time.time()
+    workers = [
+        threading.Thread(target=expensive_database_query, args=(user_id,))
+        for _ in range(10)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(f"  All 10 served in {time.time() - start_time:.2f} seconds")
+    print(f"  Stats: {expensive_database_query.cache.stats()}")
+
+    # Stale-while-revalidate: no reader waits once the value exists
+    print("\n5. Stale-while-revalidate (ttl=2s, stale_seconds=60):")
+    for second in range(5):
+        start_time = time.time()
+        stats = homepage_stats()
+        elapsed = time.time() - start_time
+        print(f"  t={second}s computed_at={stats['computed_at']} ({elapsed:.2f}s)")
+        time.sleep(1)
+    print(f"  Stats: {homepage_stats.cache.stats()}")
 
     # Optional: Clear cache
-    print("\n4. Clearing cache for demo cleanup...")
-    app.delete(cache_key)
+    print("\n6. Clearing cache for demo cleanup...")
+    expensive_database_query.invalidate(user_id)
+    homepage_stats.invalidate()
     print("  Cache cleared!")
 
 
@@ -4,7 +4,7 @@ import os
 # Add parent directory to path to import easy_redis
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from easy_redis import EasyRedis
+from easy_redis import EasyRedis, VersionConflict
 
 
 def main():
@@ -38,17 +38,15 @@ def main():
     for key, value in sorted(loaded_config.items()):
         print(f"   {key}: {value}")
 
-    # Update a setting
+    # Update a setting (only the changed field is sent)
     print("\n3. Enabling maintenance mode...")
-    current_config = app.load_dict(config_key)
-    current_config["maintenance_mode"] = "true"
-    app.save_dict(config_key, current_config)
+    app.update_dict(config_key, maintenance_mode="true")
     print("   Maintenance mode enabled!\n")
 
-    # Check specific setting
+    # Check specific setting (only that field is read)
     print("4. Checking if maintenance mode is active:")
-    config = app.load_dict(config_key)
-    is_maintenance = config.get("maintenance_mode") == "true"
+    config = app.load_fields(config_key, "maintenance_mode")
+    is_maintenance = config["maintenance_mode"] == "true"
 
     if is_maintenance:
         print("   🚧 App is in MAINTENANCE MODE")
@@ -58,12 +56,13 @@ def main():
 
     # Update multiple settings
     print("\n5. Deploying new version and changing settings:")
-    config = app.load_dict(config_key)
-    config["version"] = "1.1.0"
-    config["maintenance_mode"] = "false"
-    config["debug_mode"] = "true"
-    config["theme"] = "light"
-    app.save_dict(config_key, config)
+    app.update_dict(
+        config_key,
+        version="1.1.0",
+        maintenance_mode="false",
+        debug_mode="true",
+        theme="light",
+    )
     print("   Settings updated!\n")
 
     # Display final configuration
@@ -72,13 +71,24 @@ def main():
     for key, value in sorted(final_config.items()):
         print(f"   {key}: {value}")
 
-    # Feature flag example
+    # Feature flags on the hot path: a local snapshot, no round trips
     print("\n7. Using configuration as feature flags:")
-    debug_enabled = final_config.get("debug_mode") == "true"
-    if debug_enabled:
-        print("   🐛 Debug logging is ENABLED")
-    else:
-        print("   Debug logging is disabled")
+    with app.config("feature_flags", poll_seconds=5) as flags:
+        flags.set(debug_mode="true", new_checkout="false")
+        if flags.is_enabled("debug_mode"):
+            print("   🐛 Debug logging is ENABLED")
+        else:
+            print("   Debug logging is disabled")
+        print(f"   Flags are at version {flags.version}")
+
+        # Two deploys read the same version; only the first write wins
+        seen = flags.version
+        flags.set(new_checkout="true", expected_version=seen)
+        try:
+            flags.set(new_checkout="false", expected_version=seen)
+        except VersionConflict as e:
+            print(f"   Second deploy rejected: {e}")
+        print(f"   new_checkout enabled: {flags.is_enabled('new_checkout')}")
 
     # List all config keys
     print("\n8. All keys in config namespace:")
@@ -88,6 +98,8 @@ def main():
     # Cleanup
     print("\n9. Demo complete. Clearing configuration...")
     app.delete(config_key)
+    app.delete("feature_flags")
+    app.delete("feature_flags:version")
     print("   Configuration cleared!")
 
 
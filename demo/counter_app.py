@@ -21,17 +21,20 @@ def main():
     # Check current value
     current_views = app.load(counter_key)
     if current_views is None:
-        print("First time running! Initializing counter to 0.")
-        current_views = 0
+        print("First time running! The counter starts at 0.")
     else:
-        current_views = int(current_views)
         print(f"Current page views: {current_views}")
 
-    # Increment counter
-    new_views = current_views + 1
-    app.save(counter_key, new_views)
+    # Increment counter (atomic, one round trip - safe with many workers)
+    new_views = app.incr(counter_key)
     print(f"Updated page views to: {new_views}")
 
+    # Very hot counters can be counted in memory and flushed in batches
+    with app.write_behind(flush_ms=500) as buffered:
+        for _ in range(1000):
+            buffered.incr(counter_key)
+    print(f"After 1000 buffered hits: {app.load(counter_key)}")
+
     # Demonstrate expiration (Temporary access token concept)
     token_key = "temp_access_token_123"
     print(f"\nGeneratring temporary access token: {token_key}")
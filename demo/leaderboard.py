@@ -7,72 +7,56 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from easy_redis import EasyRedis
 
 
+def show(entries):
+    """Print leaderboard entries with medals for the top three."""
+    for entry in entries:
+        medal = {1: "🥇", 2: "🥈", 3: "🥉"}.get(entry.rank, "  ")
+        print(f"   {medal} #{entry.rank} {entry.member}: {entry.score} points")
+
+
 def main():
     print("--- Game Leaderboard Demo ---")
-    print("Tracking high scores using Redis dictionaries\n")
+    print("Tracking high scores using a Redis sorted set\n")
 
     # Initialize EasyRedis and connect to "leaderboard_app" namespace
     redis = EasyRedis()
     app = redis.app("leaderboard_app")
 
-    leaderboard_key = "high_scores"
+    # Redis keeps the players sorted by score for us
+    board = app.leaderboard("high_scores")
 
     # Add initial scores
     print("1. Adding initial high scores:")
-    scores = {"Alice": "1500", "Bob": "2300", "Charlie": "1800", "Diana": "2100"}
-
-    app.save_dict(leaderboard_key, scores)
+    board.set_scores({"Alice": 1500, "Bob": 2300, "Charlie": 1800, "Diana": 2100})
     print("   Scores added!\n")
 
     # Display leaderboard
     print("2. Current Leaderboard:")
-    all_scores = app.load_dict(leaderboard_key)
-
-    # Sort by score (descending)
-    sorted_scores = sorted(all_scores.items(), key=lambda x: int(x[1]), reverse=True)
+    show(board.top(10))
 
-    for rank, (player, score) in enumerate(sorted_scores, 1):
-        print(f"   #{rank} {player}: {score} points")
-
-    # Add a new high score
+    # Only keep a new score if it beats the old one
     print("\n3. Charlie just beat his high score!")
-    new_scores = app.load_dict(leaderboard_key)
-    new_scores["Charlie"] = "2500"
-    app.save_dict(leaderboard_key, new_scores)
+    board.set_score("Charlie", 2500, only_if_better=True)
+    print(f"   Charlie is now rank #{board.rank('Charlie')}\n")
 
-    print("   Updated score saved!\n")
+    # Award bonus points atomically
+    print("4. Alice earns a 250 point bonus:")
+    print(f"   Alice now has {board.incr_score('Alice', 250)} points\n")
 
-    # Display updated leaderboard
-    print("4. Updated Leaderboard:")
-    all_scores = app.load_dict(leaderboard_key)
-    sorted_scores = sorted(all_scores.items(), key=lambda x: int(x[1]), reverse=True)
+    # Add new player
+    print("5. New player 'Eve' joins with score 1900:")
+    board.set_score("Eve", 1900)
 
-    for rank, (player, score) in enumerate(sorted_scores, 1):
-        medal = (
-            "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else "  "
-        )
-        print(f"   {medal} #{rank} {player}: {score} points")
+    # Only the requested page is sent back from Redis
+    print("\n6. Top 3:")
+    show(board.top(3))
 
-    # Add new player
-    print("\n5. New player 'Eve' joins with score 1900:")
-    new_scores = app.load_dict(leaderboard_key)
-    new_scores["Eve"] = "1900"
-    app.save_dict(leaderboard_key, new_scores)
-
-    # Final leaderboard
-    print("\n6. Final Leaderboard:")
-    all_scores = app.load_dict(leaderboard_key)
-    sorted_scores = sorted(all_scores.items(), key=lambda x: int(x[1]), reverse=True)
-
-    for rank, (player, score) in enumerate(sorted_scores, 1):
-        medal = (
-            "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else "  "
-        )
-        print(f"   {medal} #{rank} {player}: {score} points")
+    print("\n7. Players around Eve:")
+    show(board.around("Eve", radius=1))
 
     # Cleanup
-    print("\n7. Demo complete. Clearing leaderboard...")
-    app.delete(leaderboard_key)
+    print("\n8. Demo complete. Clearing leaderboard...")
+    board.clear()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,5 @@
 import sys
 import os
-import time
 
 # Add parent directory to path to import easy_redis
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -10,64 +9,76 @@ from easy_redis import EasyRedis
 
 def main():
     print("--- Notification Queue Demo ---")
-    print("Simple messaging system using Redis lists\n")
+    print("Fan-out messaging using Redis Streams and consumer groups\n")
 
     # Initialize EasyRedis and connect to "notification_app" namespace
     redis = EasyRedis()
     app = redis.app("notification_app")
 
-    inbox_key = "user_inbox_789"
+    # Keep roughly the last 10,000 notifications
+    notifications = app.stream("user_inbox_789", maxlen=10_000)
 
     # Clear previous notifications for demo
-    app.clear_list(inbox_key)
+    notifications.delete()
+
+    # Each group gets every message; consumers in a group share them
+    notifications.create_group("mailer")
+    notifications.create_group("mobile_push")
 
     # Simulate sending notifications
     print("1. Sending notifications to user:")
-    notifications = [
+    messages = [
         "Welcome to our app!",
         "You have a new message from Bob",
         "Your order has shipped",
         "You earned 50 bonus points!",
     ]
-
-    for notif in notifications:
-        app.add_to_list(inbox_key, notif)
-        print(f"   ✉️  {notif}")
-        time.sleep(0.3)
-
-    print()
-
-    # Check notification count
-    all_notifications = app.get_list(inbox_key)
-    print(f"2. User has {len(all_notifications)} unread notifications\n")
-
-    # Display inbox
-    print("3. User's Inbox:")
-    for i, notif in enumerate(all_notifications, 1):
-        print(f"   [{i}] {notif}")
+    notifications.publish_many([{"text": text} for text in messages])
+    for text in messages:
+        print(f"   ✉️  {text}")
+
+    print(f"\n2. Stream holds {notifications.length()} notifications\n")
+
+    # Two mailer workers split the work between them
+    print("3. Two mailer workers share the backlog:")
+    for worker in ("mailer-1", "mailer-2"):
+        batch = notifications.consume("mailer", worker, count=2)
+        for message in batch:
+            print(f"   [{worker}] {message.fields['text']}")
+        # Acks are sent along with the worker's next read
+        notifications.ack("mailer", *[message.id for message in batch])
+
+    # The push group still sees every message
+    print("\n4. Mobile push sees everything too:")
+    for message in notifications.consume("mobile_push", "push-1"):
+        print(f"   📱 {message.fields['text']}")
+    # push-1 "crashes" without acking
 
     # Add urgent notification
-    print("\n4. Urgent notification arrives:")
+    print("\n5. Urgent notification arrives:")
     urgent_msg = "🚨 Security alert: New login detected"
-    app.add_to_list(inbox_key, urgent_msg)
-    print(f"   {urgent_msg}")
-
-    # Display updated inbox
-    print("\n5. Updated Inbox:")
-    all_notifications = app.get_list(inbox_key)
-    for i, notif in enumerate(all_notifications, 1):
-        prefix = "🚨" if "alert" in notif.lower() else "📬"
-        print(f"   {prefix} [{i}] {notif}")
-
-    # Simulate reading notifications (clearing them)
-    print("\n6. User reads all notifications...")
-    time.sleep(1)
-    app.clear_list(inbox_key)
-    print("   Inbox cleared!")
-
-    # Verify empty
-    remaining = app.get_list(inbox_key)
-    print(f"\n7. Notifications remaining: {len(remaining)}")
+    notifications.publish({"text": urgent_msg})
+    for message in notifications.consume("mailer", "mailer-1", block=1):
+        print(f"   [mailer-1] {message.fields['text']}")
+        notifications.ack("mailer", message.id)
+    notifications.flush_acks()
+
+    # Another push worker takes over what push-1 never acked
+    print("\n6. push-2 reclaims what push-1 left behind:")
+    reclaimed = notifications.claim("mobile_push", "push-2", min_idle_seconds=0)
+    for message in reclaimed:
+        print(f"   📱 {message.fields['text']}")
+    notifications.ack("mobile_push", *[message.id for message in reclaimed])
+    notifications.flush_acks()
+
+    # Nothing is lost: the stream can be replayed from the start
+    print("\n7. Replaying the inbox:")
+    for i, message in enumerate(notifications.read(), 1):
+        prefix = "🚨" if "alert" in message.fields["text"].lower() else "📬"
+        print(f"   {prefix} [{i}] {message.fields['text']}")
+
+    print(f"\n8. Unacked for mailer: {notifications.pending('mailer')}")
+    notifications.delete()
 
 
 if __name__ == "__main__":
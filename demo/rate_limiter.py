@@ -8,30 +8,6 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from easy_redis import EasyRedis
 
 
-def is_rate_limited(app, user_id, max_requests=5, window_seconds=10):
-    """
-    Simple rate limiter: max_requests per window_seconds.
-    Returns True if rate limited, False if allowed.
-    """
-    key = f"rate_limit_{user_id}"
-
-    # Get current request count
-    current = app.load(key)
-
-    if current is None:
-        # First request in this window
-        app.save(key, "1", expire_seconds=window_seconds)
-        return False
-
-    count = int(current)
-    if count >= max_requests:
-        return True  # Rate limited!
-
-    # Increment counter
-    app.save(key, str(count + 1))
-    return False
-
-
 def main():
     print("--- Rate Limiter Demo ---")
     print("Limits users to 5 requests per 10 seconds\n")
@@ -40,38 +16,42 @@ def main():
     redis = EasyRedis()
     app = redis.app("rate_limiter_app")
 
+    # At most 5 requests per 10 seconds for each user
+    limiter = app.rate_limiter(limit=5, window_seconds=10)
+
     user_id = "user_456"
 
     # Simulate 7 rapid requests
     print("Simulating 7 rapid requests from the same user:\n")
 
     for i in range(1, 8):
-        is_limited = is_rate_limited(app, user_id, max_requests=5, window_seconds=10)
+        result = limiter.check(user_id)
 
-        if is_limited:
-            print(f"Request {i}: ❌ BLOCKED (rate limit exceeded)")
+        if result.allowed:
+            print(f"Request {i}: ✓ ALLOWED ({result.remaining} left)")
         else:
-            print(f"Request {i}: ✓ ALLOWED")
+            print(f"Request {i}: ❌ BLOCKED (retry in {result.retry_after:.1f}s)")
 
         time.sleep(0.5)  # Small delay between requests
 
-    # Check TTL
-    key = f"rate_limit_{user_id}"
-    ttl = app.get_ttl(key)
-    if ttl > 0:
-        print(f"\nRate limit resets in {ttl} seconds")
-
     # Wait for window to reset
-    print(f"\nWaiting {ttl + 1} seconds for rate limit to reset...")
-    time.sleep(ttl + 1)
+    wait = limiter.check(user_id).retry_after
+    print(f"\nWaiting {wait:.1f} seconds for rate limit to reset...")
+    time.sleep(wait)
 
     print("\nAfter rate limit window reset:")
-    is_limited = is_rate_limited(app, user_id, max_requests=5, window_seconds=10)
-    if not is_limited:
+    if limiter.check(user_id).allowed:
         print("Request: ✓ ALLOWED (rate limit has reset)")
 
+    # A sliding window has no burst at the window edge
+    sliding = app.rate_limiter(limit=5, window_seconds=10, algorithm="sliding")
+    results = sliding.check_many(["user_1", "user_2", "user_3"])
+    print(f"\nSliding window, 3 users in one round trip: {results}")
+
     # Cleanup
-    app.delete(key)
+    limiter.reset(user_id)
+    for other in results:
+        sliding.reset(other)
 
 
 if __name__ == "__main__":
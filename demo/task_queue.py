@@ -1,5 +1,6 @@
 import sys
 import os
+import threading
 
 # Add parent directory to path to import easy_redis
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -7,41 +8,54 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from easy_redis import EasyRedis
 
 
+def handle_task(task):
+    """Pretend to work on a task."""
+    if task == "Fix critical bug":
+        raise RuntimeError("needs a human")
+    return f"done: {task}"
+
+
 def main():
-    print("--- Task Queue / Todo List Demo ---")
+    print("--- Task Queue Demo ---")
 
     # Initialize EasyRedis and connect to "task_app" namespace
     redis = EasyRedis()
     app = redis.app("task_app")
 
-    list_key = "my_tasks"
+    # Jobs stay in Redis until a worker acks them
+    tasks = app.work_queue("my_tasks", visibility_timeout=30)
 
-    # Clear old list for a fresh demo run
+    # Clear old queue for a fresh demo run
     print("Clearing any existing tasks...")
-    app.clear_list(list_key)
+    tasks.clear()
 
     # Add tasks
     print("Adding 3 tasks to the queue...")
-    app.add_to_list(list_key, "Email the team", "Update website", "Buy coffee")
+    tasks.enqueue_many(["Email the team", "Update website", "Buy coffee"])
+    print(f"Queue: {tasks.stats()}")
 
-    # Retrieve and list tasks
-    tasks = app.get_list(list_key)
-    print(f"Current tasks in queue ({len(tasks)}):")
-    for i, task in enumerate(tasks, 1):
-        print(f"{i}. {task}")
+    # Take one task by hand, then finish it
+    print("\nWorking on one task by hand...")
+    job = tasks.dequeue(timeout=1)
+    print(f"Got: {job.data}")
+    print(f"While working: {tasks.stats()}")
+    tasks.ack(job)
+    print(f"After ack: {tasks.stats()}")
 
     # Additional task
     print("\nUrgent task comes in...")
-    app.add_to_list(list_key, "Fix critical bug")
+    tasks.enqueue("Fix critical bug")
 
-    # Show updated list
-    updated_tasks = app.get_list(list_key)
-    print("Updated task list:")
-    print(updated_tasks)
+    # A producer keeps adding work while a pool of workers handles it
+    print("\nRunning 4 worker threads on the rest...")
+    threading.Timer(0.2, tasks.enqueue, ["Late task"]).start()
+    handled = tasks.run(handle_task, workers=4, max_jobs=4)
+    print(f"Handled {handled} tasks")
+    print(f"Queue: {tasks.stats()} (the failed one is kept for a look)")
 
     # Clean up (Optional, but good for demos)
-    print("\nDemo complete. Clearing list.")
-    app.clear_list(list_key)
+    print("\nDemo complete. Clearing queue.")
+    tasks.clear()
 
 
 if __name__ == "__main__":
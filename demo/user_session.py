@@ -15,6 +15,11 @@ def main():
     redis = EasyRedis()
     app = redis.app("session_app")
 
+    # Sessions expire after 1 hour (3600 seconds) without activity.
+    # Using a short expiration here just to show the param,
+    # but in real app it might be 30 days etc.
+    sessions = app.sessions(expire_seconds=3600)
+
     user_id = "user_42"
 
     # Simulating a user login - storing session data
@@ -26,17 +31,12 @@ def main():
     }
 
     print(f"Logging in {user_data['username']} (ID: {user_id})...")
+    session_id = sessions.create(user_id, user_data)
+    print(f"Session saved. Session ID: {session_id}")
 
-    # Save dictionary with a 1 hour expiration (3600 seconds)
-    # Using a short expiration here just to show the param,
-    # but in real app it might be 30 days etc.
-    app.save_dict(user_id, user_data, expire_seconds=3600)
-
-    print("Session saved.")
-
-    # Retrieve the session
-    print("\nRetrieving session details...")
-    loaded_data = app.load_dict(user_id)
+    # Retrieve the session; this also restarts the 1 hour countdown
+    print("\nRetrieving session details (one round trip)...")
+    loaded_data = sessions.get(session_id)
 
     print("Session Data Loaded:")
     pprint.pprint(loaded_data)
@@ -48,9 +48,22 @@ def main():
         print("\n>> User is NOT an admin. Access Denied.")
 
     # Check TTL
-    ttl = app.get_ttl(user_id)
+    ttl = app.get_ttl(f"session:{session_id}")
     print(f"Session expires in {ttl} seconds.")
 
+    # Change one field without rewriting the whole session
+    sessions.update(session_id, theme="light")
+    print(f"\nTheme changed: {sessions.get(session_id)['theme']}")
+
+    # The same user logs in from a phone
+    phone_session = sessions.create(user_id, {"device": "phone"})
+    print(f"\n{user_id} has {len(sessions.user_sessions(user_id))} sessions")
+
+    # Password changed: log out everywhere at once
+    revoked = sessions.revoke_user(user_id)
+    print(f"Revoked {revoked} sessions")
+    print(f"Session after revoke: {sessions.get(phone_session)}")
+
     # List all keys in this app namespace
     print("\nListing all keys in 'session_app':")
     all_keys = app.list_all()
@@ -1,9 +1,113 @@
 """EasyRedis - Dead-simple Redis wrapper for RAD apps."""
 
+import functools
+import threading
+
 import redis
+from redis.cluster import RedisCluster
+from redis.sentinel import Sentinel
+
+from . import cluster
 from .__version__ import __version__
+from .batch import BATCHABLE, Batch, BatchResult, Pending
+from .cached import CachedFunction, cached
+from .codec import (
+    JsonCodec,
+    MsgpackCodec,
+    PickleCodec,
+    RawCodec,
+    TextCodec,
+    get_codec,
+)
+from .compression import CompressedCodec, Compressor, get_compressor
+from .config import ConfigStore, VersionConflict
+from .counters import CounterBuffer
+from .leaderboard import Leaderboard, LeaderboardEntry
+from .metrics import Hook, MetricsCollector, Operation, counting_client, instrumented
+from .memory import MemoryRedis, get_store
+from .near_cache import LRU, MISSING
+from .pool import _node_address, close_pools, get_cluster, get_pool, warmup
+from .rate_limit import RateLimiter, RateLimitResult
+from .replicas import (
+    ReplicaRedis,
+    ReplicaSet,
+    consistent,
+    get_replica_set,
+    on_primary,
+)
+from .sessions import SessionStore
+from .sharding import HashRing, ShardedRedis
+from .streams import Message, Stream
+from .work_queue import Job, WorkQueue
+
+__all__ = [
+    "EasyRedis",
+    "AppSpace",
+    "Batch",
+    "BatchResult",
+    "LRU",
+    "close_pools",
+    "RawCodec",
+    "JsonCodec",
+    "PickleCodec",
+    "MsgpackCodec",
+    "TextCodec",
+    "Compressor",
+    "CounterBuffer",
+    "RateLimiter",
+    "RateLimitResult",
+    "Leaderboard",
+    "LeaderboardEntry",
+    "WorkQueue",
+    "Job",
+    "Stream",
+    "Message",
+    "CachedFunction",
+    "SessionStore",
+    "ConfigStore",
+    "VersionConflict",
+    "Hook",
+    "MetricsCollector",
+    "Operation",
+    "MemoryRedis",
+    "HashRing",
+    "ShardedRedis",
+    "ReplicaRedis",
+    "ReplicaSet",
+    "on_primary",
+]
+
+# AppSpace methods reported to hooks (iterators and factories are not)
+INSTRUMENTED = BATCHABLE | {
+    "load_many",
+    "save_many",
+    "load_dicts",
+    "exists_many",
+    "list_all",
+    "delete_all",
+}
 
-__all__ = ["EasyRedis", "AppSpace"]
+# AppSpace reads that take consistency="primary" (replicas can answer them)
+READ_ONLY = {
+    "load",
+    "load_dict",
+    "load_fields",
+    "dict_size",
+    "get_list",
+    "list_length",
+    "exists",
+    "get_ttl",
+    "list_all",
+    "load_many",
+    "load_dicts",
+    "exists_many",
+}
+
+
+def _chunks(items, size):
+    """Split a list into pieces of at most size items."""
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
 
 
 class EasyRedis:
@@ -12,18 +116,325 @@ class EasyRedis:
     Just create it, pick your app name, and go.
     """
 
-    def __init__(self, host="localhost", port=6379, password=None):
-        """Connect to Redis. Works out of the box with defaults."""
-        self.client = redis.Redis(
+    def __init__(
+        self,
+        host="localhost",
+        port=6379,
+        password=None,
+        db=0,
+        max_connections=None,
+        socket_timeout=None,
+        socket_connect_timeout=None,
+        socket_keepalive=False,
+        health_check_interval=0,
+        blocking=False,
+        pool_timeout=20,
+        backend="redis",
+        cluster_nodes=None,
+        hash_tags=False,
+        shards=None,
+        replicas=None,
+        sentinels=None,
+        service_name="mymaster",
+        read_from="round_robin",
+        sticky_seconds=1.0,
+    ):
+        """
+        Connect to Redis. Works out of the box with defaults.
+
+        Every EasyRedis for the same (host, port, db, password) shares one
+        connection pool. The first one created sets the pool options:
+
+        max_connections: Cap on open connections (optional).
+        socket_timeout / socket_connect_timeout: Seconds before giving up (optional).
+        socket_keepalive: Turn on TCP keepalive.
+        health_check_interval: PING idle connections older than this many seconds.
+        blocking: Wait up to pool_timeout seconds for a free connection
+                  instead of raising when max_connections are busy.
+        backend: "redis", or "memory" to keep everything in this process
+                 (no server needed). Memory backends with the same db
+                 share their data; connection options are ignored.
+        cluster_nodes: Connect to a Redis Cluster instead, through some of
+                       its nodes ("host:port" or (host, port); optional).
+                       host, port and db are ignored.
+        hash_tags: Default for app(hash_tag=...): keep each app's keys in
+                   one cluster slot (or shard).
+        shards: Spread keys over these standalone servers ("host:port" or
+                (host, port)) with a consistent hash ring (optional). db,
+                password and the pool options apply to every shard.
+        replicas: Replicas of the server ("host:port" or (host, port)) to
+                  send reads to (optional). Writes still go to host:port.
+        sentinels: Find the primary (and its replicas) through these
+                   Sentinels ("host:port" or (host, port); optional).
+                   host and port are ignored, and after a failover the
+                   new primary is used.
+        service_name: The name Sentinel knows the primary by.
+        read_from: How reads pick a replica - "round_robin", "least_latency"
+                   (fastest PING), or "primary" to not read from replicas.
+        sticky_seconds: After a write, a thread reads from the primary for
+                        this long, so it sees its own writes.
+        """
+        if backend not in ("redis", "memory"):
+            raise ValueError(f"Unknown backend {backend!r} (use 'redis' or 'memory')")
+        self.backend = backend
+        self.hash_tags = hash_tags
+        self.cluster_nodes = cluster_nodes
+        self.shards = shards
+        self.replicas = replicas
+        self.sentinels = sentinels
+        self.service_name = service_name
+        if (replicas or sentinels) and (backend == "memory" or cluster_nodes or shards):
+            raise ValueError(
+                "replicas and sentinels need one redis primary "
+                "(not a cluster, shards or the memory backend)"
+            )
+        if backend == "memory":
+            store = get_store(db)
+            self.pool = None
+            self.client = MemoryRedis(store, decode_responses=True)
+            self._raw_client = MemoryRedis(store)
+            return
+        if cluster_nodes and shards:
+            raise ValueError("Pass cluster_nodes or shards, not both")
+        if shards:
+            if backend != "redis":
+                raise ValueError("shards needs the redis backend")
+            self.pool = None
+            self.client = ShardedRedis(
+                HashRing(shards),
+                db=db,
+                password=password,
+                max_connections=max_connections,
+                blocking=blocking,
+                pool_timeout=pool_timeout,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_connect_timeout,
+                socket_keepalive=socket_keepalive,
+                health_check_interval=health_check_interval,
+            )
+            self._raw_client = None
+            return
+        if cluster_nodes:
+            if backend != "redis":
+                raise ValueError("cluster_nodes needs the redis backend")
+            self._cluster_options = dict(
+                password=password,
+                max_connections=max_connections,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_connect_timeout,
+                socket_keepalive=socket_keepalive,
+                health_check_interval=health_check_interval,
+            )
+            self.pool = None
+            self.client = get_cluster(
+                cluster_nodes, decode_responses=True, **self._cluster_options
+            )
+            self._raw_client = None
+            return
+        self._pool_options = dict(
             host=host,
             port=port,
+            db=db,
             password=password,
-            decode_responses=True,  # Returns strings, not bytes [web:20][web:29]
+            max_connections=max_connections,
+            blocking=blocking,
+            pool_timeout=pool_timeout,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
+            socket_keepalive=socket_keepalive,
+            health_check_interval=health_check_interval,
         )
+        if sentinels:
+            self._sentinel = Sentinel(
+                [_node_address(node) for node in sentinels],
+                **{
+                    name: value
+                    for name, value in self._pool_options.items()
+                    if name not in ("host", "port", "blocking", "pool_timeout")
+                },
+            )
+            self.client = self._sentinel.master_for(service_name, decode_responses=True)
+            self.pool = self.client.connection_pool
+        else:
+            self.pool = get_pool(
+                decode_responses=True,  # Returns strings, not bytes [web:20][web:29]
+                **self._pool_options,
+            )
+            self.client = redis.Redis(connection_pool=self.pool)
+        self._raw_client = None
+        if (replicas or sentinels) and read_from != "primary":
+            discover = discover_key = None
+            if sentinels:
+                discover = functools.partial(
+                    self._sentinel.discover_slaves, service_name
+                )
+                discover_key = (
+                    tuple(_node_address(node) for node in sentinels),
+                    service_name,
+                )
+            # Shared, so each EasyRedis doesn't start its own probe thread
+            replica_set = get_replica_set(
+                replicas or (),
+                discover=discover,
+                discover_key=discover_key,
+                read_from=read_from,
+                **{
+                    name: value
+                    for name, value in self._pool_options.items()
+                    if name not in ("host", "port")
+                },
+            )
+            self.client = ReplicaRedis(
+                self.client, replica_set, sticky_seconds=sticky_seconds
+            )
 
-    def app(self, app_name):
-        """Get a simple namespace for your app."""
-        return AppSpace(self.client, app_name)
+    @property
+    def raw_client(self):
+        """A bytes-mode client (no decoding), used by apps with a codec."""
+        if self._raw_client is None and self.shards:
+            # Same ring and threads, so both see shards being added
+            self._raw_client = ShardedRedis(
+                self.client.ring,
+                decode_responses=False,
+                executor=self.client.executor,
+                **self.client._pool_options,
+            )
+        elif self._raw_client is None and self.cluster_nodes:
+            self._raw_client = get_cluster(
+                self.cluster_nodes, decode_responses=False, **self._cluster_options
+            )
+        elif self._raw_client is None:
+            if self.sentinels:
+                raw_client = self._sentinel.master_for(
+                    self.service_name, decode_responses=False
+                )
+            else:
+                pool = get_pool(decode_responses=False, **self._pool_options)
+                raw_client = redis.Redis(connection_pool=pool)
+            if isinstance(self.client, ReplicaRedis):
+                # Same replicas (and probe thread) as the string client
+                raw_client = ReplicaRedis(
+                    raw_client,
+                    self.client.replicas,
+                    decode_responses=False,
+                    sticky_seconds=self.client.sticky_seconds,
+                )
+            self._raw_client = raw_client
+        return self._raw_client
+
+    def warmup(self, n=1):
+        """
+        Open n connections before traffic arrives.
+
+        Returns the number of connections opened (on a cluster or shards: n
+        to every primary, summed; with replicas: n to the primary and to
+        every replica that is up, summed).
+        """
+        if self.cluster_nodes or self.shards:
+            return sum(
+                warmup(node.redis_connection.connection_pool, n)
+                for node in self.client.get_primaries()
+            )
+        if self.pool is None:
+            # Nothing to connect to in memory
+            return 0
+        opened = warmup(self.pool, n)
+        if isinstance(self.client, ReplicaRedis):
+            replicas = self.client.replicas
+            for node in replicas.nodes:
+                if node not in replicas.down:
+                    opened += warmup(replicas.client(node).connection_pool, n)
+        return opened
+
+    def add_shard(self, node):
+        """
+        Add a server to the shards. Returns the number of slots (of 16384)
+        that moved to it, about 1/N of them.
+
+        Call rebalance() next: until it moves them, keys of those slots
+        are still on their old shards and read as missing.
+        """
+        return self._sharded().add_shard(node)
+
+    def remove_shard(self, node):
+        """
+        Take a server out of the shards. Returns the number of slots moved.
+
+        Call rebalance() next to move its keys to the other shards.
+        """
+        return self._sharded().remove_shard(node)
+
+    def rebalance(self, match=None, count=1000, progress=None):
+        """
+        Move keys to the shards that own them after add_shard/remove_shard.
+
+        match: Only move keys matching this glob pattern (optional).
+        count: Keys looked at per SCAN call, and moved per MIGRATE.
+        progress: Called with the running total as keys move (optional).
+
+        Returns the number of keys moved.
+        """
+        return self._sharded().rebalance(match=match, count=count, progress=progress)
+
+    def _sharded(self):
+        """The ShardedRedis client (shard methods need shards=...)."""
+        if not self.shards:
+            raise ValueError("Only an EasyRedis created with shards has shards")
+        return self.client
+
+    def app(
+        self,
+        app_name,
+        near_cache=None,
+        codec=None,
+        compression=None,
+        hooks=None,
+        hash_tag=None,
+        consistency=None,
+    ):
+        """
+        Get a simple namespace for your app.
+
+        near_cache: An LRU that serves repeated load/load_dict calls from
+                    memory (optional). Writes from any process evict entries.
+        codec: How values are stored - "raw", "json", "pickle", "msgpack" or
+               a codec object (optional). Without one, values are plain strings.
+        compression: "zlib", "lz4", "zstd" or a Compressor, to shrink large
+                     values (optional).
+        hooks: Hooks (e.g. a MetricsCollector) told about every operation
+               (optional).
+        hash_tag: Prefix keys with "{app_name}:" so a cluster keeps them all
+                  in one slot (default: the hash_tags given to EasyRedis).
+        consistency: "primary" to send every read of the app to the primary
+                     instead of replicas (default "replica"). Apps with a
+                     near_cache always read from the primary.
+        """
+        if near_cache is not None and self.backend == "memory":
+            raise ValueError(
+                "The memory backend is in-process already; drop near_cache"
+            )
+        if near_cache is not None and (self.cluster_nodes or self.shards):
+            raise ValueError("near_cache is not supported on a cluster or shards")
+        if consistency not in (None, "replica", "primary"):
+            raise ValueError(
+                f"Unknown consistency {consistency!r} (use 'replica' or 'primary')"
+            )
+        client, raw_client = self.client, self.raw_client
+        if isinstance(client, ReplicaRedis) and (
+            consistency == "primary" or near_cache is not None
+        ):
+            # Near caches are told about writes by the server they read from
+            client, raw_client = client.primary, raw_client.primary
+        return AppSpace(
+            client,
+            app_name,
+            near_cache=near_cache,
+            codec=codec,
+            compression=compression,
+            raw_client=raw_client,
+            hooks=hooks,
+            hash_tag=self.hash_tags if hash_tag is None else hash_tag,
+        )
 
 
 class AppSpace:
@@ -32,13 +443,160 @@ class AppSpace:
     All keys are automatically prefixed with your app name.
     """
 
-    def __init__(self, client, app_name):
-        self.client = client
+    # True while bound to a pipeline inside batch()
+    _pipelined = False
+    # Hooks told about every operation, or None (see add_hook)
+    _hooks = None
+    # True when the client is a RedisCluster
+    _cluster = False
+    # True when keys are on several servers (cluster or shards)
+    _fan_out = False
+
+    def __init__(
+        self,
+        client,
+        app_name,
+        near_cache=None,
+        codec=None,
+        compression=None,
+        raw_client=None,
+        hooks=None,
+        hash_tag=False,
+    ):
+        self.compression = get_compressor(compression)
+        self.codec = self._compressed(get_codec(codec) or self._text_codec())
+        self.raw_client = raw_client if raw_client is not None else client
+        # Apps with a codec only ever see bytes
+        self.client = self.raw_client if self.codec is not None else client
         self.app_name = app_name
+        # "{app}:" puts every key of the app in the same cluster slot
+        self._prefix = f"{{{app_name}}}:" if hash_tag else f"{app_name}:"
+        self._hash_tag = bool(hash_tag)
+        self._cluster = isinstance(client, RedisCluster)
+        self._fan_out = isinstance(client, (RedisCluster, ShardedRedis))
+        self.near_cache = near_cache
+        if near_cache is not None:
+            near_cache.track(client, self._key(""))
+        for hook in hooks or ():
+            self.add_hook(hook)
+
+    # -------- Instrumentation --------
+
+    def add_hook(self, hook):
+        """
+        Tell a hook about every operation of this app.
+
+        hook: A Hook (or any object with before(op) and after(op)), e.g. a
+              MetricsCollector. Its methods get an Operation with the
+              method name, key count, payload size, round trips and time.
+        """
+        if self._hooks is None:
+            # Count round trips on copies of the clients, so apps without
+            # hooks don't pay for it
+            self._plain_clients = self.client, self.raw_client
+            raw_client = counting_client(self.raw_client)
+            if self.client is not self.raw_client:
+                self.client = counting_client(self.client)
+            else:
+                self.client = raw_client
+            self.raw_client = raw_client
+        self._hooks = (self._hooks or ()) + (hook,)
+
+    def remove_hook(self, hook):
+        """Stop telling a hook about operations."""
+        hooks = tuple(h for h in self._hooks or () if h is not hook)
+        if not hooks and self._hooks:
+            self.client, self.raw_client = self._plain_clients
+        self._hooks = hooks or None
 
     def _key(self, name):
         """Build the namespaced key."""
-        return f"{self.app_name}:{name}"
+        return f"{self._prefix}{name}"
+
+    def _keys(self, names):
+        """Build namespaced keys for many names at once."""
+        prefix = self._prefix
+        return [f"{prefix}{name}" for name in names]
+
+    def _reply(self, result, transform=None):
+        """
+        Post-process the reply of the command just sent.
+
+        Inside a batch the reply isn't known yet, so a Pending marker is
+        returned and the transform runs when the pipeline is executed.
+        """
+        if self._pipelined:
+            return Pending(len(self.client) - 1, transform)
+        return transform(result) if transform else result
+
+    def _codec_client(self, codec):
+        """Pick the client and codec for one call (codec=None: the app's)."""
+        if codec is None:
+            return self.client, self.codec
+        if self._pipelined and self.codec is None:
+            raise ValueError("Per-call codecs in a batch need an app with a codec")
+        codec = self._compressed(get_codec(codec))
+        return (self.client if self._pipelined else self.raw_client), codec
+
+    def _text_codec(self):
+        """Plain apps need a text codec once compression puts them on bytes."""
+        return TextCodec() if self.compression is not None else None
+
+    def _compressed(self, codec):
+        """Wrap a codec with the app's compression, if any."""
+        if codec is None or self.compression is None:
+            return codec
+        return CompressedCodec(codec, self.compression)
+
+    @staticmethod
+    def _decoder(codec):
+        """Reply transform that decodes one value (None stays None)."""
+        if codec is None:
+            return None
+        decode = codec.decode
+        return lambda data: None if data is None else decode(data)
+
+    def _list_decoder(self):
+        """Reply transform for list replies: [] when missing, items decoded."""
+        if self.codec is None:
+            return lambda items: items or []
+        decode = self.codec.decode
+        return lambda items: [decode(item) for item in items] if items else []
+
+    @staticmethod
+    def _dict_decoder(codec):
+        """Reply transform for HGETALL: {} when missing, values decoded."""
+        if codec is None:
+            return lambda r: r or {}
+        decode = codec.decode
+        return lambda r: {k.decode(): decode(v) for k, v in r.items()} if r else {}
+
+    def _cached(self, key, command, transform=None):
+        """
+        Read through the near cache.
+
+        On a miss the value and its PTTL come back in one round trip, so the
+        cached copy expires together with the Redis key.
+        """
+        cache = self.near_cache
+        value = cache.get(key)
+        if value is not MISSING:
+            return value
+        generation = cache.generation
+        pipe = self.client.pipeline(transaction=False)
+        getattr(pipe, command)(key)
+        pipe.pttl(key)
+        value, pttl = pipe.execute()
+        if transform:
+            value = transform(value)
+        cache.put(key, value, pttl, generation)
+        return value
+
+    def _evict(self, *names):
+        """Drop names from the near cache after this process writes them."""
+        if self.near_cache is not None:
+            for key in self._keys(names):
+                self.near_cache.discard(key)
 
     def _set_expire(self, name, seconds):
         """Helper to set expiration on a key."""
@@ -47,45 +605,405 @@ class AppSpace:
 
     # -------- Save and load simple values --------
 
-    def save(self, name, value, expire_seconds=None):
+    def save(self, name, value, expire_seconds=None, codec=None):
         """
         Save a value.
 
         expire_seconds: Auto-delete after this many seconds (optional) [web:36][web:21].
+        codec: Override the app's codec for this call (optional).
         """
-        self.client.set(self._key(name), value, ex=expire_seconds)
+        client, codec = self._codec_client(codec)
+        if codec is not None:
+            value = codec.encode(value)
+        self._evict(name)
+        client.set(self._key(name), value, ex=expire_seconds)
 
-    def load(self, name):
-        """Load a value. Returns None if not found."""
-        return self.client.get(self._key(name))
+    def load(self, name, codec=None, expire_seconds=None):
+        """
+        Load a value. Returns None if not found.
+
+        codec: Override the app's codec for this call (optional).
+        expire_seconds: Reset the key's expiration in the same command
+                        (GETEX), e.g. for sessions that stay alive while
+                        used (optional).
+        """
+        if expire_seconds:
+            client, codec = self._codec_client(codec)
+            reply = client.getex(self._key(name), ex=expire_seconds)
+            return self._reply(reply, self._decoder(codec))
+        if codec is None and self.near_cache is not None and not self._pipelined:
+            return self._cached(self._key(name), "get", self._decoder(self.codec))
+        client, codec = self._codec_client(codec)
+        return self._reply(client.get(self._key(name)), self._decoder(codec))
 
     def delete(self, name):
         """Delete a value."""
+        self._evict(name)
         self.client.delete(self._key(name))
 
     def exists(self, name):
         """Check if a value exists. Returns True or False."""
-        return self.client.exists(self._key(name)) > 0
+        return self._reply(self.client.exists(self._key(name)), lambda n: n > 0)
+
+    # -------- Counters --------
+
+    def incr(self, name, expire_seconds=None):
+        """
+        Add 1 to a counter, atomically. Missing counters start at 0.
+
+        expire_seconds: (Re)set the counter's expiration in the same round
+                        trip (optional).
+
+        Returns the new value.
+        """
+        return self.incr_by(name, 1, expire_seconds=expire_seconds)
+
+    def decr(self, name, expire_seconds=None):
+        """Subtract 1 from a counter, atomically. Returns the new value."""
+        return self.incr_by(name, -1, expire_seconds=expire_seconds)
+
+    def incr_by(self, name, amount, expire_seconds=None):
+        """
+        Add amount (int or float, can be negative) to a counter, atomically.
+
+        expire_seconds: (Re)set the counter's expiration in the same round
+                        trip, inside MULTI/EXEC (optional).
+
+        Counters are stored as plain numbers, so load() returns them as
+        strings on apps without a codec.
+
+        Example: incr_by("page_views", 10, expire_seconds=86400) -> 1510
+        """
+        key = self._key(name)
+        self._evict(name)
+        queue_ttl = expire_seconds and not self._pipelined
+        client = self.client.pipeline() if queue_ttl else self.client
+        if isinstance(amount, float):
+            reply = client.incrbyfloat(key, amount)
+        else:
+            reply = client.incrby(key, amount)
+        if not queue_ttl:
+            result = self._reply(reply)
+            self._set_expire(name, expire_seconds)
+            return result
+        client.expire(key, expire_seconds)
+        return client.execute()[0]
+
+    def write_behind(self, flush_ms=1000, flush_every=1000, expire_seconds=None):
+        """
+        Count in memory and send the totals to Redis in batches.
+
+        flush_ms: Send pending increments at least this often.
+        flush_every: Also send once this many increments are pending.
+        expire_seconds: (Re)set each counter's expiration on every flush (optional).
+
+        Good for hot counters hit thousands of times a second: each flush
+        costs one pipelined INCRBY per counter, not one command per hit.
+        Increments not yet flushed are lost if the process dies, so call
+        close() (or use a with block) on shutdown.
+
+        Example:
+            views = app.write_behind(flush_ms=500)
+            views.incr("page_views")
+        """
+        return CounterBuffer(
+            self,
+            flush_ms=flush_ms,
+            flush_every=flush_every,
+            expire_seconds=expire_seconds,
+        )
+
+    # -------- Rate limiting --------
+
+    def rate_limiter(self, limit, window_seconds, algorithm="fixed", prefix="rl"):
+        """
+        Get a rate limiter: at most limit requests per window_seconds per id.
+
+        algorithm: "fixed" (window counter), "sliding" (exact log of request
+                   times) or "token_bucket" (smooth refill, allows bursts).
+        prefix: Key prefix for the limiter's keys (key: "<prefix>:<id>").
+
+        Every check is one atomic Lua script call (EVALSHA).
+
+        Example:
+            limiter = app.rate_limiter(limit=5, window_seconds=10)
+            if limiter.check("user_456").allowed:
+                handle_request()
+        """
+        return RateLimiter(self, limit, window_seconds, algorithm, prefix)
+
+    # -------- Leaderboards --------
+
+    def leaderboard(self, name, highest_first=True):
+        """
+        Get a leaderboard stored as a sorted set under name.
+
+        highest_first: Rank the highest score first (False for e.g. race
+                       times, where lower is better).
+
+        Redis does the ranking, so updates are O(log n) and only the page
+        you ask for is sent back.
+
+        Example:
+            board = app.leaderboard("high_scores")
+            board.incr_score("Alice", 50)
+            for entry in board.top(10):
+                print(entry.rank, entry.member, entry.score)
+        """
+        return Leaderboard(self, name, highest_first)
+
+    # -------- Work queues --------
+
+    def work_queue(self, name, visibility_timeout=30, worker_id=None):
+        """
+        Get a reliable work queue stored under name.
+
+        visibility_timeout: Seconds a worker may hold a job before it is
+                            given to someone else.
+        worker_id: Name of this worker's processing list (optional; a
+                   unique one is made up). Use a fixed id if you want
+                   recover() to pick up jobs after a restart.
+
+        Jobs are only removed once acked, so a crashed worker's jobs are
+        handled again. On apps without a codec, job data is stored as text.
+
+        Example:
+            jobs = app.work_queue("emails")
+            jobs.enqueue("welcome:42")
+            jobs.run(send_email, workers=8)
+        """
+        return WorkQueue(self, name, visibility_timeout, worker_id)
+
+    # -------- Streams --------
+
+    def stream(self, name, maxlen=100_000):
+        """
+        Get a Redis Stream stored under name, for fan-out to consumer groups.
+
+        maxlen: Keep about this many messages (None: keep everything).
+
+        Every group sees every message, and the consumers in a group share
+        them, so adding consumers scales out the work.
+
+        Example:
+            events = app.stream("notifications")
+            events.publish({"user": "42", "text": "Welcome!"})
+            for message in events.consume("mailer", "worker-1", block=5):
+                send(message.fields)
+                events.ack("mailer", message.id)
+        """
+        return Stream(self, name, maxlen)
+
+    # -------- Sessions --------
+
+    def sessions(self, expire_seconds=3600, prefix="session"):
+        """
+        Get a session store whose sessions expire after expire_seconds
+        without use.
+
+        prefix: Key prefix for sessions and the per-user index.
+
+        Reading a session also restarts its expiration, in one round trip.
+
+        Example:
+            sessions = app.sessions(expire_seconds=1800)
+            sid = sessions.create("user_42", {"role": "admin"})
+            sessions.get(sid)            # {"role": "admin"}
+            sessions.revoke_user("user_42")
+        """
+        return SessionStore(self, expire_seconds, prefix)
+
+    # -------- Config and feature flags --------
+
+    def config(self, name="config", poll_seconds=5.0):
+        """
+        Get a config store: settings read from an in-process snapshot.
+
+        poll_seconds: Longest time a missed change notification can leave
+                      the snapshot stale (the version key is polled).
+
+        Every write through the store bumps a version and publishes it, so
+        other processes reload within milliseconds. Reads are plain dict
+        lookups. Call close() (or use a with block) when done.
+
+        Example:
+            flags = app.config("flags")
+            if flags.is_enabled("new_checkout"):
+                ...
+            flags.set(new_checkout="false", expected_version=flags.version)
+        """
+        return ConfigStore(self, name, poll_seconds)
+
+    # -------- Caching function results --------
+
+    def cached(
+        self,
+        ttl=300,
+        key=None,
+        codec="json",
+        lock_seconds=10,
+        wait_seconds=None,
+        stale_seconds=0,
+        early_refresh=0,
+        refresh_workers=4,
+    ):
+        """
+        Decorator that caches a function's results in Redis.
+
+        ttl: Seconds a result is kept.
+        key: Name for a call's result: a format string using the function's
+             arguments (e.g. "user:{user_id}") or a function taking the same
+             arguments. By default it is made from the function name and a
+             hash of the arguments (pass key for methods, since self's repr
+             usually differs between processes).
+        codec: How results are stored (default "json").
+        lock_seconds: How long one caller may hold the recompute lock.
+        wait_seconds: How long others wait for it before computing anyway
+                      (default: lock_seconds).
+        stale_seconds: Keep serving a result this long after ttl while it
+                       is recomputed on a background thread (stale while
+                       revalidate), so readers don't wait at expiry.
+        early_refresh: Refresh a little before ttl, at random, earlier for
+                       slow functions (XFetch; 1.0 is a good start, 0 is off).
+        refresh_workers: Threads for background refreshes.
+
+        When a result is missing, only one caller computes it: threads in
+        this process share its result, and other processes wait on a
+        short Redis lock and then read the stored value.
+
+        Example:
+            @app.cached(ttl=300, key="profile:{user_id}")
+            def get_profile(user_id):
+                return slow_query(user_id)
+
+            get_profile.invalidate("user_123")
+
+            # Never make readers wait for a hot key
+            @app.cached(ttl=60, stale_seconds=30, early_refresh=1.0)
+            def homepage():
+                return render()
+        """
+        return cached(
+            self,
+            ttl,
+            key,
+            codec,
+            lock_seconds=lock_seconds,
+            wait_seconds=wait_seconds,
+            stale_seconds=stale_seconds,
+            early_refresh=early_refresh,
+            refresh_workers=refresh_workers,
+        )
 
     # -------- Save and load dictionaries --------
 
-    def save_dict(self, name, data, expire_seconds=None):
+    def save_dict(self, name, data, expire_seconds=None, codec=None):
         """
         Save a dictionary (like user info, settings, etc).
 
         expire_seconds: Auto-delete after this many seconds (optional) [web:36][web:40].
+        codec: Override the app's codec for this call (optional). Each field
+               value is encoded on its own.
 
         Example: save_dict("user_42", {"name": "Bob", "age": 30}, expire_seconds=3600)
         """
-        self.client.hset(self._key(name), mapping=data)
-        self._set_expire(name, expire_seconds)
+        client, codec = self._codec_client(codec)
+        if codec is not None:
+            data = {field: codec.encode(value) for field, value in data.items()}
+        self._evict(name)
+        client.hset(self._key(name), mapping=data)
+        if expire_seconds:
+            client.expire(self._key(name), expire_seconds)
 
-    def load_dict(self, name):
+    def load_dict(self, name, codec=None):
         """
         Load a dictionary. Returns empty dict {} if not found.
+
+        codec: Override the app's codec for this call (optional).
+        """
+        if codec is None and self.near_cache is not None and not self._pipelined:
+            # Copy, so callers can change the dict without touching the cache
+            transform = self._dict_decoder(self.codec)
+            return dict(self._cached(self._key(name), "hgetall", transform))
+        client, codec = self._codec_client(codec)
+        return self._reply(client.hgetall(self._key(name)), self._dict_decoder(codec))
+
+    def load_fields(self, name, *fields):
+        """
+        Load only some fields of a dictionary (HMGET).
+
+        Returns a dict of field -> value, with None for missing fields.
+
+        Example: load_fields("settings", "theme", "lang") -> {"theme": "dark", "lang": None}
+        """
+        decode = self._decoder(self.codec)
+        return self._reply(
+            self.client.hmget(self._key(name), fields),
+            lambda values: dict(zip(fields, map(decode, values) if decode else values)),
+        )
+
+    def update_dict(self, name, mapping=None, /, **fields):
         """
-        result = self.client.hgetall(self._key(name))
-        return result if result else {}
+        Change some fields of a dictionary, leaving the others alone (HSET).
+
+        Pass the fields as a dict, as keyword arguments, or both.
+        The key's expiration is not changed.
+
+        Returns the number of fields that were added (not just changed).
+
+        Example: update_dict("settings", theme="light")
+        """
+        data = {**(mapping or {}), **fields}
+        if self.codec is not None:
+            data = {field: self.codec.encode(value) for field, value in data.items()}
+        self._evict(name)
+        return self._reply(self.client.hset(self._key(name), mapping=data))
+
+    def delete_fields(self, name, *fields):
+        """
+        Remove fields from a dictionary (HDEL).
+
+        Returns the number of fields removed.
+        """
+        self._evict(name)
+        return self._reply(self.client.hdel(self._key(name), *fields))
+
+    def dict_size(self, name):
+        """Number of fields in a dictionary (0 if not found)."""
+        return self._reply(self.client.hlen(self._key(name)))
+
+    def incr_field(self, name, field, amount=1):
+        """
+        Add to a number stored in a dictionary field, atomically.
+
+        amount: An int (HINCRBY) or a float (HINCRBYFLOAT). Can be negative.
+        Missing fields start at 0. Returns the new value.
+
+        Example: incr_field("scores", "Alice", 50) -> 1550
+        """
+        self._evict(name)
+        key = self._key(name)
+        if isinstance(amount, float):
+            return self._reply(self.client.hincrbyfloat(key, field, amount))
+        return self._reply(self.client.hincrby(key, field, amount))
+
+    def iter_dict(self, name, match=None, count=500):
+        """
+        Walk a large dictionary without loading it all at once (HSCAN).
+
+        match: Only fields matching this glob pattern (optional).
+        count: How many fields Redis looks at per HSCAN call.
+
+        Yields (field, value) pairs. A field may be seen twice if the
+        dictionary changes during the walk.
+        """
+        decode = self.codec.decode if self.codec is not None else None
+        for field, value in self.client.hscan_iter(
+            self._key(name), match=match, count=count
+        ):
+            if decode is not None:
+                field, value = field.decode(), decode(value)
+            yield field, value
 
     # -------- Save and load lists --------
 
@@ -97,12 +1015,65 @@ class AppSpace:
 
         Example: add_to_list("todos", "Buy milk", "Walk dog", expire_seconds=7200)
         """
+        if self.codec is not None:
+            values = [self.codec.encode(value) for value in values]
+        self._evict(name)
         self.client.rpush(self._key(name), *values)
         self._set_expire(name, expire_seconds)
 
-    def get_list(self, name):
-        """Get all items from a list. Returns empty list [] if not found."""
-        return self.client.lrange(self._key(name), 0, -1)
+    def get_list(self, name, start=0, stop=-1):
+        """
+        Get items from a list. Returns empty list [] if not found.
+
+        start/stop: Positions of the first and last item, both included.
+                    Negative positions count from the end (-1 is the last).
+                    By default the whole list is returned; for big lists
+                    use a window or iter_list().
+
+        Example: get_list("inbox", 0, 49) -> the first 50 items
+        """
+        return self._reply(
+            self.client.lrange(self._key(name), start, stop), self._list_decoder()
+        )
+
+    def list_length(self, name):
+        """Number of items in a list (0 if not found)."""
+        return self._reply(self.client.llen(self._key(name)))
+
+    def iter_list(self, name, chunk=500):
+        """
+        Walk a list chunk items at a time, without loading it all at once.
+
+        Items added or removed while walking can shift the windows.
+
+        Example:
+            for entry in app.iter_list("activity_log"):
+                print(entry)
+        """
+        decode = self._list_decoder()
+        key = self._key(name)
+        start = 0
+        while True:
+            items = decode(self.client.lrange(key, start, start + chunk - 1))
+            yield from items
+            if len(items) < chunk:
+                return
+            start += chunk
+
+    def pop_from_list(self, name, count=None):
+        """
+        Remove and return items from the front of a list.
+
+        count: How many items to pop at once (optional, needs Redis 6.2+).
+
+        Without count, returns one item or None if the list is empty.
+        With count, returns a list of up to count items ([] if empty).
+        """
+        self._evict(name)
+        reply = self.client.lpop(self._key(name), count)
+        if count is None:
+            return self._reply(reply, self._decoder(self.codec))
+        return self._reply(reply, self._list_decoder())
 
     def clear_list(self, name):
         """Remove all items from a list."""
@@ -119,7 +1090,7 @@ class AppSpace:
         - -1 if key exists but has no expiration
         - -2 if key does not exist
         """
-        return self.client.ttl(self._key(name))
+        return self._reply(self.client.ttl(self._key(name)))
 
     def set_expire(self, name, seconds):
         """
@@ -127,8 +1098,10 @@ class AppSpace:
 
         Returns True if expiration was set, False if key doesn't exist.
         """
-        result = self.client.expire(self._key(name), seconds)
-        return result == 1
+        self._evict(name)
+        return self._reply(
+            self.client.expire(self._key(name), seconds), lambda r: r == 1
+        )
 
     def remove_expire(self, name):
         """
@@ -136,26 +1109,230 @@ class AppSpace:
 
         Returns True if expiration was removed, False if key doesn't exist.
         """
-        result = self.client.persist(self._key(name))
-        return result == 1
+        self._evict(name)
+        return self._reply(self.client.persist(self._key(name)), lambda r: r == 1)
+
+    # -------- Bulk operations --------
+
+    def load_many(self, names, chunk_size=500):
+        """
+        Load many values at once (MGET).
+
+        Returns a dict of name -> value, with None for missing names.
+        On a cluster, names are grouped by slot into one pipeline.
+
+        Example: load_many(["a", "b"]) -> {"a": "1", "b": None}
+        """
+        names = list(names)
+        result = {}
+        for chunk in _chunks(names, chunk_size):
+            if self._cluster:
+                values = cluster.mget(self.client, self._keys(chunk))
+            else:
+                values = self.client.mget(self._keys(chunk))
+            if self.codec is not None:
+                values = map(self._decoder(self.codec), values)
+            result.update(zip(chunk, values))
+        return result
+
+    def save_many(self, mapping, expire_seconds=None, chunk_size=500):
+        """
+        Save many values at once (MSET).
+
+        expire_seconds: Auto-delete every key after this many seconds (optional).
+                        Sent as one pipelined SET per key, since MSET has no TTL.
+
+        Example: save_many({"a": "1", "b": "2"}, expire_seconds=60)
+        """
+        items = list(mapping.items())
+        if self.codec is not None:
+            items = [(name, self.codec.encode(value)) for name, value in items]
+        self._evict(*mapping)
+        for chunk in _chunks(items, chunk_size):
+            keys = self._keys(name for name, _ in chunk)
+            if not expire_seconds:
+                values = {k: v for k, (_, v) in zip(keys, chunk)}
+                if self._cluster:
+                    cluster.mset(self.client, values)
+                else:
+                    self.client.mset(values)
+                continue
+            pipe = self.client.pipeline(transaction=False)
+            for key, (_, value) in zip(keys, chunk):
+                pipe.set(key, value, ex=expire_seconds)
+            pipe.execute()
+
+    def load_dicts(self, names, chunk_size=500):
+        """
+        Load many dictionaries at once (pipelined HGETALL).
+
+        Returns a dict of name -> dict, with {} for missing names.
+        """
+        names = list(names)
+        decode = self._dict_decoder(self.codec)
+        result = {}
+        for chunk in _chunks(names, chunk_size):
+            pipe = self.client.pipeline(transaction=False)
+            for key in self._keys(chunk):
+                pipe.hgetall(key)
+            result.update(zip(chunk, map(decode, pipe.execute())))
+        return result
+
+    def exists_many(self, names, chunk_size=500):
+        """
+        Check many keys at once (pipelined EXISTS).
+
+        Returns a dict of name -> True/False.
+        """
+        names = list(names)
+        result = {}
+        for chunk in _chunks(names, chunk_size):
+            pipe = self.client.pipeline(transaction=False)
+            for key in self._keys(chunk):
+                pipe.exists(key)
+            result.update((n, r > 0) for n, r in zip(chunk, pipe.execute()))
+        return result
+
+    # -------- Batching --------
+
+    def batch(self, transaction=False, flush_every=None):
+        """
+        Queue operations and send them to Redis in one round trip.
+
+        transaction: Run the batch atomically with MULTI/EXEC (optional).
+        flush_every: Send queued commands every N commands so huge batches
+                     don't pile up in memory (optional).
+
+        Example:
+            with app.batch() as b:
+                b.save("status", "ok")
+                user = b.load_dict("user_42")
+            print(user.value)
+        """
+        return Batch(self, transaction=transaction, flush_every=flush_every)
 
     # -------- Utility --------
 
+    def iter_keys(self, match=None, count=1000):
+        """
+        Walk the keys of this app without blocking Redis (SCAN).
+
+        match: Only names matching this glob pattern, e.g. "user_*" (optional).
+        count: How many keys Redis looks at per SCAN call.
+
+        Yields key names with the app prefix removed. A key that is added or
+        removed during the walk may or may not show up.
+        """
+        yield from self._names(
+            self.client.scan_iter(match=f"{self._prefix}{match or '*'}", count=count)
+        )
+
+    def _names(self, keys):
+        """Strip the app prefix from full keys (bytes or str)."""
+        cut = len(self._prefix)
+        for key in keys:
+            if isinstance(key, bytes):
+                key = key.decode()
+            yield key[cut:]
+
+    def _needs_one_slot(self, feature):
+        """
+        Refuse a feature whose Lua scripts touch several of the app's keys
+        (some named in ARGV) when those keys may be on different servers.
+        """
+        if self._fan_out and not self._hash_tag:
+            raise ValueError(
+                f"{feature} need the app's keys in one slot on a cluster or "
+                "shards; create the app with hash_tag=True"
+            )
+
     def list_all(self):
-        """List all keys for this app."""
-        pattern = f"{self.app_name}:*"
-        return [
-            key.replace(f"{self.app_name}:", "") for key in self.client.keys(pattern)
-        ]
+        """
+        List all keys for this app.
+
+        On a cluster or shards, every server is scanned at the same time.
+        """
+        if self._fan_out:
+            match = f"{self._prefix}*"
+            found = cluster.each_primary(
+                self.client,
+                lambda node: list(cluster.scan_node(self.client, node, match, 1000)),
+            )
+            keys = (key for keys in found for key in keys)
+        else:
+            keys = self.client.scan_iter(match=f"{self._prefix}*", count=1000)
+        # SCAN may repeat a key while the keyspace is being resized
+        return list(dict.fromkeys(self._names(keys)))
 
-    def delete_all(self):
+    def delete_all(self, chunk_size=1000, progress=None):
         """
         Delete all keys for this app.
 
+        Keys are found with SCAN and removed chunk_size at a time with UNLINK,
+        so Redis frees the memory in the background. On a cluster or shards,
+        every server is scanned at the same time (and on a cluster each
+        chunk is unlinked slot by slot).
+
+        progress: Called with the running total after each chunk (optional).
+                  On a cluster or shards it is called from the scanning
+                  threads.
+
         Returns the number of keys deleted.
         """
-        pattern = f"{self.app_name}:*"
-        keys = self.client.keys(pattern)
-        if keys:
-            return self.client.delete(*keys)
-        return 0
+        match = f"{self._prefix}*"
+        deleted = 0
+        lock = threading.Lock()
+
+        def unlinked(count):
+            nonlocal deleted
+            with lock:
+                deleted += count
+                if progress:
+                    progress(deleted)
+
+        if self._fan_out:
+            cluster.each_primary(
+                self.client,
+                lambda node: self._unlink_scanned(
+                    cluster.scan_node(self.client, node, match, chunk_size),
+                    chunk_size,
+                    unlinked,
+                ),
+            )
+        else:
+            self._unlink_scanned(
+                self.client.scan_iter(match=match, count=chunk_size),
+                chunk_size,
+                unlinked,
+            )
+        return deleted
+
+    def _unlink_scanned(self, keys, chunk_size, unlinked):
+        """UNLINK full keys chunk_size at a time, reporting each count."""
+        chunk = []
+        for key in keys:
+            chunk.append(key)
+            if len(chunk) >= chunk_size:
+                unlinked(self._unlink_chunk(chunk))
+                chunk = []
+        if chunk:
+            unlinked(self._unlink_chunk(chunk))
+
+    def _unlink_chunk(self, keys):
+        """UNLINK one chunk of full keys."""
+        if self.near_cache is not None:
+            self.near_cache.invalidate(
+                [key.decode() if isinstance(key, bytes) else key for key in keys]
+            )
+        if self._cluster:
+            return cluster.unlink(self.client, keys)
+        return self.client.unlink(*keys)
+
+
+for _name in READ_ONLY:
+    setattr(AppSpace, _name, consistent(getattr(AppSpace, _name)))
+
+for _name in INSTRUMENTED:
+    setattr(AppSpace, _name, instrumented(getattr(AppSpace, _name)))
+
+del _name
@@ -0,0 +1,429 @@
+"""
+Asyncio version of EasyRedis, built on redis.asyncio.
+
+Same API as EasyRedis/AppSpace, but every method is awaited:
+
+    from easy_redis.aio import AsyncEasyRedis
+
+    db = AsyncEasyRedis()
+    app = db.app("myapp")
+    await app.save("name", "alice")
+    name = await app.load("name")
+"""
+
+import redis.asyncio as aioredis
+
+from . import AppSpace, _chunks
+from .batch import Batch
+
+
+class AsyncEasyRedis:
+    """
+    Asyncio Redis wrapper for RAD apps.
+
+    All coroutines share one connection pool. When every connection is
+    busy, callers wait for a free one instead of opening more.
+    """
+
+    def __init__(self, host="localhost", port=6379, password=None, max_connections=50):
+        """Connect to Redis. Works out of the box with defaults."""
+        self.pool = aioredis.BlockingConnectionPool(
+            host=host,
+            port=port,
+            password=password,
+            max_connections=max_connections,
+            decode_responses=True,
+        )
+        self.client = aioredis.Redis(connection_pool=self.pool)
+
+    def app(self, app_name):
+        """Get a simple namespace for your app."""
+        return AsyncAppSpace(self.client, app_name)
+
+    async def close(self):
+        """Close the client and every pooled connection."""
+        # aclose() is new in redis-py 5.0.1; older versions call it close()
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+        await self.pool.disconnect()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class AsyncAppSpace:
+    """
+    Your app's own Redis space, for asyncio code.
+    All keys are automatically prefixed with your app name.
+    """
+
+    # True while bound to a pipeline inside batch()
+    _pipelined = False
+
+    # Key building and reply handling work the same as in AppSpace
+    _key = AppSpace._key
+    _keys = AppSpace._keys
+    _reply = AppSpace._reply
+
+    def __init__(self, client, app_name):
+        self.client = client
+        self.app_name = app_name
+        self._prefix = f"{app_name}:"
+
+    async def _set_expire(self, name, seconds):
+        """Helper to set expiration on a key."""
+        if seconds:
+            await self.client.expire(self._key(name), seconds)
+
+    # -------- Save and load simple values --------
+
+    async def save(self, name, value, expire_seconds=None):
+        """
+        Save a value.
+
+        expire_seconds: Auto-delete after this many seconds (optional).
+        """
+        await self.client.set(self._key(name), value, ex=expire_seconds)
+
+    async def load(self, name):
+        """Load a value. Returns None if not found."""
+        return self._reply(await self.client.get(self._key(name)))
+
+    async def delete(self, name):
+        """Delete a value."""
+        await self.client.delete(self._key(name))
+
+    async def exists(self, name):
+        """Check if a value exists. Returns True or False."""
+        return self._reply(await self.client.exists(self._key(name)), lambda n: n > 0)
+
+    # -------- Counters --------
+
+    async def incr(self, name, expire_seconds=None):
+        """Add 1 to a counter, atomically. Returns the new value."""
+        return await self.incr_by(name, 1, expire_seconds=expire_seconds)
+
+    async def decr(self, name, expire_seconds=None):
+        """Subtract 1 from a counter, atomically. Returns the new value."""
+        return await self.incr_by(name, -1, expire_seconds=expire_seconds)
+
+    async def incr_by(self, name, amount, expire_seconds=None):
+        """
+        Add amount (int or float, can be negative) to a counter, atomically.
+
+        expire_seconds: (Re)set the counter's expiration in the same round
+                        trip, inside MULTI/EXEC (optional).
+        """
+        key = self._key(name)
+        queue_ttl = expire_seconds and not self._pipelined
+        client = self.client.pipeline() if queue_ttl else self.client
+        if isinstance(amount, float):
+            reply = client.incrbyfloat(key, amount)
+        else:
+            reply = client.incrby(key, amount)
+        if not queue_ttl:
+            result = self._reply(await reply)
+            await self._set_expire(name, expire_seconds)
+            return result
+        client.expire(key, expire_seconds)
+        return (await client.execute())[0]
+
+    # -------- Save and load dictionaries --------
+
+    async def save_dict(self, name, data, expire_seconds=None):
+        """
+        Save a dictionary (like user info, settings, etc).
+
+        expire_seconds: Auto-delete after this many seconds (optional).
+        """
+        await self.client.hset(self._key(name), mapping=data)
+        await self._set_expire(name, expire_seconds)
+
+    async def load_dict(self, name):
+        """
+        Load a dictionary. Returns empty dict {} if not found.
+        """
+        return self._reply(
+            await self.client.hgetall(self._key(name)), lambda r: r or {}
+        )
+
+    async def load_fields(self, name, *fields):
+        """
+        Load only some fields of a dictionary (HMGET).
+
+        Returns a dict of field -> value, with None for missing fields.
+        """
+        return self._reply(
+            await self.client.hmget(self._key(name), fields),
+            lambda values: dict(zip(fields, values)),
+        )
+
+    async def update_dict(self, name, mapping=None, /, **fields):
+        """
+        Change some fields of a dictionary, leaving the others alone (HSET).
+
+        Returns the number of fields that were added (not just changed).
+        """
+        data = {**(mapping or {}), **fields}
+        return self._reply(await self.client.hset(self._key(name), mapping=data))
+
+    async def delete_fields(self, name, *fields):
+        """Remove fields from a dictionary (HDEL). Returns the number removed."""
+        return self._reply(await self.client.hdel(self._key(name), *fields))
+
+    async def dict_size(self, name):
+        """Number of fields in a dictionary (0 if not found)."""
+        return self._reply(await self.client.hlen(self._key(name)))
+
+    async def incr_field(self, name, field, amount=1):
+        """
+        Add to a number stored in a dictionary field, atomically.
+
+        amount: An int (HINCRBY) or a float (HINCRBYFLOAT). Returns the new value.
+        """
+        key = self._key(name)
+        if isinstance(amount, float):
+            return self._reply(await self.client.hincrbyfloat(key, field, amount))
+        return self._reply(await self.client.hincrby(key, field, amount))
+
+    async def iter_dict(self, name, match=None, count=500):
+        """Walk a large dictionary with HSCAN. Yields (field, value) pairs."""
+        async for field, value in self.client.hscan_iter(
+            self._key(name), match=match, count=count
+        ):
+            yield field, value
+
+    # -------- Save and load lists --------
+
+    async def add_to_list(self, name, *values, expire_seconds=None):
+        """
+        Add items to a list.
+
+        expire_seconds: Set expiration on the entire list (optional).
+        """
+        await self.client.rpush(self._key(name), *values)
+        await self._set_expire(name, expire_seconds)
+
+    async def get_list(self, name, start=0, stop=-1):
+        """
+        Get items from a list. Returns empty list [] if not found.
+
+        start/stop: Positions of the first and last item, both included.
+                    Negative positions count from the end (-1 is the last).
+        """
+        return self._reply(
+            await self.client.lrange(self._key(name), start, stop),
+            lambda items: items or [],
+        )
+
+    async def list_length(self, name):
+        """Number of items in a list (0 if not found)."""
+        return self._reply(await self.client.llen(self._key(name)))
+
+    async def iter_list(self, name, chunk=500):
+        """Walk a list chunk items at a time, without loading it all at once."""
+        key = self._key(name)
+        start = 0
+        while True:
+            items = await self.client.lrange(key, start, start + chunk - 1)
+            for item in items:
+                yield item
+            if len(items) < chunk:
+                return
+            start += chunk
+
+    async def pop_from_list(self, name, count=None):
+        """
+        Remove and return items from the front of a list.
+
+        Without count, returns one item or None if the list is empty.
+        With count, returns a list of up to count items ([] if empty).
+        """
+        reply = await self.client.lpop(self._key(name), count)
+        if count is None:
+            return self._reply(reply)
+        return self._reply(reply, lambda items: items or [])
+
+    async def clear_list(self, name):
+        """Remove all items from a list."""
+        await self.delete(name)
+
+    # -------- TTL / Expiration helpers --------
+
+    async def get_ttl(self, name):
+        """
+        Get remaining seconds until key expires.
+
+        Returns -1 if the key has no expiration, -2 if it does not exist.
+        """
+        return self._reply(await self.client.ttl(self._key(name)))
+
+    async def set_expire(self, name, seconds):
+        """
+        Set or update expiration on an existing key.
+
+        Returns True if expiration was set, False if key doesn't exist.
+        """
+        return self._reply(
+            await self.client.expire(self._key(name), seconds), lambda r: r == 1
+        )
+
+    async def remove_expire(self, name):
+        """
+        Remove expiration from a key (make it permanent).
+
+        Returns True if expiration was removed, False if key doesn't exist.
+        """
+        return self._reply(await self.client.persist(self._key(name)), lambda r: r == 1)
+
+    # -------- Bulk operations --------
+
+    async def load_many(self, names, chunk_size=500):
+        """Load many values at once (MGET). Missing names map to None."""
+        names = list(names)
+        result = {}
+        for chunk in _chunks(names, chunk_size):
+            result.update(zip(chunk, await self.client.mget(self._keys(chunk))))
+        return result
+
+    async def save_many(self, mapping, expire_seconds=None, chunk_size=500):
+        """
+        Save many values at once (MSET).
+
+        expire_seconds: Auto-delete every key after this many seconds (optional).
+        """
+        items = list(mapping.items())
+        for chunk in _chunks(items, chunk_size):
+            keys = self._keys(name for name, _ in chunk)
+            if not expire_seconds:
+                await self.client.mset({k: v for k, (_, v) in zip(keys, chunk)})
+                continue
+            pipe = self.client.pipeline(transaction=False)
+            for key, (_, value) in zip(keys, chunk):
+                pipe.set(key, value, ex=expire_seconds)
+            await pipe.execute()
+
+    async def load_dicts(self, names, chunk_size=500):
+        """Load many dictionaries at once (pipelined HGETALL)."""
+        names = list(names)
+        result = {}
+        for chunk in _chunks(names, chunk_size):
+            pipe = self.client.pipeline(transaction=False)
+            for key in self._keys(chunk):
+                pipe.hgetall(key)
+            result.update((n, r or {}) for n, r in zip(chunk, await pipe.execute()))
+        return result
+
+    async def exists_many(self, names, chunk_size=500):
+        """Check many keys at once (pipelined EXISTS)."""
+        names = list(names)
+        result = {}
+        for chunk in _chunks(names, chunk_size):
+            pipe = self.client.pipeline(transaction=False)
+            for key in self._keys(chunk):
+                pipe.exists(key)
+            result.update((n, r > 0) for n, r in zip(chunk, await pipe.execute()))
+        return result
+
+    # -------- Batching --------
+
+    def batch(self, transaction=False, flush_every=None):
+        """
+        Queue operations and send them to Redis in one round trip.
+
+        Example:
+            async with app.batch() as b:
+                await b.save("status", "ok")
+                user = await b.load_dict("user_42")
+            print(user.value)
+        """
+        return AsyncBatch(self, transaction=transaction, flush_every=flush_every)
+
+    # -------- Utility --------
+
+    async def iter_keys(self, match=None, count=1000):
+        """Walk the keys of this app with SCAN. Yields names without the prefix."""
+        prefix = self._key("")
+        cut = len(prefix)
+        async for key in self.client.scan_iter(
+            match=f"{prefix}{match or '*'}", count=count
+        ):
+            yield key[cut:]
+
+    async def list_all(self):
+        """List all keys for this app."""
+        return list(dict.fromkeys([name async for name in self.iter_keys()]))
+
+    async def delete_all(self, chunk_size=1000, progress=None):
+        """
+        Delete all keys for this app, chunk_size at a time with UNLINK.
+
+        progress: Called with the running total after each chunk (optional).
+
+        Returns the number of keys deleted.
+        """
+        deleted = 0
+        chunk = []
+        async for key in self.client.scan_iter(
+            match=f"{self._key('')}*", count=chunk_size
+        ):
+            chunk.append(key)
+            if len(chunk) >= chunk_size:
+                deleted += await self._unlink_chunk(chunk, deleted, progress)
+                chunk = []
+        if chunk:
+            deleted += await self._unlink_chunk(chunk, deleted, progress)
+        return deleted
+
+    async def _unlink_chunk(self, keys, deleted, progress):
+        """UNLINK one chunk of full keys and report progress."""
+        count = await self.client.unlink(*keys)
+        if progress:
+            progress(deleted + count)
+        return count
+
+
+class AsyncBatch(Batch):
+    """
+    Async version of Batch. Use with "async with" and await each call:
+
+        async with app.batch() as b:
+            await b.save("a", "1")
+            name = await b.load("username")
+    """
+
+    def __enter__(self):
+        raise TypeError("Use 'async with app.batch()' with AsyncAppSpace")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.flush()
+        else:
+            # Something went wrong in the block - don't send half a batch
+            await self._pipe.reset()
+            self._waiting = []
+        return False
+
+    def __getattr__(self, name):
+        method = self._batchable(name)
+
+        async def queue(*args, **kwargs):
+            result = self._queue(await method(*args, **kwargs))
+            if self._due():
+                await self.flush()
+            return result
+
+        queue.__name__ = name
+        return queue
+
+    async def flush(self):
+        """Send everything queued so far."""
+        waiting, self._waiting = self._waiting, []
+        replies = await self._pipe.execute() if len(self._pipe) else []
+        self._resolve(waiting, replies)
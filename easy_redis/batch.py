@@ -0,0 +1,180 @@
+"""Pipelined batches for AppSpace - many operations, one round trip."""
+
+import copy
+
+from .metrics import Operation, observe
+
+# AppSpace methods that can be queued inside a batch
+BATCHABLE = frozenset(
+    [
+        "save",
+        "load",
+        "delete",
+        "exists",
+        "incr",
+        "decr",
+        "incr_by",
+        "save_dict",
+        "load_dict",
+        "load_fields",
+        "update_dict",
+        "delete_fields",
+        "dict_size",
+        "incr_field",
+        "add_to_list",
+        "get_list",
+        "list_length",
+        "pop_from_list",
+        "clear_list",
+        "get_ttl",
+        "set_expire",
+        "remove_expire",
+    ]
+)
+
+
+class Pending:
+    """
+    Marker returned by AppSpace methods while they are bound to a pipeline.
+
+    Remembers which queued command holds the answer and how to turn the
+    raw Redis reply into the value the normal method would have returned.
+    """
+
+    __slots__ = ("index", "transform")
+
+    def __init__(self, index, transform=None):
+        self.index = index
+        self.transform = transform
+
+    def resolve(self, replies):
+        """Pick this command's reply out of the pipeline replies."""
+        reply = replies[self.index]
+        return self.transform(reply) if self.transform else reply
+
+
+class BatchResult:
+    """
+    The future result of one queued operation.
+
+    Its value is filled in once the batch is sent (on exit, or on an
+    automatic flush).
+    """
+
+    __slots__ = ("ready", "_value")
+
+    def __init__(self):
+        self.ready = False
+        self._value = None
+
+    @property
+    def value(self):
+        """The operation's result. Raises RuntimeError if not sent yet."""
+        if not self.ready:
+            raise RuntimeError("Batch has not been sent yet")
+        return self._value
+
+    def _set(self, value):
+        self._value = value
+        self.ready = True
+
+    def __repr__(self):
+        if not self.ready:
+            return "<BatchResult pending>"
+        return f"<BatchResult {self._value!r}>"
+
+
+class Batch:
+    """
+    Queue AppSpace operations and send them in one pipeline.
+
+    Use through AppSpace.batch():
+
+        with app.batch() as b:
+            b.save("a", "1")
+            name = b.load("username")
+        print(name.value, b.results)
+
+    Every call returns a BatchResult. Once the batch is sent, b.results
+    holds all values in the order the calls were made.
+    """
+
+    def __init__(self, app, transaction=False, flush_every=None):
+        self._pipe = app.client.pipeline(transaction=transaction)
+        # Same app, but every command goes into the pipeline
+        self._space = copy.copy(app)
+        self._space.client = self._pipe
+        self._space._pipelined = True
+        self._flush_every = flush_every
+        self._waiting = []
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            # Something went wrong in the block - don't send half a batch
+            self._pipe.reset()
+            self._waiting = []
+        return False
+
+    def __getattr__(self, name):
+        method = self._batchable(name)
+
+        def queue(*args, **kwargs):
+            result = self._queue(method(*args, **kwargs))
+            if self._due():
+                self.flush()
+            return result
+
+        queue.__name__ = name
+        return queue
+
+    def __len__(self):
+        """Number of commands queued and not yet sent."""
+        return len(self._pipe)
+
+    def flush(self):
+        """
+        Send everything queued so far.
+
+        Called automatically on exit, and every flush_every commands.
+        With transaction=True each flush is its own MULTI/EXEC block.
+        """
+        waiting, self._waiting = self._waiting, []
+        replies = self._execute(len(waiting)) if len(self._pipe) else []
+        self._resolve(waiting, replies)
+
+    def _execute(self, operations):
+        """Send the pipeline, reporting it to the app's hooks as "batch"."""
+        hooks = self._space._hooks
+        if hooks is None:
+            return self._pipe.execute()
+        op = Operation(self._space.app_name, "batch", operations)
+        return observe(hooks, op, self._pipe.execute)
+
+    def _batchable(self, name):
+        """Look up a method of the pipelined space, if it can be queued."""
+        if name not in BATCHABLE:
+            raise AttributeError(f"'{name}' can't be used inside a batch")
+        return getattr(self._space, name)
+
+    def _queue(self, reply):
+        """Remember one operation's reply until the pipeline is sent."""
+        result = BatchResult()
+        self._waiting.append((result, reply))
+        return result
+
+    def _due(self):
+        """True when enough commands are queued for an automatic flush."""
+        return bool(self._flush_every) and len(self._pipe) >= self._flush_every
+
+    def _resolve(self, waiting, replies):
+        """Fill in the futures once the pipeline replies are back."""
+        for result, reply in waiting:
+            value = reply.resolve(replies) if isinstance(reply, Pending) else reply
+            result._set(value)
+            self.results.append(value)
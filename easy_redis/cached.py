@@ -0,0 +1,292 @@
+"""
+Cache-aside for function results, with stampede protection.
+
+When a cached result is missing, only one caller computes it: callers in
+the same process wait on the first caller's result, and other processes
+wait on a short Redis lock (SET NX PX) and then read what it stored.
+
+With stale_seconds or early_refresh, values carry a logical expiry and
+are refreshed on a background thread while the old value keeps being
+served, so readers never wait on a hot key.
+"""
+
+import functools
+import hashlib
+import inspect
+import math
+import os
+import random
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Stale-while-revalidate values start with this header, followed by the
+# logical expiry (Unix time) and the seconds the last compute took
+SWR_MAGIC = b"\x00SW"
+SWR_HEADER = struct.Struct(">dd")
+
+# KEYS value, lock | ARGV token, lock_ms
+# {1, value} if cached, {2} if we now hold the lock, {0} if someone else does
+GET_OR_LOCK = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    return {1, value}
+end
+if redis.call('SET', KEYS[2], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return {2}
+end
+return {0}
+"""
+
+# KEYS value, lock | ARGV data, ttl_ms, token
+# Store the result and release the lock if we still hold it
+STORE = """
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+if redis.call('GET', KEYS[2]) == ARGV[3] then
+    redis.call('DEL', KEYS[2])
+end
+return 1
+"""
+
+# KEYS lock | ARGV token
+RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class CachedFunction:
+    """
+    The caching behind AppSpace.cached(). Reach it as wrapper.cache.
+
+    Counters (see stats()): hits are results read from Redis, misses are
+    calls to the function, and waits are callers that got another
+    caller's result instead of computing it themselves. stale counts hits
+    past the logical expiry, and refreshes counts background recomputes.
+    """
+
+    def __init__(
+        self,
+        app,
+        func,
+        ttl=300,
+        key=None,
+        codec="json",
+        lock_seconds=10,
+        wait_seconds=None,
+        stale_seconds=0,
+        early_refresh=0,
+        refresh_workers=4,
+    ):
+        app._needs_one_slot("Cached functions")
+        self.app = app
+        self.func = func
+        self.ttl = ttl
+        self.key = key
+        self.client, self.codec = app._codec_client(codec)
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = lock_seconds if wait_seconds is None else wait_seconds
+        self.stale_seconds = stale_seconds
+        self.early_refresh = early_refresh
+        self.refresh_workers = refresh_workers
+        # Store a logical expiry with each value and refresh in the background
+        self._revalidate = bool(stale_seconds or early_refresh)
+        self._refreshing = set()
+        self._pool = None
+        self._signature = inspect.signature(func) if isinstance(key, str) else None
+        self._get_or_lock = self.client.register_script(GET_OR_LOCK)
+        self._store = self.client.register_script(STORE)
+        self._release = self.client.register_script(RELEASE)
+        # Redis key -> Future of the call computing it in this process
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.stale = 0
+        self.refreshes = 0
+
+    def __call__(self, *args, **kwargs):
+        key = self.app._key(self.cache_name(*args, **kwargs))
+        data = self.client.get(key)
+        if data is None:
+            return self._single_flight(key, args, kwargs)
+        self.hits += 1
+        value, expires_at, delta = self._unpack(data)
+        if not self._revalidate:
+            return value
+        now = time.time()
+        if now >= expires_at:
+            self.stale += 1
+        if self._should_refresh(now, expires_at, delta):
+            self._refresh_later(key, args, kwargs)
+        return value
+
+    def cache_name(self, *args, **kwargs):
+        """The name (inside the app) results for these arguments use."""
+        if callable(self.key):
+            return self.key(*args, **kwargs)
+        if self.key is not None:
+            bound = self._signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return self.key.format(**bound.arguments)
+        call = repr((args, sorted(kwargs.items()))).encode()
+        digest = hashlib.sha1(call).hexdigest()
+        return f"cache:{self.func.__module__}.{self.func.__qualname__}:{digest}"
+
+    def invalidate(self, *args, **kwargs):
+        """Drop the cached result for these arguments."""
+        self.app.delete(self.cache_name(*args, **kwargs))
+
+    def stats(self):
+        """Counters for tuning: hits, misses and waits."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "stale": self.stale,
+            "refreshes": self.refreshes,
+        }
+
+    def _single_flight(self, key, args, kwargs):
+        """Let one caller per process fetch; the rest wait for its result."""
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+        if not leader:
+            self.waits += 1
+            return future.result()
+        try:
+            value = self._fetch(key, args, kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def _fetch(self, key, args, kwargs):
+        """Compute under a Redis lock, or wait for whoever holds it."""
+        lock = key + ":lock"
+        token = os.urandom(8).hex()
+        deadline = time.monotonic() + self.wait_seconds
+        delay = 0.01
+        while True:
+            reply = self._get_or_lock(
+                keys=[key, lock], args=[token, int(self.lock_seconds * 1000)]
+            )
+            if reply[0] == 1:
+                self.waits += 1
+                return self._unpack(reply[1])[0]
+            if reply[0] == 2:
+                break
+            if time.monotonic() >= deadline:
+                # The holder is too slow; compute without the lock
+                token = None
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        return self._compute(key, lock, token, args, kwargs)
+
+    def _compute(self, key, lock, token, args, kwargs):
+        """Call the function, store its result and release the lock."""
+        self.misses += 1
+        start = time.monotonic()
+        try:
+            value = self.func(*args, **kwargs)
+        except BaseException:
+            if token is not None:
+                self._release(keys=[lock], args=[token])
+            raise
+        ttl = self.ttl + self.stale_seconds
+        self._store(
+            keys=[key, lock],
+            args=[
+                self._pack(value, time.monotonic() - start),
+                int(ttl * 1000),
+                token or "",
+            ],
+        )
+        return value
+
+    # -------- Stale-while-revalidate --------
+
+    def _should_refresh(self, now, expires_at, delta):
+        """
+        XFetch: refresh a little before expiry, earlier for slow computes,
+        at a random moment so processes don't all refresh together.
+        """
+        if not self.early_refresh:
+            return now >= expires_at
+        gap = -delta * self.early_refresh * math.log(1.0 - random.random())
+        return now + gap >= expires_at
+
+    def _refresh_later(self, key, args, kwargs):
+        """Recompute on the refresh pool, once per key per process."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.refresh_workers,
+                    thread_name_prefix="easy-redis-refresh",
+                )
+        self._pool.submit(self._refresh, key, args, kwargs)
+
+    def _refresh(self, key, args, kwargs):
+        """Background recompute; skipped if another process is on it."""
+        lock = key + ":lock"
+        token = os.urandom(8).hex()
+        lock_ms = int(self.lock_seconds * 1000)
+        try:
+            if self.client.set(lock, token, nx=True, px=lock_ms):
+                self._compute(key, lock, token, args, kwargs)
+                self.refreshes += 1
+        except Exception:
+            # Keep serving the stale value until it really expires
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _pack(self, value, delta):
+        data = self.codec.encode(value)
+        if not self._revalidate:
+            return data
+        return SWR_MAGIC + SWR_HEADER.pack(time.time() + self.ttl, delta) + data
+
+    def _unpack(self, data):
+        """Split a stored value into (value, logical expiry, compute seconds)."""
+        start = len(SWR_MAGIC)
+        if data[:start] != SWR_MAGIC:
+            # Stored without revalidation: treat it as fresh
+            return self.codec.decode(data), math.inf, 0.0
+        expires_at, delta = SWR_HEADER.unpack_from(data, start)
+        return self.codec.decode(data[start + SWR_HEADER.size :]), expires_at, delta
+
+
+def cached(app, ttl=300, key=None, codec="json", **options):
+    """Build the decorator returned by AppSpace.cached()."""
+
+    def decorator(func):
+        cache = CachedFunction(app, func, ttl, key, codec, **options)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache(*args, **kwargs)
+
+        wrapper.cache = cache
+        wrapper.invalidate = cache.invalidate
+        wrapper.cache_name = cache.cache_name
+        return wrapper
+
+    return decorator
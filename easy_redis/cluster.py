@@ -0,0 +1,96 @@
+"""
+Redis Cluster helpers for AppSpace.
+
+In a cluster every key lives in one of 16384 hash slots, and a command
+naming several keys only works when they share a slot. The helpers below
+split multi-key commands by slot and send the pieces in one pipeline, and
+run scans on every primary at once.
+
+Apps with hash tags ("{app}:name") keep all their keys in one slot, so
+for them each helper sends a single plain command.
+
+redis-py refuses pipe.mget() and pipe.mset() in cluster pipelines since it
+can't know the keys share a slot; the helpers group them first, so they
+queue the commands with execute_command().
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from redis.crc import key_slot
+
+from .metrics import parallel
+
+
+def by_slot(keys):
+    """Group the positions of keys by hash slot: [[0, 3], [1], [2, 4]]."""
+    groups = {}
+    for i, key in enumerate(keys):
+        slot = key_slot(key.encode() if isinstance(key, str) else key)
+        groups.setdefault(slot, []).append(i)
+    return list(groups.values())
+
+
+def mget(client, keys):
+    """MGET keys from any slots. Returns the values in key order."""
+    groups = by_slot(keys)
+    if len(groups) == 1:
+        return client.mget(keys)
+    pipe = client.pipeline(transaction=False)
+    for group in groups:
+        pipe.execute_command("MGET", *[keys[i] for i in group])
+    values = [None] * len(keys)
+    for group, replies in zip(groups, pipe.execute()):
+        for i, value in zip(group, replies):
+            values[i] = value
+    return values
+
+
+def mset(client, mapping):
+    """MSET a dict of key -> value whose keys may be in any slots."""
+    keys = list(mapping)
+    groups = by_slot(keys)
+    if len(groups) == 1:
+        client.mset(mapping)
+        return
+    pipe = client.pipeline(transaction=False)
+    for group in groups:
+        pipe.execute_command(
+            "MSET", *[part for i in group for part in (keys[i], mapping[keys[i]])]
+        )
+    pipe.execute()
+
+
+def unlink(client, keys):
+    """UNLINK keys from any slots. Returns the number removed."""
+    groups = by_slot(keys)
+    if len(groups) == 1:
+        return client.unlink(*keys)
+    pipe = client.pipeline(transaction=False)
+    for group in groups:
+        pipe.unlink(*[keys[i] for i in group])
+    return sum(pipe.execute())
+
+
+def scan_node(client, node, match=None, count=None):
+    """Walk the keys of one node (SCAN with a per-node cursor)."""
+    cursor = 0
+    while True:
+        cursors, keys = client.scan(cursor, match=match, count=count, target_nodes=node)
+        yield from keys
+        cursor = cursors[node.name]
+        if not cursor:
+            return
+
+
+def each_primary(client, fn):
+    """
+    Call fn(node) for every primary, in parallel threads.
+
+    Works with RedisCluster and ShardedRedis clients. Returns the results
+    in the order of client.get_primaries().
+    """
+    nodes = client.get_primaries()
+    with ThreadPoolExecutor(
+        max_workers=len(nodes), thread_name_prefix="easy-redis-cluster"
+    ) as executor:
+        return parallel(executor, fn, nodes)
@@ -0,0 +1,120 @@
+"""
+Value codecs for AppSpace.
+
+A codec turns Python values into bytes for Redis and back. Apps that use
+a codec talk to Redis through a bytes-mode client, so payloads are never
+UTF-8 decoded on the way in.
+
+Any object with encode(value) -> bytes and decode(data) -> value works
+as a codec.
+"""
+
+import json
+import pickle
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+class RawCodec:
+    """Bytes in, bytes out. Strings are stored as UTF-8."""
+
+    name = "raw"
+
+    def encode(self, value):
+        if isinstance(value, str):
+            return value.encode("utf-8")
+        return bytes(value)
+
+    def decode(self, data):
+        return data
+
+
+class TextCodec:
+    """Strings stored as UTF-8, like a plain app. Numbers come back as strings."""
+
+    name = "text"
+
+    def encode(self, value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode("utf-8")
+
+    def decode(self, data):
+        return data.decode("utf-8")
+
+
+class JsonCodec:
+    """JSON - readable by any language, handles dicts/lists/numbers/bools."""
+
+    name = "json"
+
+    def encode(self, value):
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class PickleCodec:
+    """
+    Pickle - any Python object, Python readers only.
+
+    Only load pickles from a Redis you trust.
+    """
+
+    name = "pickle"
+
+    def __init__(self, protocol=pickle.HIGHEST_PROTOCOL):
+        self.protocol = protocol
+
+    def encode(self, value):
+        return pickle.dumps(value, protocol=self.protocol)
+
+    def decode(self, data):
+        return pickle.loads(data)
+
+
+class MsgpackCodec:
+    """MessagePack - compact and fast. Needs: pip install msgpack"""
+
+    name = "msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError(
+                "The msgpack codec needs the msgpack package: pip install msgpack"
+            )
+
+    def encode(self, value):
+        return msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {
+    "raw": RawCodec,
+    "text": TextCodec,
+    "json": JsonCodec,
+    "pickle": PickleCodec,
+    "msgpack": MsgpackCodec,
+}
+
+
+def get_codec(codec):
+    """
+    Turn a codec name ("raw", "text", "json", "pickle", "msgpack") into a codec.
+
+    Codec objects are returned as they are; None means no codec.
+    """
+    if codec is None or not isinstance(codec, str):
+        return codec
+    try:
+        return CODECS[codec]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown codec {codec!r}, pick one of: {', '.join(CODECS)}"
+        ) from None
@@ -0,0 +1,165 @@
+"""
+Transparent compression for large AppSpace values.
+
+Values at or above a size threshold are compressed and stored with a
+small header: the bytes b"\\x00EZ" plus one byte naming the algorithm.
+Values without the header are returned untouched, so compressed and
+uncompressed keys can live side by side.
+"""
+
+import time
+import zlib
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # optional dependency
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+MAGIC = b"\x00EZ"
+HEADER_SIZE = len(MAGIC) + 1
+
+# Algorithm name -> header byte
+ALGORITHMS = {"zlib": b"z", "lz4": b"4", "zstd": b"s"}
+
+_PACKAGES = {"lz4": "lz4", "zstd": "zstandard"}
+
+
+def _require(algorithm):
+    """Raise a helpful ImportError if an optional algorithm isn't installed."""
+    module = {"zlib": zlib, "lz4": lz4_frame, "zstd": zstandard}[algorithm]
+    if module is None:
+        raise ImportError(
+            f"{algorithm} compression needs the {_PACKAGES[algorithm]} package: "
+            f"pip install {_PACKAGES[algorithm]}"
+        )
+
+
+class Compressor:
+    """
+    Compresses values of threshold bytes or more.
+
+    algorithm: "zlib" (built in), "lz4" or "zstd" (if installed).
+    threshold: Smallest encoded size in bytes worth compressing.
+    level: Compression level (optional, algorithm default otherwise).
+
+    Values that don't get smaller are stored as they are. Any algorithm
+    can read values written by the others, as long as it is installed.
+
+    Example:
+        pages = db.app("pages", compression=Compressor("zlib", threshold=2048))
+        pages.save("home", html)
+        pages.compression.stats()
+    """
+
+    def __init__(self, algorithm="zlib", threshold=1024, level=None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(
+                f"Unknown compression {algorithm!r}, pick one of: "
+                f"{', '.join(ALGORITHMS)}"
+            )
+        _require(algorithm)
+        self.algorithm = algorithm
+        self.threshold = threshold
+        self.level = level
+        self._header = MAGIC + ALGORITHMS[algorithm]
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zero every counter."""
+        self.compressed = 0
+        self.skipped = 0
+        self.decompressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_seconds = 0.0
+        self.decompress_seconds = 0.0
+
+    def stats(self):
+        """
+        Counters for tuning the threshold.
+
+        bytes_in/bytes_out only count values that were compressed.
+        """
+        return {
+            "compressed": self.compressed,
+            "skipped": self.skipped,
+            "decompressed": self.decompressed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "compress_seconds": self.compress_seconds,
+            "decompress_seconds": self.decompress_seconds,
+        }
+
+    def compress(self, data):
+        """Compress data if it is big enough and actually shrinks."""
+        if len(data) < self.threshold:
+            self.skipped += 1
+            return data
+        start = time.perf_counter()
+        packed = self._header + self._compress(data)
+        self.compress_seconds += time.perf_counter() - start
+        if len(packed) >= len(data):
+            self.skipped += 1
+            return data
+        self.compressed += 1
+        self.bytes_in += len(data)
+        self.bytes_out += len(packed)
+        return packed
+
+    def decompress(self, data):
+        """Undo compress(). Data without the header is returned as it is."""
+        if data[:3] != MAGIC or len(data) < HEADER_SIZE:
+            return data
+        start = time.perf_counter()
+        result = _decompress(data[3:4], memoryview(data)[HEADER_SIZE:])
+        self.decompress_seconds += time.perf_counter() - start
+        self.decompressed += 1
+        return result
+
+    def _compress(self, data):
+        if self.algorithm == "zlib":
+            return zlib.compress(data, -1 if self.level is None else self.level)
+        if self.algorithm == "lz4":
+            return lz4_frame.compress(data, compression_level=self.level or 0)
+        return zstandard.ZstdCompressor(level=self.level or 3).compress(data)
+
+
+def _decompress(code, body):
+    """Decompress a body written with the algorithm named by its header byte."""
+    if code == b"z":
+        return zlib.decompress(body)
+    if code == b"4":
+        _require("lz4")
+        return lz4_frame.decompress(body)
+    if code == b"s":
+        _require("zstd")
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise ValueError(f"Unknown compression header {code!r}")
+
+
+def get_compressor(compression):
+    """Turn an algorithm name into a Compressor; objects pass through."""
+    if compression is None or not isinstance(compression, str):
+        return compression
+    return Compressor(compression)
+
+
+class CompressedCodec:
+    """Wraps a codec so its output is compressed by a Compressor."""
+
+    def __init__(self, codec, compressor):
+        self.codec = codec
+        self.compressor = compressor
+        self.name = f"{getattr(codec, 'name', 'custom')}+{compressor.algorithm}"
+
+    def encode(self, value):
+        return self.compressor.compress(self.codec.encode(value))
+
+    def decode(self, data):
+        return self.codec.decode(self.compressor.decompress(data))
@@ -0,0 +1,234 @@
+"""
+Config and feature flags served from an in-process snapshot.
+
+The config lives in a hash next to a version counter. Every write bumps
+the version and publishes it, and each ConfigStore reloads its snapshot
+when it hears about a newer version. If a message is missed, polling the
+version key catches up within poll_seconds.
+"""
+
+import threading
+import time
+
+import redis
+
+from .replicas import on_primary
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+# KEYS hash, version | ARGV expected version ("" for any), channel, op,
+# then field/value pairs (set, replace) or fields (delete)
+WRITE = """
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+if ARGV[1] ~= '' and tonumber(ARGV[1]) ~= current then
+    return {0, current}
+end
+if ARGV[3] == 'replace' then
+    redis.call('DEL', KEYS[1])
+end
+if #ARGV > 3 then
+    if ARGV[3] == 'delete' then
+        redis.call('HDEL', KEYS[1], unpack(ARGV, 4))
+    else
+        redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+    end
+end
+local version = redis.call('INCR', KEYS[2])
+redis.call('PUBLISH', ARGV[2], version)
+return {1, version}
+"""
+
+
+class VersionConflict(Exception):
+    """Raised when the config changed since the version a write expected."""
+
+    def __init__(self, expected, current):
+        super().__init__(
+            f"Config is at version {current}, but version {expected} was expected"
+        )
+        self.expected = expected
+        self.current = current
+
+
+class ConfigStore:
+    """
+    A config hash read from memory and kept up to date in the background.
+
+    Use through AppSpace.config():
+
+        flags = app.config("flags")
+        if flags.is_enabled("new_checkout"):    # no round trip
+            ...
+        flags.set(new_checkout="true")
+
+    Writes can be made conditional on the version that was read, so two
+    deploys changing the config at once can't overwrite each other:
+
+        flags.set(theme="dark", expected_version=flags.version)
+    """
+
+    def __init__(self, app, name="config", poll_seconds=5.0):
+        app._needs_one_slot("Config stores")
+        self.app = app
+        self.name = name
+        self.poll_seconds = poll_seconds
+        self._key = app._key(name)
+        self._version_key = app._key(f"{name}:version")
+        self._channel = app._key(f"{name}:changed")
+        self._decode = app._dict_decoder(app.codec)
+        self._write = app.client.register_script(WRITE)
+        self._refresh_lock = threading.Lock()
+        self._data = {}
+        # Below any real version, so the first refresh always loads
+        self._version = -1
+        self.refreshes = 0
+        self.refresh()
+        self._pubsub = app.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self._channel)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="easy-redis-config", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # -------- Reading (from memory) --------
+
+    @property
+    def version(self):
+        """Version of the snapshot in memory (0 before the first write)."""
+        return self._version
+
+    def get(self, field, default=None):
+        """Get one setting from the snapshot."""
+        return self._data.get(field, default)
+
+    def is_enabled(self, flag, default=False):
+        """
+        Check a feature flag in the snapshot.
+
+        "1", "true", "yes" and "on" (any case) count as enabled.
+        """
+        value = self._data.get(flag)
+        if value is None:
+            return default
+        if isinstance(value, bool):
+            return value
+        return str(value).lower() in TRUE_VALUES
+
+    def snapshot(self):
+        """A copy of every setting in the snapshot."""
+        return dict(self._data)
+
+    def __getitem__(self, field):
+        return self._data[field]
+
+    def __contains__(self, field):
+        return field in self._data
+
+    # -------- Writing --------
+
+    def set(self, mapping=None, /, *, expected_version=None, **fields):
+        """
+        Change some settings. Returns the new version.
+
+        expected_version: Only write if the config is still at this
+                          version; raises VersionConflict otherwise.
+        """
+        fields = {**(mapping or {}), **fields}
+        return self._send("set", _pairs(self._encode(fields)), expected_version)
+
+    def replace(self, mapping, *, expected_version=None):
+        """Replace the whole config. Returns the new version."""
+        return self._send("replace", _pairs(self._encode(mapping)), expected_version)
+
+    def delete(self, *fields, expected_version=None):
+        """Remove settings. Returns the new version."""
+        return self._send("delete", list(fields), expected_version)
+
+    # -------- Keeping fresh --------
+
+    def refresh(self, force=False):
+        """
+        Reload the snapshot now (one round trip).
+
+        force: Load even if the version in Redis isn't newer (e.g. after
+               the config keys were deleted).
+
+        Returns True if the snapshot was replaced.
+        """
+        # A replica may not have the version we were told about yet
+        with on_primary():
+            pipe = self.app.client.pipeline()
+            pipe.hgetall(self._key)
+            pipe.get(self._version_key)
+            data, version = pipe.execute()
+        version = int(version or 0)
+        with self._refresh_lock:
+            if version <= self._version and not force:
+                return False
+            self._data = self._decode(data)
+            self._version = version
+            self.refreshes += 1
+            return True
+
+    def close(self):
+        """Stop listening for changes. The snapshot keeps its last state."""
+        self._stop.set()
+        self._thread.join()
+        self._pubsub.close()
+
+    def _run(self):
+        next_poll = time.monotonic() + self.poll_seconds
+        while not self._stop.is_set():
+            try:
+                # Wake up often enough for close() to be quick
+                message = self._pubsub.get_message(timeout=min(self.poll_seconds, 0.5))
+                if message is not None:
+                    latest = int(message["data"])
+                elif time.monotonic() >= next_poll:
+                    # Quiet (or a message was missed): check the version
+                    with on_primary():
+                        latest = int(self.app.client.get(self._version_key) or 0)
+                    next_poll = time.monotonic() + self.poll_seconds
+                else:
+                    continue
+                if latest != self._version:
+                    # Lower means the config was deleted and started over
+                    self.refresh(force=latest < self._version)
+            except (redis.ConnectionError, redis.TimeoutError):
+                self._stop.wait(min(self.poll_seconds, 1.0))
+
+    # -------- Helpers --------
+
+    def _send(self, op, args, expected_version):
+        expected = "" if expected_version is None else expected_version
+        ok, version = self._write(
+            keys=[self._key, self._version_key],
+            args=[expected, self._channel, op, *args],
+        )
+        if not ok:
+            raise VersionConflict(expected_version, version)
+        self.app._evict(self.name)
+        # Read our own write without waiting for the notification
+        self.refresh()
+        return version
+
+    def _encode(self, fields):
+        codec = self.app.codec
+        if codec is None:
+            return fields
+        return {field: codec.encode(value) for field, value in fields.items()}
+
+
+def _pairs(fields):
+    args = []
+    for field, value in fields.items():
+        args += [field, value]
+    return args
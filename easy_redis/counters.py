@@ -0,0 +1,122 @@
+"""Write-behind counters: count in memory, flush totals to Redis in batches."""
+
+import threading
+
+
+class CounterBuffer:
+    """
+    Collects counter increments in memory and flushes them with one
+    pipelined INCRBY per counter.
+
+    Use through AppSpace.write_behind():
+
+        with app.write_behind(flush_ms=500, flush_every=10_000) as views:
+            views.incr("page_views")
+            views.incr_by("bytes_sent", 1024)
+
+    A background thread flushes every flush_ms milliseconds, and incr()
+    flushes as soon as flush_every increments are pending. If a flush
+    fails, the increments are kept and retried on the next one.
+    """
+
+    def __init__(self, app, flush_ms=1000, flush_every=1000, expire_seconds=None):
+        self.app = app
+        self.flush_ms = flush_ms
+        self.flush_every = flush_every
+        self.expire_seconds = expire_seconds
+        self._pending = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        # Only one flush talks to Redis at a time
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="easy-redis-write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def incr(self, name):
+        """Add 1 to a counter (in memory)."""
+        self.incr_by(name, 1)
+
+    def decr(self, name):
+        """Subtract 1 from a counter (in memory)."""
+        self.incr_by(name, -1)
+
+    def incr_by(self, name, amount):
+        """Add amount (int or float) to a counter (in memory)."""
+        with self._lock:
+            self._pending[name] = self._pending.get(name, 0) + amount
+            self._count += 1
+            due = self._count >= self.flush_every
+        if due:
+            self.flush()
+
+    def pending(self, name=None):
+        """
+        Increments not yet sent to Redis.
+
+        Returns the pending amount for one counter, or a dict of all of them.
+        """
+        with self._lock:
+            if name is not None:
+                return self._pending.get(name, 0)
+            return dict(self._pending)
+
+    def flush(self):
+        """
+        Send every pending increment now.
+
+        Returns a dict of counter name -> new value in Redis.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._count = 0
+            if not pending:
+                return {}
+            names = list(pending)
+            pipe = self.app.client.pipeline(transaction=False)
+            for name, key in zip(names, self.app._keys(names)):
+                amount = pending[name]
+                if isinstance(amount, float):
+                    pipe.incrbyfloat(key, amount)
+                else:
+                    pipe.incrby(key, amount)
+                if self.expire_seconds:
+                    pipe.expire(key, self.expire_seconds)
+            try:
+                replies = pipe.execute()
+            except Exception:
+                self._restore(pending)
+                raise
+            self.app._evict(*names)
+            step = 2 if self.expire_seconds else 1
+            return dict(zip(names, replies[::step]))
+
+    def close(self):
+        """Stop the background thread and flush what's left."""
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+
+    def _restore(self, pending):
+        """Put increments from a failed flush back in front of newer ones."""
+        with self._lock:
+            for name, amount in pending.items():
+                self._pending[name] = self._pending.get(name, 0) + amount
+
+    def _run(self):
+        while not self._stop.wait(self.flush_ms / 1000):
+            try:
+                self.flush()
+            except Exception:
+                # Kept in memory, retried on the next tick
+                pass
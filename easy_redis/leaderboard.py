@@ -0,0 +1,142 @@
+"""
+Leaderboards on Redis sorted sets.
+
+Redis keeps members ordered by score, so updates are O(log n) on the
+server and reads only transfer the page that was asked for.
+"""
+
+from collections import namedtuple
+
+# rank: 1 for the leader
+# member: The member's name
+# score: The member's score (int when it is a whole number)
+LeaderboardEntry = namedtuple("LeaderboardEntry", "rank member score")
+
+# KEYS[1] sorted set | ARGV member, radius, "1" for highest first
+AROUND = """
+local rev = ARGV[3] == '1'
+local rank = redis.call(rev and 'ZREVRANK' or 'ZRANK', KEYS[1], ARGV[1])
+if not rank then
+    return false
+end
+local start = math.max(0, rank - tonumber(ARGV[2]))
+local stop = rank + tonumber(ARGV[2])
+local page = redis.call(rev and 'ZREVRANGE' or 'ZRANGE', KEYS[1], start, stop, 'WITHSCORES')
+return {start, page}
+"""
+
+
+class Leaderboard:
+    """
+    Members ranked by score, highest first (or lowest first).
+
+    Use through AppSpace.leaderboard():
+
+        board = app.leaderboard("high_scores")
+        board.set_scores({"Alice": 1500, "Bob": 2300})
+        board.incr_score("Alice", 50)
+        board.top(10)        # [(1, "Bob", 2300), (2, "Alice", 1550)]
+        board.rank("Alice")  # 2
+    """
+
+    def __init__(self, app, name, highest_first=True):
+        self.app = app
+        self.name = name
+        self.highest_first = highest_first
+        self.key = app._key(name)
+        self._around = app.client.register_script(AROUND)
+
+    def set_score(self, member, score, only_if_better=False):
+        """
+        Set a member's score, adding the member if needed.
+
+        only_if_better: Keep the old score unless the new one beats it
+                        (higher, or lower on lowest-first boards).
+        """
+        self.set_scores({member: score}, only_if_better=only_if_better)
+
+    def set_scores(self, scores, only_if_better=False):
+        """Set many {member: score} pairs in one command."""
+        if not scores:
+            return
+        better = {"gt": True} if self.highest_first else {"lt": True}
+        self.app.client.zadd(self.key, scores, **(better if only_if_better else {}))
+
+    def incr_score(self, member, amount=1):
+        """Add amount to a member's score, atomically. Returns the new score."""
+        return _number(self.app.client.zincrby(self.key, amount, member))
+
+    def score(self, member):
+        """Get a member's score, or None if it isn't on the board."""
+        score = self.app.client.zscore(self.key, member)
+        return None if score is None else _number(score)
+
+    def rank(self, member):
+        """Get a member's rank (1 for the leader), or None."""
+        if self.highest_first:
+            rank = self.app.client.zrevrank(self.key, member)
+        else:
+            rank = self.app.client.zrank(self.key, member)
+        return None if rank is None else rank + 1
+
+    def top(self, k=10, offset=0):
+        """
+        Get one page of the board: k entries starting after offset.
+
+        Example: top(10, offset=10) -> ranks 11 to 20
+        """
+        if k <= 0:
+            return []
+        stop = offset + k - 1
+        if self.highest_first:
+            page = self.app.client.zrevrange(self.key, offset, stop, withscores=True)
+        else:
+            page = self.app.client.zrange(self.key, offset, stop, withscores=True)
+        return _entries(offset, page)
+
+    def around(self, member, radius=5):
+        """
+        Get the member plus up to radius entries above and below it.
+
+        Runs as one Lua script, so it is one round trip. Returns [] if the
+        member isn't on the board.
+        """
+        reply = self._around(
+            keys=[self.key], args=[member, radius, int(self.highest_first)]
+        )
+        if not reply:
+            return []
+        start, flat = reply
+        return _entries(start, zip(flat[::2], flat[1::2]))
+
+    def remove(self, *members):
+        """Take members off the board. Returns how many were removed."""
+        if not members:
+            return 0
+        return self.app.client.zrem(self.key, *members)
+
+    def size(self):
+        """Get the number of members on the board."""
+        return self.app.client.zcard(self.key)
+
+    def clear(self):
+        """Remove every member."""
+        self.app.client.delete(self.key)
+
+
+def _number(score):
+    """Scores come back as floats (or strings from Lua); keep whole ones int."""
+    score = float(score)
+    return int(score) if score.is_integer() else score
+
+
+def _entries(start, pairs):
+    """Turn (member, score) pairs starting at a 0-based rank into Entries."""
+    return [
+        LeaderboardEntry(
+            start + i + 1,
+            member.decode() if isinstance(member, bytes) else member,
+            _number(score),
+        )
+        for i, (member, score) in enumerate(pairs)
+    ]
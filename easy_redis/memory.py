@@ -0,0 +1,770 @@
+"""
+An in-process stand-in for Redis, for tests and single-process apps.
+
+MemoryStore holds strings, hashes and lists like a Redis database does.
+Keys with a TTL also sit in a heap ordered by deadline; every command
+first pops the keys whose deadline has passed, so reads never see expired
+data and nothing ever scans the whole keyspace.
+
+MemoryRedis is the client. It has the redis-py methods AppSpace uses,
+with the same replies, so AppSpace, batches and write_behind work on it
+unchanged. Use it through EasyRedis(backend="memory").
+"""
+
+import functools
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from collections import deque
+
+import redis
+
+# Keys are also filed in this many buckets by hash, and a SCAN cursor is
+# the next bucket to read, so walks need no snapshot
+SCAN_BUCKETS = 4096
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+NOT_INTEGER = "value is not an integer or out of range"
+NOT_FLOAT = "value is not a valid float"
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def get_store(db=0):
+    """
+    Get the process-wide store for a database number, creating it on
+    first use, so every EasyRedis(backend="memory") sees the same data.
+    """
+    with _lock:
+        store = _stores.get(db)
+        if store is None:
+            store = _stores[db] = MemoryStore()
+        return store
+
+
+class MemoryStore:
+    """
+    One in-memory database: keys, their deadlines, and scan buckets.
+
+    Values are bytes (strings), dicts of bytes (hashes) or deques of
+    bytes (lists). All commands run under one lock.
+    """
+
+    def __init__(self):
+        self._data = {}
+        # key -> deadline (time.monotonic() seconds)
+        self._expires = {}
+        # (deadline, key); entries whose key got a new deadline are stale
+        self._heap = []
+        # bucket number -> keys in it (empty buckets are dropped)
+        self._buckets = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        with self.lock:
+            self._expire_due()
+            return len(self._data)
+
+    def execute(self, command, *args):
+        """Run one command (a method name) and return its raw reply."""
+        with self.lock:
+            self._expire_due()
+            return getattr(self, command)(*args)
+
+    def execute_many(self, commands):
+        """
+        Run (command, args) pairs as one atomic step.
+
+        Returns their replies, with a ResponseError in place of the reply
+        of each command that failed.
+        """
+        replies = []
+        with self.lock:
+            self._expire_due()
+            for command, args in commands:
+                try:
+                    replies.append(getattr(self, command)(*args))
+                except redis.ResponseError as e:
+                    replies.append(e)
+        return replies
+
+    # -------- Expiry --------
+
+    def _expire_due(self):
+        """Delete every key whose deadline has passed."""
+        heap = self._heap
+        if not heap or heap[0][0] > time.monotonic():
+            return
+        now = time.monotonic()
+        while heap and heap[0][0] <= now:
+            deadline, key = heapq.heappop(heap)
+            if self._expires.get(key) == deadline:
+                del self._expires[key]
+                self._remove(key)
+
+    def _set_deadline(self, key, deadline):
+        """Give a key a deadline (None: no expiration)."""
+        if deadline is None:
+            self._expires.pop(key, None)
+            return
+        self._expires[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        if len(self._heap) > 2 * len(self._expires) + 64:
+            # Mostly stale entries from keys whose TTL kept changing
+            self._heap = [(d, k) for k, d in self._expires.items()]
+            heapq.heapify(self._heap)
+
+    def _put(self, key, value):
+        """Store a value at key. Returns the value."""
+        self._data[key] = value
+        self._buckets.setdefault(hash(key) % SCAN_BUCKETS, set()).add(key)
+        return value
+
+    def _remove(self, key):
+        self._expires.pop(key, None)
+        if self._data.pop(key, None) is None:
+            return False
+        number = hash(key) % SCAN_BUCKETS
+        bucket = self._buckets[number]
+        bucket.discard(key)
+        if not bucket:
+            del self._buckets[number]
+        return True
+
+    def _get(self, key, kind):
+        """The value at key, None if missing, WRONGTYPE if not a kind."""
+        value = self._data.get(key)
+        if value is not None and not isinstance(value, kind):
+            raise redis.ResponseError(WRONGTYPE)
+        return value
+
+    # -------- Keys --------
+
+    def delete(self, *keys):
+        return sum(self._remove(key) for key in keys)
+
+    def exists(self, *keys):
+        return sum(key in self._data for key in keys)
+
+    def type(self, key):
+        value = self._data.get(key)
+        if value is None:
+            return b"none"
+        return {bytes: b"string", dict: b"hash", deque: b"list"}[type(value)]
+
+    def pexpire(self, key, ms):
+        if key not in self._data:
+            return False
+        if ms <= 0:
+            self._remove(key)
+        else:
+            self._set_deadline(key, time.monotonic() + ms / 1000)
+        return True
+
+    def persist(self, key):
+        return self._expires.pop(key, None) is not None
+
+    def pttl(self, key):
+        if key not in self._data:
+            return -2
+        deadline = self._expires.get(key)
+        if deadline is None:
+            return -1
+        return max(0, round((deadline - time.monotonic()) * 1000))
+
+    def ttl(self, key):
+        ms = self.pttl(key)
+        # Redis rounds to the nearest second
+        return ms if ms < 0 else (ms + 500) // 1000
+
+    def dbsize(self):
+        return len(self._data)
+
+    def flushdb(self):
+        self._data.clear()
+        self._expires.clear()
+        self._heap.clear()
+        self._buckets.clear()
+        return True
+
+    def scan(self, cursor, match, count):
+        """
+        One page of whole buckets, from bucket number cursor on.
+
+        Like Redis, a key present for the whole walk is returned exactly
+        once, a key added or removed meanwhile may or may not be, and a
+        page can hold more than count keys.
+        """
+        number, keys = cursor, []
+        while number < SCAN_BUCKETS and len(keys) < (count or 10):
+            keys += self._buckets.get(number, ())
+            number += 1
+        return (number if number < SCAN_BUCKETS else 0), _matching(keys, match)
+
+    # -------- Strings --------
+
+    def get(self, key):
+        return self._get(key, bytes)
+
+    def set(self, key, value, ms=None, nx=False, xx=False, keepttl=False):
+        exists = key in self._data
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._put(key, value)
+        if ms is not None:
+            self._set_deadline(key, time.monotonic() + ms / 1000)
+        elif not keepttl:
+            self._expires.pop(key, None)
+        return True
+
+    def getex(self, key, ms=None, persist=False):
+        value = self._get(key, bytes)
+        if value is not None:
+            if ms is not None:
+                self._set_deadline(key, time.monotonic() + ms / 1000)
+            elif persist:
+                self._expires.pop(key, None)
+        return value
+
+    def mget(self, *keys):
+        return [self._get_string_or_none(key) for key in keys]
+
+    def mset(self, *pairs):
+        for key, value in pairs:
+            self._put(key, value)
+            self._expires.pop(key, None)
+        return True
+
+    def incrby(self, key, amount):
+        current = self._get(key, bytes)
+        value = _integer(b"0" if current is None else current) + amount
+        if not -(2**63) <= value < 2**63:
+            raise redis.ResponseError("increment or decrement would overflow")
+        self._put(key, str(value).encode())
+        return value
+
+    def incrbyfloat(self, key, amount):
+        current = self._get(key, bytes)
+        value = _float(b"0" if current is None else current) + amount
+        self._put(key, _format_float(value))
+        return value
+
+    def _get_string_or_none(self, key):
+        # MGET treats keys of other types as missing
+        value = self._data.get(key)
+        return value if isinstance(value, bytes) else None
+
+    # -------- Hashes --------
+
+    def hset(self, key, *pairs):
+        hash = self._get(key, dict)
+        if hash is None:
+            hash = self._put(key, {})
+        added = 0
+        for field, value in pairs:
+            added += field not in hash
+            hash[field] = value
+        return added
+
+    def hget(self, key, field):
+        return (self._get(key, dict) or {}).get(field)
+
+    def hgetall(self, key):
+        return dict(self._get(key, dict) or {})
+
+    def hmget(self, key, *fields):
+        hash = self._get(key, dict) or {}
+        return [hash.get(field) for field in fields]
+
+    def hdel(self, key, *fields):
+        hash = self._get(key, dict)
+        if hash is None:
+            return 0
+        removed = sum(hash.pop(field, None) is not None for field in fields)
+        if not hash:
+            self._remove(key)
+        return removed
+
+    def hlen(self, key):
+        return len(self._get(key, dict) or {})
+
+    def hexists(self, key, field):
+        return field in (self._get(key, dict) or {})
+
+    def hincrby(self, key, field, amount):
+        hash = self._get(key, dict)
+        value = _integer((hash or {}).get(field, b"0")) + amount
+        if not -(2**63) <= value < 2**63:
+            raise redis.ResponseError("increment or decrement would overflow")
+        self.hset(key, (field, str(value).encode()))
+        return value
+
+    def hincrbyfloat(self, key, field, amount):
+        hash = self._get(key, dict)
+        value = _float((hash or {}).get(field, b"0")) + amount
+        self.hset(key, (field, _format_float(value)))
+        return value
+
+    def hscan(self, key, cursor, match, count):
+        # The whole hash in one page, as Redis does for small hashes
+        hash = self._get(key, dict) or {}
+        if cursor != 0:
+            return 0, {}
+        fields = _matching(list(hash), match)
+        return 0, {field: hash[field] for field in fields}
+
+    # -------- Lists --------
+
+    def rpush(self, key, *values):
+        items = self._get(key, deque)
+        if items is None:
+            items = self._put(key, deque())
+        items.extend(values)
+        return len(items)
+
+    def lpush(self, key, *values):
+        items = self._get(key, deque)
+        if items is None:
+            items = self._put(key, deque())
+        items.extendleft(values)
+        return len(items)
+
+    def lrange(self, key, start, stop):
+        items = self._get(key, deque)
+        if not items:
+            return []
+        size = len(items)
+        start = max(start + size if start < 0 else start, 0)
+        stop = min(stop + size if stop < 0 else stop, size - 1)
+        if start > stop:
+            return []
+        return list(itertools.islice(items, start, stop + 1))
+
+    def llen(self, key):
+        return len(self._get(key, deque) or ())
+
+    def lpop(self, key, count=None):
+        return self._pop(key, count, deque.popleft)
+
+    def rpop(self, key, count=None):
+        return self._pop(key, count, deque.pop)
+
+    def _pop(self, key, count, pop):
+        items = self._get(key, deque)
+        if not items:
+            return None
+        if count is None:
+            popped = pop(items)
+        else:
+            popped = [pop(items) for _ in range(min(count, len(items)))]
+        if not items:
+            self._remove(key)
+        return popped
+
+
+class MemoryRedis:
+    """
+    A redis-py style client for a MemoryStore.
+
+    Covers strings, hashes, lists, TTLs and SCAN, with the same replies as
+    redis.Redis (bytes, or str with decode_responses=True). Anything else,
+    e.g. sorted sets or Lua scripts, needs a Redis server.
+    """
+
+    def __init__(self, store=None, decode_responses=False):
+        self.store = store if store is not None else MemoryStore()
+        self.decode_responses = decode_responses
+
+    def __repr__(self):
+        return f"<{type(self).__name__} decode_responses={self.decode_responses}>"
+
+    def execute_command(self, command, *args):
+        """Run one command on the store (redis-py clients have this too)."""
+        return self._decode(self.store.execute(command, *args))
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        """
+        Queue commands and run them together with execute().
+
+        All commands of a pipeline run under the store's lock, so every
+        pipeline is atomic, like a MULTI/EXEC transaction.
+        """
+        return MemoryPipeline(self.store, self.decode_responses)
+
+    def ping(self):
+        return True
+
+    def info(self, section=None):
+        return {"redis_version": "memory"}
+
+    def flushdb(self):
+        return self.execute_command("flushdb")
+
+    def dbsize(self):
+        return self.execute_command("dbsize")
+
+    # -------- Keys --------
+
+    def delete(self, *names):
+        return self.execute_command("delete", *_keys(names))
+
+    # UNLINK frees memory in the background on Redis; here it's the same
+    unlink = delete
+
+    def exists(self, *names):
+        return self.execute_command("exists", *_keys(names))
+
+    def type(self, name):
+        return self.execute_command("type", _encode(name))
+
+    def expire(self, name, time):
+        return self.execute_command("pexpire", _encode(name), _ms(time, 1000))
+
+    def pexpire(self, name, time):
+        return self.execute_command("pexpire", _encode(name), _ms(time, 1))
+
+    def persist(self, name):
+        return self.execute_command("persist", _encode(name))
+
+    def ttl(self, name):
+        return self.execute_command("ttl", _encode(name))
+
+    def pttl(self, name):
+        return self.execute_command("pttl", _encode(name))
+
+    def scan(self, cursor=0, match=None, count=None, _type=None):
+        return self.execute_command("scan", cursor, _pattern(match), count)
+
+    def scan_iter(self, match=None, count=None, _type=None):
+        """Yield every key (matching the glob pattern), a page at a time."""
+        cursor = None
+        while cursor != 0:
+            cursor, keys = self.scan(cursor or 0, match=match, count=count)
+            yield from keys
+
+    def keys(self, pattern="*"):
+        return list(self.scan_iter(match=pattern, count=1 << 30))
+
+    # -------- Strings --------
+
+    def get(self, name):
+        return self.execute_command("get", _encode(name))
+
+    def set(self, name, value, ex=None, px=None, nx=False, xx=False, keepttl=False):
+        ms = _ms(ex, 1000) if ex is not None else _ms(px, 1) if px is not None else None
+        return self.execute_command(
+            "set", _encode(name), _encode(value), ms, nx, xx, keepttl
+        )
+
+    def getex(self, name, ex=None, px=None, persist=False):
+        ms = _ms(ex, 1000) if ex is not None else _ms(px, 1) if px is not None else None
+        return self.execute_command("getex", _encode(name), ms, persist)
+
+    def mget(self, keys, *args):
+        return self.execute_command("mget", *_keys(_list(keys, args)))
+
+    def mset(self, mapping):
+        return self.execute_command("mset", *_pairs(mapping.items()))
+
+    def incrby(self, name, amount=1):
+        return self.execute_command("incrby", _encode(name), _int(amount))
+
+    incr = incrby
+
+    def decrby(self, name, amount=1):
+        return self.incrby(name, -amount)
+
+    decr = decrby
+
+    def incrbyfloat(self, name, amount=1.0):
+        return self.execute_command("incrbyfloat", _encode(name), float(amount))
+
+    # -------- Hashes --------
+
+    def hset(self, name, key=None, value=None, mapping=None, items=None):
+        pairs = []
+        if key is not None:
+            pairs.append((key, value))
+        if mapping:
+            pairs.extend(mapping.items())
+        if items:
+            pairs.extend(zip(items[::2], items[1::2]))
+        if not pairs:
+            raise redis.DataError("'hset' with no key value pairs")
+        return self.execute_command("hset", _encode(name), *_pairs(pairs))
+
+    def hget(self, name, key):
+        return self.execute_command("hget", _encode(name), _encode(key))
+
+    def hgetall(self, name):
+        return self.execute_command("hgetall", _encode(name))
+
+    def hmget(self, name, keys, *args):
+        return self.execute_command("hmget", _encode(name), *_keys(_list(keys, args)))
+
+    def hdel(self, name, *keys):
+        return self.execute_command("hdel", _encode(name), *_keys(keys))
+
+    def hlen(self, name):
+        return self.execute_command("hlen", _encode(name))
+
+    def hexists(self, name, key):
+        return self.execute_command("hexists", _encode(name), _encode(key))
+
+    def hincrby(self, name, key, amount=1):
+        return self.execute_command(
+            "hincrby", _encode(name), _encode(key), _int(amount)
+        )
+
+    def hincrbyfloat(self, name, key, amount=1.0):
+        return self.execute_command(
+            "hincrbyfloat", _encode(name), _encode(key), float(amount)
+        )
+
+    def hscan(self, name, cursor=0, match=None, count=None):
+        return self.execute_command(
+            "hscan", _encode(name), cursor, _pattern(match), count
+        )
+
+    def hscan_iter(self, name, match=None, count=None):
+        """Yield every (field, value) of a hash, a page at a time."""
+        cursor = None
+        while cursor != 0:
+            cursor, data = self.hscan(name, cursor or 0, match=match, count=count)
+            yield from data.items()
+
+    # -------- Lists --------
+
+    def rpush(self, name, *values):
+        return self.execute_command("rpush", _encode(name), *_keys(values))
+
+    def lpush(self, name, *values):
+        return self.execute_command("lpush", _encode(name), *_keys(values))
+
+    def lrange(self, name, start, end):
+        return self.execute_command("lrange", _encode(name), _int(start), _int(end))
+
+    def llen(self, name):
+        return self.execute_command("llen", _encode(name))
+
+    def lpop(self, name, count=None):
+        return self.execute_command("lpop", _encode(name), count)
+
+    def rpop(self, name, count=None):
+        return self.execute_command("rpop", _encode(name), count)
+
+    # -------- Needs a server --------
+
+    def register_script(self, script):
+        raise _needs_server("Lua scripts")
+
+    def script_load(self, script):
+        raise _needs_server("Lua scripts")
+
+    def eval(self, script, numkeys, *keys_and_args):
+        raise _needs_server("Lua scripts")
+
+    def evalsha(self, sha, numkeys, *keys_and_args):
+        raise _needs_server("Lua scripts")
+
+    def pubsub(self, **kwargs):
+        raise _needs_server("Pub/sub")
+
+    def _decode(self, reply):
+        if not self.decode_responses:
+            return reply
+        return _decode(reply)
+
+
+class MemoryPipeline(MemoryRedis):
+    """Commands queued by MemoryRedis.pipeline()."""
+
+    def __init__(self, store, decode_responses=False):
+        super().__init__(store, decode_responses)
+        self._queue = []
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.reset()
+
+    def execute_command(self, command, *args):
+        self._queue.append((command, args))
+        return self
+
+    def execute(self, raise_on_error=True):
+        """Run the queued commands. Returns their replies in order."""
+        queue, self._queue = self._queue, []
+        replies = self.store.execute_many(queue)
+        for number, (reply, (command, _)) in enumerate(zip(replies, queue), 1):
+            if raise_on_error and isinstance(reply, redis.ResponseError):
+                raise redis.ResponseError(
+                    f"Command # {number} ({command.upper()}) of pipeline "
+                    f"caused error: {reply}"
+                )
+        return [self._decode(reply) for reply in replies]
+
+    def reset(self):
+        self._queue = []
+
+
+def _needs_server(feature):
+    return NotImplementedError(
+        f"{feature} need a Redis server; the memory backend has strings, "
+        "hashes, lists and TTLs"
+    )
+
+
+def _encode(value):
+    """Encode a key or value the way redis-py does."""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise redis.DataError(
+            f"Invalid input of type: '{type(value).__name__}'. "
+            "Convert to a bytes, string, int or float first."
+        )
+    if isinstance(value, float):
+        return repr(value).encode()
+    return str(value).encode()
+
+
+def _keys(values):
+    return [_encode(value) for value in values]
+
+
+def _pairs(items):
+    return [(_encode(key), _encode(value)) for key, value in items]
+
+
+def _list(keys, args):
+    """redis-py style: one list of keys, or keys as separate arguments."""
+    if isinstance(keys, (str, bytes)):
+        return [keys, *args]
+    return [*keys, *args]
+
+
+def _int(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise redis.ResponseError(NOT_INTEGER)
+    return value
+
+
+def _ms(value, scale):
+    """A TTL (seconds, ms or timedelta) as whole milliseconds."""
+    if hasattr(value, "total_seconds"):
+        return int(value.total_seconds() * 1000)
+    return int(value * scale)
+
+
+def _pattern(match):
+    if match is None:
+        return None
+    return match.decode() if isinstance(match, bytes) else match
+
+
+def _matching(names, match):
+    """The names matching a glob pattern (all of them for None)."""
+    if match is None:
+        return names
+    matches = _glob(match).fullmatch
+    return [name for name in names if matches(name)]
+
+
+@functools.lru_cache(maxsize=256)
+def _glob(pattern):
+    """
+    A Redis glob pattern as a compiled bytes regex. Follows Redis'
+    stringmatchlen(): [^...] negates a class, [a-z] is a range, \\ escapes
+    the next character (in classes too), and ! is an ordinary character.
+    """
+    glob = pattern.encode() if isinstance(pattern, str) else pattern
+    regex = []
+    i, n = 0, len(glob)
+    while i < n:
+        char = glob[i : i + 1]
+        if char == b"*":
+            regex.append(b".*")
+        elif char == b"?":
+            regex.append(b".")
+        elif char == b"[":
+            i += 1
+            negate = glob[i : i + 1] == b"^"
+            i += negate
+            items = []
+            # An unclosed class ends with the pattern
+            while i < n and glob[i : i + 1] != b"]":
+                if glob[i : i + 1] == b"\\" and n - i >= 2:
+                    i += 1
+                    items.append(re.escape(glob[i : i + 1]))
+                elif n - i >= 3 and glob[i + 1 : i + 2] == b"-":
+                    start, end = sorted((glob[i : i + 1], glob[i + 2 : i + 3]))
+                    items.append(re.escape(start) + b"-" + re.escape(end))
+                    i += 2
+                else:
+                    items.append(re.escape(glob[i : i + 1]))
+                i += 1
+            if items:
+                regex.append(b"[" + b"^" * negate + b"".join(items) + b"]")
+            else:
+                # [] matches nothing, [^] any one character
+                regex.append(b"." if negate else b"(?!)")
+        elif char == b"\\" and n - i >= 2:
+            i += 1
+            regex.append(re.escape(glob[i : i + 1]))
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return re.compile(b"".join(regex), re.DOTALL)
+
+
+def _integer(data):
+    try:
+        value = int(data)
+    except ValueError:
+        raise redis.ResponseError(NOT_INTEGER) from None
+    # Redis only takes the canonical form ("7", not " 7" or "07")
+    if str(value).encode() != data:
+        raise redis.ResponseError(NOT_INTEGER)
+    return value
+
+
+def _float(data):
+    try:
+        value = float(data)
+    except ValueError:
+        raise redis.ResponseError(NOT_FLOAT) from None
+    if math.isnan(value) or math.isinf(value):
+        raise redis.ResponseError(NOT_FLOAT)
+    return value
+
+
+def _format_float(value):
+    """Format an INCRBYFLOAT result like Redis ("3", not "3.0")."""
+    if math.isnan(value) or math.isinf(value):
+        raise redis.ResponseError("increment would produce NaN or Infinity")
+    if value.is_integer() and abs(value) < 1e17:
+        return str(int(value)).encode()
+    return repr(value).encode()
+
+
+def _decode(reply):
+    if isinstance(reply, bytes):
+        return reply.decode()
+    if isinstance(reply, list):
+        return [_decode(item) for item in reply]
+    if isinstance(reply, dict):
+        return {_decode(k): _decode(v) for k, v in reply.items()}
+    if isinstance(reply, tuple):
+        return tuple(_decode(item) for item in reply)
+    return reply
@@ -0,0 +1,349 @@
+"""
+Instrumentation for AppSpace: hooks around every operation, and a
+collector that keeps latency histograms for Prometheus.
+
+Apps without hooks pay one attribute check per call; the timing, sizing
+and round trip counting below only run once a hook is added.
+"""
+
+import bisect
+import copy
+import functools
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+
+class _Calls(threading.local):
+    # Operations in progress on this thread (only the outermost is reported)
+    depth = 0
+    # Round trips made on this thread by instrumented clients
+    round_trips = 0
+
+
+_calls = _Calls()
+
+
+class Operation:
+    """
+    One AppSpace call, as hooks see it.
+
+    app: The app name.
+    method: The AppSpace method, e.g. "load_dict" ("batch" for a batch
+            being sent).
+    keys: Number of keys the call names (operations in a batch).
+    payload_bytes: Approximate size of the strings and bytes passed in
+                   (names included), plus (after the call) those returned.
+    round_trips: Requests sent to Redis (0 for near cache hits).
+    duration: Seconds the call took (None in before()).
+    error: The exception the call raised, if any.
+    """
+
+    __slots__ = (
+        "app",
+        "method",
+        "keys",
+        "payload_bytes",
+        "round_trips",
+        "duration",
+        "error",
+    )
+
+    def __init__(self, app, method, keys=0, payload_bytes=0):
+        self.app = app
+        self.method = method
+        self.keys = keys
+        self.payload_bytes = payload_bytes
+        self.round_trips = 0
+        self.duration = None
+        self.error = None
+
+    def __repr__(self):
+        return (
+            f"<Operation {self.app}.{self.method} keys={self.keys} "
+            f"bytes={self.payload_bytes} round_trips={self.round_trips} "
+            f"duration={self.duration}>"
+        )
+
+
+class Hook:
+    """
+    Base class for hooks. Override before() and/or after().
+
+        class SlowLog(Hook):
+            def after(self, op):
+                if op.duration > 0.05:
+                    print("slow:", op)
+
+        app.add_hook(SlowLog())
+
+    Hooks run on the calling thread, so keep them quick.
+    """
+
+    def before(self, op):
+        """Called before the operation runs."""
+
+    def after(self, op):
+        """Called after it finished (or raised; see op.error)."""
+
+
+class MetricsCollector(Hook):
+    """
+    Latency histograms and counters per app and method.
+
+        metrics = MetricsCollector()
+        app = db.app("shop", hooks=[metrics])
+        ...
+        print(metrics.to_prometheus())
+
+    buckets: Upper bounds of the latency buckets, in seconds.
+    namespace: Prefix of the exported metric names.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, namespace="easy_redis"):
+        self.buckets = tuple(sorted(buckets))
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        # (app, method) -> _Series
+        self._series = {}
+
+    def after(self, op):
+        series = self._series.get((op.app, op.method))
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(
+                    (op.app, op.method), _Series(len(self.buckets))
+                )
+        bucket = bisect.bisect_left(self.buckets, op.duration)
+        with self._lock:
+            series.counts[bucket] += 1
+            series.seconds += op.duration
+            series.calls += 1
+            series.round_trips += op.round_trips
+            series.keys += op.keys
+            series.payload_bytes += op.payload_bytes
+            if op.error is not None:
+                series.errors += 1
+
+    def stats(self):
+        """
+        Totals per app and method, e.g.
+        {"shop": {"load": {"calls": 10, "seconds": 0.002, ...}}}
+        """
+        result = {}
+        with self._lock:
+            for (app, method), series in sorted(self._series.items()):
+                result.setdefault(app, {})[method] = {
+                    "calls": series.calls,
+                    "errors": series.errors,
+                    "seconds": series.seconds,
+                    "round_trips": series.round_trips,
+                    "keys": series.keys,
+                    "payload_bytes": series.payload_bytes,
+                }
+        return result
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._series.clear()
+
+    def to_prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        name = self.namespace
+        with self._lock:
+            items = sorted(
+                (key, copy.copy(series)) for key, series in self._series.items()
+            )
+        lines = [
+            f"# HELP {name}_operation_duration_seconds "
+            "Time spent in AppSpace operations.",
+            f"# TYPE {name}_operation_duration_seconds histogram",
+        ]
+        for (app, method), series in items:
+            labels = f'app="{_escape(app)}",method="{_escape(method)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                lines.append(
+                    f"{name}_operation_duration_seconds_bucket"
+                    f'{{{labels},le="{bound:g}"}} {cumulative}'
+                )
+            lines.append(
+                f"{name}_operation_duration_seconds_bucket"
+                f'{{{labels},le="+Inf"}} {series.calls}'
+            )
+            lines.append(
+                f"{name}_operation_duration_seconds_sum{{{labels}}} {series.seconds!r}"
+            )
+            lines.append(
+                f"{name}_operation_duration_seconds_count{{{labels}}} {series.calls}"
+            )
+        for metric, field, help in (
+            ("round_trips_total", "round_trips", "Requests sent to Redis."),
+            ("operation_errors_total", "errors", "Operations that raised."),
+            ("keys_total", "keys", "Keys named by operations."),
+            ("payload_bytes_total", "payload_bytes", "Bytes passed and returned."),
+        ):
+            lines.append(f"# HELP {name}_{metric} {help}")
+            lines.append(f"# TYPE {name}_{metric} counter")
+            for (app, method), series in items:
+                labels = f'app="{_escape(app)}",method="{_escape(method)}"'
+                lines.append(f"{name}_{metric}{{{labels}}} {getattr(series, field)}")
+        return "\n".join(lines) + "\n"
+
+
+class _Series:
+    """Running totals for one (app, method)."""
+
+    def __init__(self, buckets):
+        # One count per bucket, plus one for slower than the last bound
+        self.counts = [0] * (buckets + 1)
+        self.seconds = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.round_trips = 0
+        self.keys = 0
+        self.payload_bytes = 0
+
+    def __copy__(self):
+        series = _Series.__new__(_Series)
+        series.__dict__.update(self.__dict__)
+        series.counts = list(self.counts)
+        return series
+
+
+def instrumented(method):
+    """Wrap an AppSpace method so hooks see it (free when there are none)."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        hooks = self._hooks
+        if hooks is None or self._pipelined or _calls.depth:
+            return method(self, *args, **kwargs)
+        op = Operation(
+            self.app_name,
+            name,
+            _key_count(args, kwargs),
+            _size(args) + _size(tuple(kwargs.values())),
+        )
+        return observe(hooks, op, method, self, *args, **kwargs)
+
+    return wrapper
+
+
+def observe(hooks, op, fn, *args, **kwargs):
+    """Run fn(*args, **kwargs), reporting it to the hooks as op."""
+    for hook in hooks:
+        hook.before(op)
+    round_trips = _calls.round_trips
+    _calls.depth += 1
+    start = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+        op.payload_bytes += _size(result)
+        return result
+    except BaseException as e:
+        op.error = e
+        raise
+    finally:
+        op.duration = time.perf_counter() - start
+        _calls.depth -= 1
+        op.round_trips = _calls.round_trips - round_trips
+        for hook in hooks:
+            hook.after(op)
+
+
+def parallel(executor, fn, items):
+    """
+    Call fn(item) for every item on the executor's threads.
+
+    Returns the results in item order. Round trips counted on those threads
+    are added to the calling thread's count, so hooks see them.
+    """
+
+    def run(item):
+        start = _calls.round_trips
+        return fn(item), _calls.round_trips - start
+
+    done = list(executor.map(run, items))
+    _calls.round_trips += sum(round_trips for _, round_trips in done)
+    return [result for result, _ in done]
+
+
+def counting_client(client):
+    """
+    A copy of a client (same connection pool) that counts its round trips.
+
+    Commands and pipelines sent through the copy are counted per thread,
+    so each operation can report how many requests it made.
+    """
+    client = copy.copy(client)
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    def counted_execute_command(*args, **options):
+        _calls.round_trips += 1
+        return execute_command(*args, **options)
+
+    def counted_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(*args, **kwargs):
+            if len(pipe):
+                _calls.round_trips += 1
+            return execute(*args, **kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    client.execute_command = counted_execute_command
+    client.pipeline = counted_pipeline
+    return client
+
+
+def _key_count(args, kwargs):
+    """How many keys a call names: one name, or a list/dict of them."""
+    names = args[0] if args else kwargs.get("name", kwargs.get("names"))
+    if names is None:
+        names = kwargs.get("mapping")
+    if isinstance(names, (str, bytes)):
+        return 1
+    if isinstance(names, (list, tuple, set, dict)):
+        return len(names)
+    return 0
+
+
+def _size(value):
+    """Approximate payload size: the length of every string and bytes."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_size(k) + _size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_size(item) for item in value)
+    return 0
+
+
+def _escape(value):
+    """Escape a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
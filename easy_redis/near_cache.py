@@ -0,0 +1,261 @@
+"""
+In-process near cache for AppSpace reads.
+
+Entries are kept fresh with Redis client-side caching: a listener
+connection turns on CLIENT TRACKING in broadcast mode for each app prefix
+and redirects invalidations to itself, so a write from any process evicts
+the stale entry here.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from redis.sentinel import SentinelConnectionPool
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+# How often a listener behind Sentinel asks which server is the primary
+FAILOVER_CHECK_SECONDS = 1.0
+
+# Returned by LRU.get() when a key isn't cached (None is a valid value)
+MISSING = object()
+
+
+class LRU:
+    """
+    A bounded in-process cache for AppSpace reads.
+
+    maxsize: Most entries kept; the least recently used are evicted first.
+    ttl: Longest time in seconds an entry is served from memory (optional).
+         Entries never outlive the TTL of the Redis key itself.
+
+    Example:
+        cfg = db.app("cfg", near_cache=LRU(maxsize=50_000))
+        cfg.load("theme")          # from Redis
+        cfg.load("theme")          # from memory
+        cfg.near_cache.stats()     # {"hits": 1, "misses": 1, ...}
+    """
+
+    def __init__(self, maxsize=10_000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation, so a read that raced with a write
+        # doesn't put the old value back into the cache
+        self._generation = 0
+        self._prefixes = set()
+        self._tracker = None
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def generation(self):
+        """Invalidation counter. Pass it back to put()."""
+        return self._generation
+
+    def get(self, key):
+        """Return the cached value for a full Redis key, or MISSING."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+
+    def put(self, key, value, pttl, generation):
+        """
+        Cache a value read from Redis.
+
+        pttl: The key's remaining TTL in milliseconds (PTTL reply).
+        generation: The value of .generation from before the read was sent.
+        """
+        now = time.monotonic()
+        expires_at = now + pttl / 1000 if pttl > 0 else None
+        if self.ttl is not None:
+            expires_at = min(expires_at or now + self.ttl, now + self.ttl)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        """Drop one key, e.g. after this process wrote it."""
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def invalidate(self, keys):
+        """Drop the given keys, or everything if keys is None."""
+        with self._lock:
+            self._generation += 1
+            if keys is None:
+                self.invalidations += len(self._data)
+                self._data.clear()
+                return
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry."""
+        self.invalidate(None)
+
+    def stats(self):
+        """Counters for tuning: hits, misses, evictions, invalidations, size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._data),
+        }
+
+    def track(self, client, prefix):
+        """
+        Start receiving invalidations for keys starting with prefix.
+
+        Called by AppSpace when the cache is attached to an app.
+        """
+        if prefix in self._prefixes:
+            return
+        self._prefixes.add(prefix)
+        if self._tracker is not None:
+            self._tracker.stop()
+        self._tracker = _Tracker(self, client, self._prefixes)
+        self._tracker.start()
+
+    def close(self):
+        """Stop listening for invalidations and drop every entry."""
+        if self._tracker is not None:
+            self._tracker.stop()
+            self._tracker = None
+        self._prefixes = set()
+        self.clear()
+
+
+def _listener_client(client):
+    """A RESP2 client to the same server, for the invalidation channel."""
+    kwargs = client.connection_pool.connection_kwargs
+    options = dict(
+        host=kwargs.get("host", "localhost"),
+        port=kwargs.get("port", 6379),
+        db=kwargs.get("db", 0),
+        username=kwargs.get("username"),
+        password=kwargs.get("password"),
+        decode_responses=True,
+    )
+    try:
+        # RESP3 clients receive redirected invalidations as push messages,
+        # which PubSub doesn't hand back
+        listener = redis.Redis(protocol=2, **options)
+    except TypeError:
+        # redis-py < 5 only speaks RESP2
+        listener = redis.Redis(**options)
+    pool = client.connection_pool
+    if isinstance(pool, SentinelConnectionPool):
+        # Ask Sentinel for the primary on every connect, not host/port
+        listener = redis.Redis(
+            connection_pool=SentinelConnectionPool(
+                pool.service_name,
+                pool.sentinel_manager,
+                **listener.connection_pool.connection_kwargs,
+            )
+        )
+    return listener
+
+
+def _covering(prefixes):
+    """Drop prefixes already covered by a shorter one (Redis rejects overlaps)."""
+    kept = []
+    for prefix in sorted(prefixes, key=len):
+        if not any(prefix.startswith(other) for other in kept):
+            kept.append(prefix)
+    return kept
+
+
+class _Tracker:
+    """Background thread that feeds Redis invalidations into an LRU."""
+
+    def __init__(self, cache, client, prefixes):
+        self._cache = cache
+        self._prefixes = _covering(prefixes)
+        self._client = _listener_client(client)
+        self._connection = self._client.connection_pool.make_connection()
+        self._pubsub = self._client.pubsub()
+        self._pubsub.connection = self._connection
+        # Tracking must be switched on again on every reconnect, before
+        # PubSub re-subscribes
+        self._connection.register_connect_callback(self._on_connect)
+        self._connection.register_connect_callback(self._pubsub.on_connect)
+        # Set when Sentinel picks the primary, which can change
+        self._find_primary = getattr(
+            self._client.connection_pool, "get_master_address", None
+        )
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="easy-redis-near-cache", daemon=True
+        )
+
+    def start(self):
+        # Connect first: sending a command on a closed connection skips the
+        # Sentinel lookup in some redis-py versions
+        self._connection.connect()
+        self._pubsub.subscribe(INVALIDATE_CHANNEL)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._pubsub.close()
+        self._client.close()
+
+    def _on_connect(self, connection):
+        connection.send_command("CLIENT", "ID")
+        client_id = connection.read_response()
+        args = ["CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST"]
+        for prefix in self._prefixes:
+            args += ["PREFIX", prefix]
+        connection.send_command(*args)
+        connection.read_response()
+        # Anything written while we were disconnected was never announced
+        self._cache.clear()
+
+    def _follow_failover(self):
+        """Reconnect (to the new primary) if Sentinel names another one."""
+        connection = self._connection
+        primary = tuple(self._find_primary())
+        if connection.host and (connection.host, connection.port) != primary:
+            # The old primary is now a replica and won't see new writes
+            connection.disconnect()
+            self._cache.clear()
+
+    def _run(self):
+        next_check = time.monotonic() + FAILOVER_CHECK_SECONDS
+        while not self._stop.is_set():
+            try:
+                message = self._pubsub.get_message(timeout=0.5)
+                if self._find_primary and time.monotonic() >= next_check:
+                    next_check = time.monotonic() + FAILOVER_CHECK_SECONDS
+                    self._follow_failover()
+            except redis.ConnectionError:
+                self._cache.clear()
+                self._stop.wait(1.0)
+                continue
+            if message and message["type"] == "message":
+                self._cache.invalidate(message["data"])
@@ -0,0 +1,168 @@
+"""Process-wide connection pools shared by every EasyRedis instance."""
+
+import threading
+import warnings
+
+import redis
+from redis.cluster import ClusterNode, RedisCluster
+
+_pools = {}
+# Pool key -> the options the pool was made with
+_pool_options = {}
+_clusters = {}
+_lock = threading.Lock()
+
+
+def get_pool(
+    host="localhost",
+    port=6379,
+    db=0,
+    password=None,
+    decode_responses=True,
+    max_connections=None,
+    blocking=False,
+    pool_timeout=20,
+    **connection_kwargs,
+):
+    """
+    Get the shared pool for a server, creating it on first use.
+
+    Pools are keyed by (host, port, db, password), so creating EasyRedis in
+    many modules doesn't open many pools. The first caller for a server
+    decides the pool options; later callers get the same pool, with a
+    warning if they asked for different options.
+
+    blocking: Wait up to pool_timeout seconds for a free connection instead
+              of raising when max_connections are in use.
+    """
+    key = (host, port, db, password, decode_responses)
+    # Options left at None/False/0 mean "the default", however they're passed
+    requested = {
+        name: value
+        for name, value in dict(
+            max_connections=max_connections,
+            blocking=blocking,
+            pool_timeout=pool_timeout if blocking else None,
+            **connection_kwargs,
+        ).items()
+        if value not in (None, False)
+    }
+    with _lock:
+        pool = _pools.get(key)
+        existing = _pool_options.get(key)
+        if pool is not None and existing != requested:
+            changed = ", ".join(
+                f"{name}={requested.get(name)!r}"
+                for name in sorted(existing.keys() | requested.keys())
+                if existing.get(name) != requested.get(name)
+            )
+            warnings.warn(
+                f"The pool for {host}:{port} db {db} already exists with other "
+                f"options, so {changed} is ignored. Pass the same options "
+                "everywhere, or call close_pools() first.",
+                stacklevel=3,
+            )
+        if pool is None:
+            options = dict(
+                host=host,
+                port=port,
+                db=db,
+                password=password,
+                decode_responses=decode_responses,
+                **connection_kwargs,
+            )
+            if blocking:
+                pool = redis.BlockingConnectionPool(
+                    max_connections=max_connections or 50,
+                    timeout=pool_timeout,
+                    **options,
+                )
+            elif max_connections:
+                pool = redis.ConnectionPool(max_connections=max_connections, **options)
+            else:
+                pool = redis.ConnectionPool(**options)
+            _pools[key] = pool
+            _pool_options[key] = requested
+        return pool
+
+
+def get_cluster(nodes, password=None, decode_responses=True, **options):
+    """
+    Get the shared RedisCluster client for a cluster, creating it on first use.
+
+    nodes: Some of the cluster's nodes, as "host:port" or (host, port).
+           The rest of the cluster is discovered from them.
+
+    Clients are keyed by (nodes, password), like pools are. Each one keeps a
+    connection pool per node.
+    """
+    nodes = tuple(_node_address(node) for node in nodes)
+    key = (nodes, password, decode_responses)
+    with _lock:
+        client = _clusters.get(key)
+        if client is None:
+            client = RedisCluster(
+                startup_nodes=[ClusterNode(host, port) for host, port in nodes],
+                password=password,
+                decode_responses=decode_responses,
+                **{name: value for name, value in options.items() if value is not None},
+            )
+            _clusters[key] = client
+        return client
+
+
+def _node_address(node):
+    """(host, port) from "host:port" or a (host, port) pair."""
+    if isinstance(node, str):
+        host, _, port = node.rpartition(":")
+    else:
+        host, port = node
+    return host, int(port)
+
+
+def close_pools():
+    """
+    Disconnect and forget every shared pool (e.g. at shutdown), and stop
+    the probe threads of shared replica sets.
+    """
+    # Imported here: replicas imports this module
+    from .replicas import close_replica_sets
+
+    close_replica_sets()
+    with _lock:
+        for pool in _pools.values():
+            pool.disconnect()
+        _pools.clear()
+        _pool_options.clear()
+        for client in _clusters.values():
+            client.close()
+        _clusters.clear()
+
+
+def warmup(pool, n):
+    """
+    Open n connections now so the first requests don't pay for connecting.
+
+    Returns the number of connections opened.
+    """
+    if isinstance(pool, redis.BlockingConnectionPool):
+        n = min(n, pool.max_connections)
+    connections = []
+    try:
+        for _ in range(n):
+            connection = _checkout(pool)
+            connection.connect()
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            pool.release(connection)
+    return len(connections)
+
+
+def _checkout(pool):
+    """Take a connection from a pool, across redis-py versions."""
+    try:
+        return pool.get_connection()
+    except TypeError:
+        # redis-py < 5.3 needs a command name
+        return pool.get_connection("PING")
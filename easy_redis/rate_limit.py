@@ -0,0 +1,181 @@
+"""
+Server-side rate limiting for AppSpace.
+
+Each check runs a Lua script with EVALSHA, so it costs exactly one round
+trip and can't race with other workers. The scripts read the clock with
+Redis TIME, so every client sees the same time.
+"""
+
+import os
+from collections import namedtuple
+
+import redis
+
+# allowed: True if the request may go ahead
+# remaining: Requests (or tokens) left right now
+# retry_after: Seconds until a request would be allowed again (0 if allowed)
+RateLimitResult = namedtuple("RateLimitResult", "allowed remaining retry_after")
+
+# KEYS[1] counter | ARGV limit, window_ms, cost
+FIXED_WINDOW = """
+local limit = tonumber(ARGV[1])
+local cost = tonumber(ARGV[3])
+local count = tonumber(redis.call('GET', KEYS[1]) or '0')
+if count + cost > limit then
+    return {0, limit - count, redis.call('PTTL', KEYS[1])}
+end
+count = redis.call('INCRBY', KEYS[1], cost)
+if redis.call('PTTL', KEYS[1]) < 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return {1, limit - count, 0}
+"""
+
+# KEYS[1] sorted set of request times | ARGV limit, window_ms, cost, unique id
+SLIDING_LOG = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count + cost > limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    local retry = window
+    if oldest[2] then
+        retry = tonumber(oldest[2]) + window - now
+    end
+    return {0, limit - count, retry}
+end
+for i = 1, cost do
+    redis.call('ZADD', KEYS[1], now, ARGV[4] .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, limit - count - cost, 0}
+"""
+
+# KEYS[1] hash {tokens, ts} | ARGV capacity, window_ms (time to refill), cost
+TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local rate = capacity / window
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = math.ceil((cost - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return {allowed, math.floor(tokens), retry}
+"""
+
+SCRIPTS = {
+    "fixed": FIXED_WINDOW,
+    "sliding": SLIDING_LOG,
+    "token_bucket": TOKEN_BUCKET,
+}
+
+
+class RateLimiter:
+    """
+    Allow at most limit requests per window_seconds for each id.
+
+    algorithm:
+      "fixed"        - Counter that resets every window. Cheapest.
+      "sliding"      - Log of request times (sorted set). Exact, no bursts
+                       at window edges, uses memory per request.
+      "token_bucket" - Bucket of limit tokens refilled evenly over the
+                       window. Allows short bursts up to limit.
+
+    Use through AppSpace.rate_limiter():
+
+        limiter = app.rate_limiter(limit=100, window_seconds=60)
+        if not limiter.check("user_42").allowed:
+            reject()
+    """
+
+    def __init__(self, app, limit, window_seconds, algorithm="fixed", prefix="rl"):
+        if algorithm not in SCRIPTS:
+            raise ValueError(
+                f"Unknown algorithm {algorithm!r}, pick one of: {', '.join(SCRIPTS)}"
+            )
+        self.app = app
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.algorithm = algorithm
+        self.prefix = prefix
+        self._window_ms = int(window_seconds * 1000)
+        self._load_script()
+
+    def _load_script(self):
+        """Send the script to Redis once; checks then call it by SHA."""
+        self._sha = self.app.client.script_load(SCRIPTS[self.algorithm])
+
+    def _args(self, cost):
+        args = [self.limit, self._window_ms, cost]
+        if self.algorithm == "sliding":
+            args.append(os.urandom(8).hex())
+        return args
+
+    def _evalsha(self, client, id, cost):
+        key = self.app._key(f"{self.prefix}:{id}")
+        # Not client.evalsha(): redis-py blocks that in cluster pipelines, but
+        # the command itself is routed by its key like any other
+        return client.execute_command("EVALSHA", self._sha, 1, key, *self._args(cost))
+
+    def check(self, id, cost=1):
+        """
+        Count one request (or cost requests) for id and say if it's allowed.
+
+        Rejected requests are not counted. Returns a RateLimitResult.
+        """
+        try:
+            reply = self._evalsha(self.app.client, id, cost)
+        except redis.exceptions.NoScriptError:
+            # Redis restarted or SCRIPT FLUSH ran
+            self._load_script()
+            reply = self._evalsha(self.app.client, id, cost)
+        return _result(reply)
+
+    def check_many(self, ids, cost=1):
+        """
+        Check several ids in one round trip.
+
+        Returns a dict of id -> RateLimitResult.
+        """
+        ids = list(ids)
+        for attempt in range(2):
+            pipe = self.app.client.pipeline(transaction=False)
+            for id in ids:
+                self._evalsha(pipe, id, cost)
+            try:
+                replies = pipe.execute()
+                break
+            except redis.exceptions.NoScriptError:
+                # Nothing ran: every call in the pipeline hit NOSCRIPT
+                if attempt:
+                    raise
+                self._load_script()
+        return {id: _result(reply) for id, reply in zip(ids, replies)}
+
+    def reset(self, id):
+        """Forget every request counted for id."""
+        self.app.delete(f"{self.prefix}:{id}")
+
+
+def _result(reply):
+    allowed, remaining, retry_ms = reply
+    return RateLimitResult(
+        bool(allowed), max(0, int(remaining)), max(0, retry_ms) / 1000
+    )
@@ -0,0 +1,448 @@
+"""
+Read replicas: send reads to replicas and everything else to the primary.
+
+ReplicaRedis looks like a redis.Redis client for the primary. Commands
+that only read (GET, HGETALL, LRANGE, SCAN, ...) go to a replica picked by
+a ReplicaSet, either in turn or the one answering PING fastest. Writes,
+scripts and pub/sub go to the primary, and so does a pipeline unless every
+command in it reads.
+
+Replicas apply writes a moment after the primary does. So that a thread
+reads what it just wrote, its reads go to the primary for sticky_seconds
+after each write. Inside on_primary() (or with consistency="primary" on an
+AppSpace read) reads always go to the primary.
+"""
+
+import contextlib
+import functools
+import itertools
+import math
+import threading
+import time
+
+import redis
+from redis.commands import CoreCommands
+
+from .pool import _node_address, get_pool
+
+# Commands that never change data, and so can be answered by a replica
+READ_COMMANDS = {
+    "GET",
+    "MGET",
+    "STRLEN",
+    "GETRANGE",
+    "EXISTS",
+    "TTL",
+    "PTTL",
+    "TYPE",
+    "SCAN",
+    "HGET",
+    "HMGET",
+    "HGETALL",
+    "HLEN",
+    "HEXISTS",
+    "HKEYS",
+    "HVALS",
+    "HSCAN",
+    "LRANGE",
+    "LLEN",
+    "LINDEX",
+    "SMEMBERS",
+    "SCARD",
+    "SISMEMBER",
+    "ZRANGE",
+    "ZREVRANGE",
+    "ZRANGEBYSCORE",
+    "ZREVRANGEBYSCORE",
+    "ZSCORE",
+    "ZRANK",
+    "ZREVRANK",
+    "ZCARD",
+    "ZCOUNT",
+    "XRANGE",
+    "XREVRANGE",
+    "XLEN",
+}
+# Reads that carry a cursor, which only means something on the server that
+# made it, so they stay on the primary unless an iterator pins a replica
+_CURSOR_READS = {"SCAN", "HSCAN"}
+
+
+class _Local(threading.local):
+    # time.monotonic() of this thread's last write
+    wrote = -math.inf
+    # How many on_primary() blocks this thread is in
+    primary = 0
+
+
+_local = _Local()
+
+# Registry key -> ReplicaSet, so EasyRedis instances share probe threads
+_replica_sets = {}
+_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def on_primary():
+    """
+    Send every read made by this thread inside the block to the primary.
+
+        with on_primary():
+            balance = app.load("balance")
+    """
+    _local.primary += 1
+    try:
+        yield
+    finally:
+        _local.primary -= 1
+
+
+def consistent(method):
+    """
+    Give an AppSpace read a consistency="primary" keyword, to read that one
+    call from the primary instead of a replica.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, consistency=None, **kwargs):
+        if consistency is None or consistency == "replica":
+            return method(self, *args, **kwargs)
+        if consistency != "primary":
+            raise ValueError(
+                f"Unknown consistency {consistency!r} (use 'replica' or 'primary')"
+            )
+        with on_primary():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _node_name(node):
+    """Canonical "host:port" name of a node."""
+    return "%s:%d" % _node_address(node)
+
+
+class ReplicaSet:
+    """
+    The replicas reads can go to, and which one is next.
+
+    nodes: Replica addresses ("host:port" or (host, port)).
+    discover: Function returning the current replica addresses, e.g. from
+              Sentinel (optional). Called on every probe, so replicas that
+              are added or promoted are picked up.
+    read_from: "round_robin", or "least_latency" for the replica with the
+               fastest PING (averaged over recent probes).
+    probe_seconds: How often a background thread PINGs every replica. A
+                   replica that fails is skipped until it answers again.
+    pool_options: Passed to every replica's connection pool (db, password, ...).
+    """
+
+    def __init__(
+        self,
+        nodes=(),
+        discover=None,
+        read_from="round_robin",
+        probe_seconds=1.0,
+        **pool_options,
+    ):
+        if read_from not in ("round_robin", "least_latency"):
+            raise ValueError(
+                f"Unknown read_from {read_from!r} "
+                "(use 'round_robin' or 'least_latency')"
+            )
+        self.read_from = read_from
+        self.probe_seconds = probe_seconds
+        self.nodes = [_node_name(node) for node in nodes]
+        # node -> average PING seconds
+        self.latency = {}
+        # Nodes that failed since their last good PING
+        self.down = set()
+        self._discover = discover
+        self._pool_options = pool_options
+        # (node, decode_responses) -> redis.Redis
+        self._clients = {}
+        # (nodes that answer, fastest of them), swapped in one assignment
+        self._choice = ([], None)
+        self._turn = itertools.count()
+        self.probe()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="easy-redis-replicas", daemon=True
+        )
+        self._thread.start()
+
+    def client(self, node, decode_responses=True):
+        """The redis.Redis client of one replica."""
+        client = self._clients.get((node, decode_responses))
+        if client is None:
+            host, port = _node_address(node)
+            pool = get_pool(
+                host=host,
+                port=port,
+                decode_responses=decode_responses,
+                **self._pool_options,
+            )
+            client = self._clients.setdefault(
+                (node, decode_responses), redis.Redis(connection_pool=pool)
+            )
+        return client
+
+    def pick(self):
+        """The replica for the next read, or None when none is up."""
+        up, fastest = self._choice
+        if not up:
+            return None
+        if self.read_from == "least_latency":
+            return fastest
+        return up[next(self._turn) % len(up)]
+
+    def mark_down(self, node):
+        """Skip a replica until a probe finds it answering again."""
+        self.down = self.down | {node}
+        self._update()
+
+    def probe(self):
+        """Refresh the replicas (if discovered) and PING each one."""
+        if self._discover is not None:
+            try:
+                self.nodes = [_node_name(node) for node in self._discover()]
+            except redis.RedisError:
+                # Keep the replicas we knew about
+                pass
+        down = set()
+        for node in self.nodes:
+            start = time.perf_counter()
+            try:
+                self.client(node).ping()
+            except redis.RedisError:
+                down.add(node)
+                continue
+            seconds = time.perf_counter() - start
+            average = self.latency.get(node)
+            self.latency[node] = (
+                seconds if average is None else 0.8 * average + 0.2 * seconds
+            )
+        self.down = down
+        self._update()
+
+    def _update(self):
+        up = [node for node in self.nodes if node not in self.down]
+        fastest = min(
+            up, key=lambda node: self.latency.get(node, math.inf), default=None
+        )
+        self._choice = (up, fastest)
+
+    @property
+    def closed(self):
+        """True once close() was called."""
+        return self._stop.is_set()
+
+    def close(self):
+        """Stop probing."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.probe_seconds):
+            self.probe()
+
+
+def get_replica_set(
+    nodes=(),
+    discover=None,
+    discover_key=None,
+    read_from="round_robin",
+    probe_seconds=1.0,
+    **pool_options,
+):
+    """
+    Get the shared ReplicaSet for some replicas, creating it (and its probe
+    thread) on first use. Takes the same arguments as ReplicaSet, plus:
+
+    discover_key: What discover finds replicas from, e.g. the Sentinel
+                  addresses and service name. Sets are keyed by it instead
+                  of by discover, which is a new function every time.
+
+    close_pools() stops every shared set.
+    """
+    key = (
+        tuple(_node_name(node) for node in nodes),
+        discover_key if discover is not None else None,
+        read_from,
+        probe_seconds,
+        tuple(sorted(pool_options.items())),
+    )
+    with _lock:
+        replica_set = _replica_sets.get(key)
+        if replica_set is None or replica_set.closed:
+            replica_set = _replica_sets[key] = ReplicaSet(
+                nodes,
+                discover=discover,
+                read_from=read_from,
+                probe_seconds=probe_seconds,
+                **pool_options,
+            )
+        return replica_set
+
+
+def close_replica_sets():
+    """Stop the probe threads of every shared ReplicaSet and forget them."""
+    with _lock:
+        replica_sets = list(_replica_sets.values())
+        _replica_sets.clear()
+    for replica_set in replica_sets:
+        replica_set.close()
+
+
+class ReplicaRedis(CoreCommands):
+    """
+    A redis.Redis look-alike that reads from replicas.
+
+        replicas = ReplicaSet(["redis-2:6379", "redis-3:6379"])
+        client = ReplicaRedis(redis.Redis(host="redis-1"), replicas)
+        client.set("user:1", "Alice")   # sent to the primary
+        client.get("user:2")            # sent to a replica
+
+    primary: The redis.Redis client of the primary.
+    replicas: The ReplicaSet picking replicas (shared with other clients
+              for the same servers, e.g. a bytes-mode one).
+    decode_responses: Return strings from replicas instead of bytes (match
+                      the primary client).
+    sticky_seconds: After a write, read from the primary on the same thread
+                    for this long, so the thread sees its own writes.
+    """
+
+    def __init__(self, primary, replicas, decode_responses=True, sticky_seconds=1.0):
+        self.primary = primary
+        self.replicas = replicas
+        self.decode_responses = decode_responses
+        self.sticky_seconds = sticky_seconds
+        self.connection_pool = primary.connection_pool
+
+    def get_encoder(self):
+        return self.primary.get_encoder()
+
+    def _replica(self):
+        """The replica this thread's next read goes to, or None for the primary."""
+        if _local.primary or time.monotonic() - _local.wrote < self.sticky_seconds:
+            return None
+        return self.replicas.pick()
+
+    def reader(self):
+        """The client the next read of this thread goes to."""
+        node = self._replica()
+        if node is None:
+            return self.primary
+        return self.replicas.client(node, self.decode_responses)
+
+    def execute_command(self, *args, target_nodes=None, **options):
+        """Send a read to a replica (or target_nodes) and a write to the primary."""
+        if target_nodes is not None:
+            return target_nodes.execute_command(*args, **options)
+        command = args[0]
+        if command not in READ_COMMANDS:
+            try:
+                return self.primary.execute_command(*args, **options)
+            finally:
+                _local.wrote = time.monotonic()
+        node = None if command in _CURSOR_READS else self._replica()
+        if node is None:
+            return self.primary.execute_command(*args, **options)
+        try:
+            client = self.replicas.client(node, self.decode_responses)
+            return client.execute_command(*args, **options)
+        except (redis.ConnectionError, redis.TimeoutError):
+            self.replicas.mark_down(node)
+            return self.primary.execute_command(*args, **options)
+
+    def scan_iter(self, match=None, count=None, _type=None, **kwargs):
+        """Walk the keys with SCAN, every page from the same server."""
+        client = self.reader()
+        cursor = "0"
+        while cursor != 0:
+            cursor, keys = self.scan(
+                cursor, match, count, _type, target_nodes=client, **kwargs
+            )
+            yield from keys
+
+    def hscan_iter(self, name, match=None, count=None):
+        """Walk a hash with HSCAN, every page from the same server."""
+        client = self.reader()
+        cursor = "0"
+        while cursor != 0:
+            pieces = [name, cursor]
+            if match is not None:
+                pieces += ["MATCH", match]
+            if count is not None:
+                pieces += ["COUNT", count]
+            cursor, data = self.execute_command("HSCAN", *pieces, target_nodes=client)
+            yield from data.items()
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        """A pipeline sent to a replica if it only reads, else to the primary."""
+        return ReplicaPipeline(self, transaction, shard_hint)
+
+    def pubsub(self, **kwargs):
+        return self.primary.pubsub(**kwargs)
+
+
+class ReplicaPipeline(CoreCommands):
+    """
+    Pipeline for ReplicaRedis. Commands are queued here, and on execute()
+    replayed into a redis-py pipeline on a replica (when every command
+    reads) or on the primary.
+    """
+
+    def __init__(self, router, transaction=True, shard_hint=None):
+        self._router = router
+        self.transaction = transaction
+        self.shard_hint = shard_hint
+        # (args, options) of every queued command
+        self._commands = []
+        # True when a command was queued inside on_primary()
+        self._primary = False
+
+    def __len__(self):
+        return len(self._commands)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.reset()
+
+    def execute_command(self, *args, **options):
+        self._commands.append((args, options))
+        self._primary = self._primary or bool(_local.primary)
+        return self
+
+    def reset(self):
+        self._commands = []
+        self._primary = False
+
+    def execute(self, raise_on_error=True):
+        """Send the queued commands. Returns the replies in queue order."""
+        commands, primary = self._commands, self._primary
+        self.reset()
+        if not commands:
+            return []
+        router = self._router
+        reads = all(args[0] in READ_COMMANDS for args, _ in commands)
+        node = router._replica() if reads and not primary else None
+        if node is not None:
+            try:
+                client = router.replicas.client(node, router.decode_responses)
+                return self._send(client, commands, raise_on_error)
+            except (redis.ConnectionError, redis.TimeoutError):
+                router.replicas.mark_down(node)
+        try:
+            return self._send(router.primary, commands, raise_on_error)
+        finally:
+            if not reads:
+                _local.wrote = time.monotonic()
+
+    def _send(self, client, commands, raise_on_error):
+        pipe = client.pipeline(transaction=self.transaction, shard_hint=self.shard_hint)
+        for args, options in commands:
+            pipe.execute_command(*args, **options)
+        return pipe.execute(raise_on_error=raise_on_error)
@@ -0,0 +1,251 @@
+"""
+Session storage with sliding expiration.
+
+Each session is a hash that lives for expire_seconds after it was last
+used: reading it resets the TTL in the same round trip. A set per user
+lists their sessions, so all of them can be revoked at once.
+"""
+
+import secrets
+
+from .replicas import on_primary
+
+# Hash field holding the session's user id (hidden from get())
+USER_FIELD = "_user"
+
+# Lua helpers for the scripts below. A user's index must outlive each of
+# their sessions, so its TTL is raised to the session TTL but never cut.
+# touch() takes KEYS session | ARGV ttl_ms, user index prefix, user field
+HELPERS = """
+local function extend_index(index, ttl_ms)
+    if redis.call('PTTL', index) < tonumber(ttl_ms) then
+        redis.call('PEXPIRE', index, ttl_ms)
+    end
+end
+
+local function touch()
+    if redis.call('PEXPIRE', KEYS[1], ARGV[1]) == 0 then
+        return 0
+    end
+    local user = redis.call('HGET', KEYS[1], ARGV[3])
+    if user then
+        extend_index(ARGV[2] .. user, ARGV[1])
+    end
+    return 1
+end
+"""
+
+# KEYS session, user index | ARGV ttl_ms, session id, field, value, ...
+CREATE = HELPERS + """
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('PEXPIRE', KEYS[1], ARGV[1])
+redis.call('SADD', KEYS[2], ARGV[2])
+extend_index(KEYS[2], ARGV[1])
+return 1
+"""
+
+# KEYS session | ARGV ttl_ms, user index prefix, user field
+# Load the session's fields (flat) and extend it
+GET = HELPERS + """
+local data = redis.call('HGETALL', KEYS[1])
+if #data > 0 then
+    touch()
+end
+return data
+"""
+
+# KEYS session | ARGV ttl_ms, user index prefix, user field
+TOUCH = HELPERS + "return touch()\n"
+
+# KEYS session | ARGV ttl_ms, user index prefix, user field, field, value, ...
+# Update fields only if the session still exists, and extend it
+SET_FIELDS = HELPERS + """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+return touch()
+"""
+
+# KEYS session | ARGV user index prefix, user field, session id
+REVOKE = """
+local user = redis.call('HGET', KEYS[1], ARGV[2])
+local deleted = redis.call('DEL', KEYS[1])
+if user then
+    redis.call('SREM', ARGV[1] .. user, ARGV[3])
+end
+return deleted
+"""
+
+# KEYS user index | ARGV session key prefix
+REVOKE_USER = """
+local revoked = 0
+for _, id in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    revoked = revoked + redis.call('DEL', ARGV[1] .. id)
+end
+redis.call('DEL', KEYS[1])
+return revoked
+"""
+
+
+class SessionStore:
+    """
+    Login sessions that expire after expire_seconds without use.
+
+    Use through AppSpace.sessions():
+
+        sessions = app.sessions(expire_seconds=3600)
+        sid = sessions.create("user_42", {"role": "admin"})
+
+        session = sessions.get(sid)   # one round trip, TTL extended
+        sessions.update(sid, theme="dark")
+        sessions.revoke_user("user_42")
+
+    Keys: "<prefix>:<session id>" and "<prefix>:by_user:<user id>". The
+    user's set expires with the last of their sessions.
+    """
+
+    def __init__(self, app, expire_seconds=3600, prefix="session"):
+        app._needs_one_slot("Sessions")
+        self.app = app
+        self.expire_seconds = expire_seconds
+        self.prefix = prefix
+        self._session_prefix = app._key(f"{prefix}:")
+        self._user_prefix = app._key(f"{prefix}:by_user:")
+        client = app.client
+        self._create = client.register_script(CREATE)
+        self._get = client.register_script(GET)
+        self._touch = client.register_script(TOUCH)
+        self._set_fields = client.register_script(SET_FIELDS)
+        self._revoke = client.register_script(REVOKE)
+        self._revoke_user = client.register_script(REVOKE_USER)
+
+    @property
+    def _ttl_ms(self):
+        return int(self.expire_seconds * 1000)
+
+    def _touch_args(self):
+        return [self._ttl_ms, self._user_prefix, USER_FIELD]
+
+    def create(self, user_id, data=None, session_id=None):
+        """
+        Start a session for user_id. Returns the session id.
+
+        data: Fields to store in the session (optional).
+        session_id: Use this id instead of a random one (optional).
+        """
+        session_id = session_id or secrets.token_urlsafe(24)
+        key = f"{self._session_prefix}{session_id}"
+        fields = self._encode(data or {})
+        fields[USER_FIELD] = user_id
+        args = [self._ttl_ms, session_id]
+        for field, value in fields.items():
+            args += [field, value]
+        self._create(keys=[key, f"{self._user_prefix}{user_id}"], args=args)
+        return session_id
+
+    def get(self, session_id, touch=True):
+        """
+        Load a session's fields, or None if it expired or was revoked.
+
+        touch: Also restart the session's expiration (HGETALL + PEXPIRE
+               in one Lua script, so one round trip).
+        """
+        key = f"{self._session_prefix}{session_id}"
+        if touch:
+            reply = self._get(keys=[key], args=self._touch_args())
+            data = dict(zip(reply[::2], reply[1::2]))
+        else:
+            data = self.app.client.hgetall(key)
+        if not data:
+            return None
+        return self._decode(data)
+
+    def user_of(self, session_id):
+        """Get the user id a session belongs to, or None."""
+        user = self.app.client.hget(f"{self._session_prefix}{session_id}", USER_FIELD)
+        return user.decode() if isinstance(user, bytes) else user
+
+    def update(self, session_id, mapping=None, /, **fields):
+        """
+        Set some fields of a live session and restart its expiration.
+
+        Returns False (and stores nothing) if the session is gone.
+        """
+        fields = self._encode({**(mapping or {}), **fields})
+        if not fields:
+            return self.touch(session_id)
+        args = self._touch_args()
+        for field, value in fields.items():
+            args += [field, value]
+        return bool(
+            self._set_fields(keys=[f"{self._session_prefix}{session_id}"], args=args)
+        )
+
+    def touch(self, session_id):
+        """Restart a session's expiration. Returns False if it is gone."""
+        return bool(
+            self._touch(
+                keys=[f"{self._session_prefix}{session_id}"], args=self._touch_args()
+            )
+        )
+
+    def revoke(self, session_id):
+        """End one session. Returns True if it existed."""
+        return bool(
+            self._revoke(
+                keys=[f"{self._session_prefix}{session_id}"],
+                args=[self._user_prefix, USER_FIELD, session_id],
+            )
+        )
+
+    def revoke_user(self, user_id):
+        """End every session of a user. Returns how many were live."""
+        return self._revoke_user(
+            keys=[f"{self._user_prefix}{user_id}"], args=[self._session_prefix]
+        )
+
+    def user_sessions(self, user_id):
+        """
+        List the ids of a user's live sessions.
+
+        Ids of sessions that expired on their own are dropped from the
+        user's set along the way.
+        """
+        index = f"{self._user_prefix}{user_id}"
+        client = self.app.client
+        # On a lagging replica a new session looks expired, and dropping
+        # it from the index would hide it from revoke_user()
+        with on_primary():
+            ids = sorted(_text(id) for id in client.smembers(index))
+            if not ids:
+                return []
+            pipe = client.pipeline(transaction=False)
+            for id in ids:
+                pipe.exists(f"{self._session_prefix}{id}")
+            alive = pipe.execute()
+        expired = [id for id, live in zip(ids, alive) if not live]
+        if expired:
+            client.srem(index, *expired)
+        return [id for id, live in zip(ids, alive) if live]
+
+    def _encode(self, fields):
+        codec = self.app.codec
+        if codec is None:
+            return dict(fields)
+        return {field: codec.encode(value) for field, value in fields.items()}
+
+    def _decode(self, data):
+        codec = self.app.codec
+        if codec is None:
+            data.pop(USER_FIELD, None)
+            return data
+        return {
+            _text(field): codec.decode(value)
+            for field, value in data.items()
+            if _text(field) != USER_FIELD
+        }
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
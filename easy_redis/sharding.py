@@ -0,0 +1,531 @@
+"""
+Client-side sharding: spread keys over several standalone Redis servers.
+
+Keys are mapped to one of 16384 slots the way Redis Cluster does it (CRC16
+of the key, or of its {hash tag}), and slots are mapped to servers with a
+consistent hash ring with virtual nodes. Adding a server moves only about
+1/N of the slots, all of them to the new server; rebalance() then moves
+the keys of those slots there with MIGRATE.
+
+ShardedRedis looks like a redis.Redis client: single-key commands go to
+the shard of their key, and multi-key commands and pipelines are split per
+shard, sent in parallel threads and merged back in order.
+"""
+
+import bisect
+import collections
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from redis.commands import CoreCommands
+from redis.commands.helpers import list_or_args
+from redis.crc import REDIS_CLUSTER_HASH_SLOTS, key_slot
+
+from .metrics import parallel
+from .pool import _node_address, get_pool
+
+# Commands sent to every shard (DBSIZE replies are added up)
+_EVERY_SHARD = {"FLUSHDB", "FLUSHALL", "DBSIZE", "PING", "SCRIPT LOAD", "SCRIPT FLUSH"}
+# Commands whose keys come after a numkeys argument
+_NUMKEYS = {"EVAL", "EVALSHA", "EVAL_RO", "EVALSHA_RO", "FCALL", "FCALL_RO"}
+
+# One shard, in the shape of a RedisCluster node
+Shard = collections.namedtuple("Shard", "name redis_connection")
+
+_slot_points = None
+
+
+def _hash(text):
+    """Position of text on the ring (64 bits of its MD5)."""
+    return int.from_bytes(hashlib.md5(text.encode()).digest()[:8], "big")
+
+
+def _slot(key):
+    """Hash slot of a key (str, bytes or number)."""
+    if isinstance(key, str):
+        key = key.encode()
+    elif not isinstance(key, bytes):
+        key = str(key).encode()
+    return key_slot(key)
+
+
+class HashRing:
+    """
+    Consistent hash ring that maps the 16384 slots to nodes.
+
+    nodes: Node names ("host:port" or (host, port)).
+    vnodes: Points per node on the ring; more points spread the slots
+            more evenly.
+
+    ring.owners[slot] is the node that owns a slot. Nodes removed since
+    the last rebalance are kept in ring.retired, since they still hold keys.
+    """
+
+    def __init__(self, nodes=(), vnodes=160):
+        self.vnodes = vnodes
+        self.nodes = []
+        self.retired = []
+        self.owners = []
+        self._points = []
+        self._lock = threading.Lock()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        """Add a node. Returns the number of slots it took over."""
+        node = _node_name(node)
+        with self._lock:
+            if node in self.nodes:
+                raise ValueError(f"{node} is already on the ring")
+            self.nodes = self.nodes + [node]
+            if node in self.retired:
+                self.retired = [n for n in self.retired if n != node]
+            self._points = sorted(
+                self._points
+                + [(_hash(f"{node}#{i}"), node) for i in range(self.vnodes)]
+            )
+            return self._assign()
+
+    def remove(self, node):
+        """Remove a node. Returns the number of slots given to the others."""
+        node = _node_name(node)
+        with self._lock:
+            if node not in self.nodes:
+                raise ValueError(f"{node} is not on the ring")
+            if len(self.nodes) == 1:
+                raise ValueError("Can't remove the last node")
+            self.nodes = [n for n in self.nodes if n != node]
+            self.retired = self.retired + [node]
+            self._points = [point for point in self._points if point[1] != node]
+            return self._assign()
+
+    def node_for(self, key):
+        """The node that owns a key."""
+        return self.owners[_slot(key)]
+
+    def _assign(self):
+        """Give every slot to the next point clockwise. Returns slots moved."""
+        global _slot_points
+        if _slot_points is None:
+            _slot_points = [
+                _hash(f"slot:{slot}") for slot in range(REDIS_CLUSTER_HASH_SLOTS)
+            ]
+        hashes = [h for h, _ in self._points]
+        nodes = [node for _, node in self._points]
+        owners = [
+            nodes[bisect.bisect(hashes, point) % len(nodes)] for point in _slot_points
+        ]
+        moved = sum(a != b for a, b in zip(self.owners, owners)) if self.owners else 0
+        # Swapped in one assignment, so readers see the old or the new map
+        self.owners = owners
+        return moved
+
+
+def _node_name(node):
+    """Canonical "host:port" name of a node."""
+    return "%s:%d" % _node_address(node)
+
+
+def _total(groups, replies):
+    return sum(replies)
+
+
+def _all_ok(groups, replies):
+    return all(replies)
+
+
+def _in_order(groups, replies):
+    """Put per-shard replies back in key order."""
+    values = [None] * sum(map(len, groups))
+    for positions, reply in zip(groups, replies):
+        for i, value in zip(positions, reply):
+            values[i] = value
+    return values
+
+
+def _split_args(command, keys, positions, mapping):
+    """Arguments of command for the keys at positions (mapping: with values)."""
+    if mapping is None:
+        return (command, *[keys[i] for i in positions])
+    return (command, *[part for i in positions for part in (keys[i], mapping[keys[i]])])
+
+
+class _MultiKeyCommands:
+    """Multi-key commands whose keys may be on different shards."""
+
+    def mget(self, keys, *args):
+        return self._split("MGET", list_or_args(keys, args), _in_order)
+
+    def mset(self, mapping):
+        return self._split("MSET", list(mapping), _all_ok, mapping)
+
+    def delete(self, *names):
+        return self._split("DEL", names, _total)
+
+    def unlink(self, *names):
+        return self._split("UNLINK", names, _total)
+
+    def exists(self, *names):
+        return self._split("EXISTS", names, _total)
+
+    def touch(self, *names):
+        return self._split("TOUCH", names, _total)
+
+
+class ShardedRedis(_MultiKeyCommands, CoreCommands):
+    """
+    A redis.Redis look-alike that spreads keys over standalone servers.
+
+        client = ShardedRedis(HashRing(["redis-1:6379", "redis-2:6379"]))
+        client.set("user:1", "Alice")   # sent to the shard owning user:1
+
+    ring: The HashRing deciding where keys go (shared with other clients
+          for the same servers, e.g. a bytes-mode one).
+    decode_responses: Return strings instead of bytes.
+    executor: Thread pool for parallel fan-out (optional; one is made).
+    pool_options: Passed to every shard's connection pool (db, password, ...).
+
+    Commands naming several keys only run as one command when the keys
+    share a shard; Lua scripts and transactions need that, so give their
+    keys a common {hash tag}. Pub/sub channels are routed like keys.
+    """
+
+    def __init__(self, ring, decode_responses=True, executor=None, **pool_options):
+        self.ring = ring
+        self.decode_responses = decode_responses
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=32, thread_name_prefix="easy-redis-shards"
+        )
+        self._pool_options = pool_options
+        # node name -> redis.Redis
+        self._clients = {}
+
+    def shard(self, node):
+        """The redis.Redis client of one node."""
+        client = self._clients.get(node)
+        if client is None:
+            host, port = _node_address(node)
+            pool = get_pool(
+                host=host,
+                port=port,
+                decode_responses=self.decode_responses,
+                **self._pool_options,
+            )
+            client = self._clients.setdefault(node, redis.Redis(connection_pool=pool))
+        return client
+
+    def get_primaries(self):
+        """Every shard, like RedisCluster.get_primaries()."""
+        return [Shard(node, self.shard(node)) for node in self.ring.nodes]
+
+    def get_encoder(self):
+        return self.shard(self.ring.nodes[0]).get_encoder()
+
+    def execute_command(self, *args, target_nodes=None, **options):
+        """Send a command to the shard of its key (or to target_nodes)."""
+        if target_nodes is not None:
+            return target_nodes.redis_connection.execute_command(*args, **options)
+        if args[0] in _EVERY_SHARD:
+            replies = parallel(
+                self.executor,
+                lambda shard: shard.redis_connection.execute_command(*args, **options),
+                self.get_primaries(),
+            )
+            return sum(replies) if args[0] == "DBSIZE" else replies[0]
+        return self.shard(_node_for(self.ring, args)).execute_command(*args, **options)
+
+    def _by_shard(self, keys):
+        """Group the positions of keys by the node that owns them."""
+        owners = self.ring.owners
+        groups = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(owners[_slot(key)], []).append(i)
+        return groups
+
+    def _split(self, command, keys, merge, mapping=None):
+        """Send command once per shard with that shard's keys, in parallel."""
+        groups = list(self._by_shard(keys).values())
+
+        def send(positions):
+            return self.execute_command(*_split_args(command, keys, positions, mapping))
+
+        if len(groups) == 1:
+            replies = [send(groups[0])]
+        else:
+            replies = parallel(self.executor, send, groups)
+        return merge(groups, replies)
+
+    def scan(self, cursor=0, match=None, count=None, _type=None, target_nodes=None):
+        """
+        SCAN one shard (target_nodes) or the first page of every shard, like
+        RedisCluster.scan(). Returns ({node name: cursor}, keys).
+        """
+        shards = [target_nodes] if target_nodes is not None else self.get_primaries()
+        cursors, keys = {}, []
+        for shard in shards:
+            cursors[shard.name], page = super().scan(
+                cursor, match=match, count=count, _type=_type, target_nodes=shard
+            )
+            keys += page
+        return cursors, keys
+
+    def scan_iter(self, match=None, count=None, _type=None):
+        """Walk the keys of every shard, one shard after the other."""
+        for shard in self.get_primaries():
+            cursor = 0
+            while True:
+                cursors, keys = self.scan(cursor, match, count, _type, shard)
+                yield from keys
+                cursor = cursors[shard.name]
+                if not cursor:
+                    break
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        """
+        A pipeline whose commands are sent to their shards in parallel.
+
+        transaction: Wrap each shard's commands in MULTI/EXEC. Atomic per
+                     shard only, so keep a transaction's keys on one shard.
+        """
+        return ShardedPipeline(self, transaction)
+
+    def pubsub(self, **kwargs):
+        """A PubSub on the shard of the first channel subscribed to."""
+        return _ShardedPubSub(self, kwargs)
+
+    # -------- Changing the shards --------
+
+    def add_shard(self, node):
+        """
+        Start sending keys to a new node. Returns the number of slots moved.
+
+        Keys already stored for those slots stay on their old shard (and
+        are not found) until rebalance() moves them.
+        """
+        return self.ring.add(node)
+
+    def remove_shard(self, node):
+        """
+        Stop sending keys to a node. Returns the number of slots moved.
+
+        Its keys are not found until rebalance() moves them to the others.
+        """
+        return self.ring.remove(node)
+
+    def rebalance(self, match=None, count=1000, timeout_ms=10_000, progress=None):
+        """
+        Move every key that is not on the shard owning it, with MIGRATE
+        (values and TTLs are kept). A key that is already on the target was
+        written there after the shard change, so that newer copy is kept
+        and the old one deleted.
+
+        match: Only move keys matching this glob pattern (optional).
+        count: Keys looked at per SCAN call, and moved per MIGRATE.
+        timeout_ms: MIGRATE timeout.
+        progress: Called with the running total after each MIGRATE
+                  (optional; called from the worker threads).
+
+        Shards are scanned in parallel. Returns the number of keys moved.
+        """
+        ring = self.ring
+        sources = ring.nodes + ring.retired
+        moved = 0
+        lock = threading.Lock()
+        db = self._pool_options.get("db", 0)
+        password = self._pool_options.get("password")
+
+        def drain(source):
+            nonlocal moved
+            client = self.shard(source)
+            for page in _pages(client.scan_iter(match=match, count=count), count):
+                targets = {}
+                for key in page:
+                    owner = ring.node_for(key)
+                    if owner != source:
+                        targets.setdefault(owner, []).append(key)
+                for owner, keys in targets.items():
+                    done = _migrate(client, owner, keys, db, timeout_ms, password)
+                    with lock:
+                        moved += done
+                        if progress:
+                            progress(moved)
+
+        parallel(self.executor, drain, sources)
+        with ring._lock:
+            ring.retired = [node for node in ring.retired if node not in sources]
+        return moved
+
+
+class ShardedPipeline(_MultiKeyCommands, CoreCommands):
+    """
+    Pipeline for ShardedRedis: one redis-py pipeline per shard, sent in
+    parallel on execute() and merged back into one list of replies.
+    """
+
+    def __init__(self, sharded, transaction=True):
+        self._sharded = sharded
+        self.transaction = transaction
+        # node name -> redis-py pipeline
+        self._pipes = {}
+        # One entry per queued command: (args, [(node, position)], merge)
+        self._commands = []
+
+    def __len__(self):
+        return len(self._commands)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.reset()
+
+    def _queue(self, node, args, options):
+        """Queue args on a node's pipeline. Returns (node, position)."""
+        pipe = self._pipes.get(node)
+        if pipe is None:
+            client = self._sharded.shard(node)
+            pipe = self._pipes[node] = client.pipeline(transaction=self.transaction)
+        pipe.execute_command(*args, **options)
+        return node, len(pipe) - 1
+
+    def execute_command(self, *args, **options):
+        node = _node_for(self._sharded.ring, args)
+        self._commands.append((args, [self._queue(node, args, options)], None))
+        return self
+
+    def _split(self, command, keys, merge, mapping=None):
+        groups = list(self._sharded._by_shard(keys).items())
+        parts = [
+            self._queue(node, _split_args(command, keys, positions, mapping), {})
+            for node, positions in groups
+        ]
+        positions = [positions for _, positions in groups]
+        self._commands.append(
+            ((command, *keys), parts, lambda replies: merge(positions, replies))
+        )
+        return self
+
+    def reset(self):
+        for pipe in self._pipes.values():
+            pipe.reset()
+        self._pipes = {}
+        self._commands = []
+
+    def execute(self, raise_on_error=True):
+        """Send every shard's commands. Returns the replies in queue order."""
+        pipes, commands = self._pipes, self._commands
+        self._pipes, self._commands = {}, []
+        if not commands:
+            return []
+        nodes = list(pipes)
+
+        def send(node):
+            return pipes[node].execute(raise_on_error=False)
+
+        if len(nodes) == 1:
+            replies = {nodes[0]: send(nodes[0])}
+        else:
+            replies = dict(zip(nodes, parallel(self._sharded.executor, send, nodes)))
+        results = []
+        for args, parts, merge in commands:
+            values = [replies[node][position] for node, position in parts]
+            errors = [value for value in values if isinstance(value, Exception)]
+            if errors:
+                results.append(errors[0])
+            else:
+                results.append(merge(values) if merge else values[0])
+        if raise_on_error:
+            for number, (reply, (args, _, _)) in enumerate(zip(results, commands), 1):
+                if isinstance(reply, Exception):
+                    command = " ".join(map(str, args))[:100]
+                    reply.args = (
+                        f"Command # {number} ({command}) of pipeline caused error: "
+                        f"{reply.args[0]}",
+                    ) + reply.args[1:]
+                    raise reply
+        return results
+
+
+class _ShardedPubSub:
+    """A PubSub that connects to the shard of the first channel subscribed."""
+
+    def __init__(self, sharded, options):
+        self._sharded = sharded
+        self._options = options
+        self._pubsub = None
+
+    def subscribe(self, *args, **kwargs):
+        if self._pubsub is None:
+            channel = args[0] if args else next(iter(kwargs))
+            client = self._sharded.shard(self._sharded.ring.node_for(channel))
+            self._pubsub = client.pubsub(**self._options)
+        return self._pubsub.subscribe(*args, **kwargs)
+
+    def close(self):
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+    def __getattr__(self, name):
+        if self._pubsub is None:
+            raise AttributeError(f"{name} (subscribe to a channel first)")
+        return getattr(self._pubsub, name)
+
+
+def _node_for(ring, args):
+    """The node a command goes to: the one owning its first key."""
+    command = args[0]
+    if command in _NUMKEYS:
+        keys = args[3 : 3 + int(args[2])]
+        if not keys:
+            raise ValueError(f"Can't pick a shard for {command} without keys")
+        nodes = {ring.node_for(key) for key in keys}
+        if len(nodes) > 1:
+            # What Redis Cluster says too; running on one shard would
+            # quietly miss the keys on the others
+            raise redis.ResponseError(
+                "CROSSSLOT Keys in request don't hash to the same shard"
+            )
+        return nodes.pop()
+    if len(args) < 2:
+        raise ValueError(f"Can't pick a shard for {command}: it names no key")
+    return ring.node_for(args[1])
+
+
+def _migrate(client, node, keys, db, timeout_ms, password):
+    """MIGRATE keys to node without REPLACE. Returns how many were moved."""
+    host, port = _node_address(node)
+    try:
+        reply = client.migrate(host, port, keys, db, timeout_ms, auth=password)
+        return len(keys) if reply in ("OK", b"OK") else 0
+    except redis.ResponseError as error:
+        if "BUSYKEY" not in str(error):
+            raise
+    # The other keys went; the ones the target already has are still here
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.exists(key)
+    left = [key for key, here in zip(keys, pipe.execute()) if here]
+    moved = len(keys) - len(left)
+    for key in left:
+        try:
+            reply = client.migrate(host, port, key, db, timeout_ms, auth=password)
+            moved += reply in ("OK", b"OK")
+        except redis.ResponseError as error:
+            if "BUSYKEY" not in str(error):
+                raise
+            client.delete(key)
+    return moved
+
+
+def _pages(keys, size):
+    """Group an iterator of keys into lists of at most size keys."""
+    page = []
+    for key in keys:
+        page.append(key)
+        if len(page) >= size:
+            yield page
+            page = []
+    if page:
+        yield page
@@ -0,0 +1,230 @@
+"""
+Redis Streams with consumer groups.
+
+Every consumer group gets each message once and shares the work among
+its consumers; messages stay in the stream (up to maxlen) so they can
+be replayed. Acks are collected and sent along with the next read.
+"""
+
+from collections import namedtuple
+
+import redis
+
+# id: Stream entry id, e.g. "1700000000000-0"
+# fields: The dict that was published
+Message = namedtuple("Message", "id fields")
+
+
+class Stream:
+    """
+    An append-only log that many consumer groups can read.
+
+    Use through AppSpace.stream():
+
+        events = app.stream("notifications")
+        events.publish({"user": "42", "text": "Welcome!"})
+
+        for message in events.consume("mailer", "worker-1", block=5):
+            send(message.fields)
+            events.ack("mailer", message.id)
+    """
+
+    def __init__(self, app, name, maxlen=100_000):
+        self.app = app
+        self.name = name
+        self.maxlen = maxlen
+        self.key = app._key(name)
+        self._groups = set()
+        # group -> ids acked but not yet sent to Redis
+        self._acks = {}
+
+    # -------- Publishing --------
+
+    def publish(self, fields):
+        """
+        Append a message (a dict of fields). Returns its id.
+
+        The stream is trimmed to about maxlen messages (XADD MAXLEN ~),
+        which is much cheaper than exact trimming.
+        """
+        return _text(self.app.client.xadd(self.key, self._encode(fields), **self._trim))
+
+    def publish_many(self, messages):
+        """Append many messages in one round trip. Returns their ids."""
+        pipe = self.app.client.pipeline(transaction=False)
+        for fields in messages:
+            pipe.xadd(self.key, self._encode(fields), **self._trim)
+        return [_text(id) for id in pipe.execute()]
+
+    # -------- Consuming --------
+
+    def create_group(self, group, start="0"):
+        """
+        Create a consumer group (and the stream, if needed).
+
+        start: "0" to read every message still in the stream, "$" for
+               only new ones. Does nothing if the group exists.
+        """
+        try:
+            self.app.client.xgroup_create(self.key, group, start, mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add(group)
+
+    def consume(self, group, consumer, count=100, block=0):
+        """
+        Read up to count new messages for a consumer in a group.
+
+        block: Seconds to wait for messages (0: don't wait, None: wait
+               forever). Keep it below the client's socket_timeout.
+
+        The group is created on first use. Acks queued with ack() are
+        sent in the same round trip. Messages stay pending until acked;
+        use claim() to take over ones a dead consumer never acked.
+        """
+        if group not in self._groups:
+            self.create_group(group)
+        try:
+            return self._read(group, consumer, count, block)
+        except redis.ResponseError as e:
+            if "NOGROUP" not in str(e):
+                raise
+            # The stream was deleted; start over
+            self._groups.discard(group)
+            self.create_group(group)
+            return self._read(group, consumer, count, block)
+
+    def ack(self, group, *ids):
+        """
+        Mark messages as handled by the group.
+
+        Acks are sent with the next consume() call (or flush_acks()), so
+        handling a batch costs no extra round trips.
+        """
+        self._acks.setdefault(group, []).extend(ids)
+
+    def flush_acks(self):
+        """Send queued acks now. Returns the number Redis accepted."""
+        if not any(self._acks.values()):
+            return 0
+        pipe = self.app.client.pipeline(transaction=False)
+        self._queue_acks(pipe)
+        return sum(pipe.execute())
+
+    def claim(self, group, consumer, min_idle_seconds=60, count=100):
+        """
+        Take over messages pending for too long (XAUTOCLAIM).
+
+        Messages another consumer read but didn't ack for min_idle_seconds
+        are handed to consumer and returned, e.g. after a worker crashed.
+        Up to count messages are claimed; the whole pending list is
+        scanned if needed to find them.
+        """
+        self.flush_acks()
+        claimed = []
+        cursor = "0-0"
+        while len(claimed) < count:
+            reply = self.app.client.xautoclaim(
+                self.key,
+                group,
+                consumer,
+                int(min_idle_seconds * 1000),
+                cursor,
+                count=count - len(claimed),
+            )
+            claimed += self._messages(reply[1])
+            cursor = _text(reply[0])
+            if cursor == "0-0":
+                break
+        return claimed
+
+    # -------- Inspecting --------
+
+    def read(self, start="-", end="+", count=100):
+        """
+        Read messages by id, oldest first, without a group (for replay).
+
+        Example: read(count=10) -> the 10 oldest messages
+        """
+        return self._messages(self.app.client.xrange(self.key, start, end, count=count))
+
+    def pending(self, group):
+        """Number of messages the group has read but not acked."""
+        self.flush_acks()
+        return self.app.client.xpending(self.key, group)["pending"]
+
+    def length(self):
+        """Number of messages in the stream."""
+        return self.app.client.xlen(self.key)
+
+    def delete(self):
+        """Delete the stream and all of its groups."""
+        self._acks.clear()
+        self._groups.clear()
+        self.app.client.delete(self.key)
+
+    # -------- Helpers --------
+
+    @property
+    def _trim(self):
+        if self.maxlen is None:
+            return {}
+        return {"maxlen": self.maxlen, "approximate": True}
+
+    def _read(self, group, consumer, count, block):
+        pipe = self.app.client.pipeline(transaction=False)
+        acked = self._queue_acks(pipe)
+        pipe.xreadgroup(
+            group,
+            consumer,
+            {self.key: ">"},
+            count=count,
+            block=None if block == 0 else int((block or 0) * 1000),
+        )
+        try:
+            reply = pipe.execute()[-1]
+        except Exception:
+            # Keep the acks for the next try
+            for ack_group, ids in acked.items():
+                self.ack(ack_group, *ids)
+            raise
+        if not reply:
+            return []
+        if isinstance(reply, dict):
+            # RESP3: {stream: [entries]}
+            (entries,) = reply.popitem()[1]
+        else:
+            # RESP2: [[stream, entries]]
+            entries = reply[0][1]
+        return self._messages(entries)
+
+    def _queue_acks(self, pipe):
+        """Add queued acks to a pipeline. Returns what was queued."""
+        acked, self._acks = self._acks, {}
+        for group, ids in acked.items():
+            if ids:
+                pipe.xack(self.key, group, *ids)
+        return acked
+
+    def _encode(self, fields):
+        codec = self.app.codec
+        if codec is None:
+            return fields
+        return {field: codec.encode(value) for field, value in fields.items()}
+
+    def _messages(self, entries):
+        codec = self.app.codec
+        messages = []
+        for id, fields in entries:
+            if fields is None:
+                # Deleted by trimming while still pending
+                continue
+            if codec is not None:
+                fields = {_text(k): codec.decode(v) for k, v in fields.items()}
+            messages.append(Message(_text(id), fields))
+        return messages
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
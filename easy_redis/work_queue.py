@@ -0,0 +1,388 @@
+"""
+A reliable work queue on Redis lists.
+
+Jobs wait in a list. A consumer moves each job (LMOVE) into its own
+processing list and leases it for visibility_timeout seconds, in the same
+Lua script, so a job is never held without a lease. ack()
+removes a finished job, and extend() renews the lease of a job that is
+still being worked on; jobs whose lease runs out, e.g. because the worker
+died, are put back by requeue_stale().
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+# id: Unique job id
+# data: What was enqueued
+# item: The raw list entry (used by ack/nack)
+Job = namedtuple("Job", "id data item")
+
+# KEYS pending, processing, leases | ARGV count, lease_ms, worker
+# Moves up to count jobs and leases them.
+TAKE = """
+local t = redis.call('TIME')
+local deadline = t[1] * 1000 + math.floor(t[2] / 1000) + tonumber(ARGV[2])
+local items = {}
+for i = 1, tonumber(ARGV[1]) do
+    local item = redis.call('LMOVE', KEYS[1], KEYS[2], 'RIGHT', 'LEFT')
+    if not item then
+        break
+    end
+    redis.call('ZADD', KEYS[3], deadline, ARGV[3] .. '\\n' .. item)
+    items[i] = item
+end
+return items
+"""
+
+# KEYS processing, leases, destination (left out to drop) | ARGV worker, items...
+# Settles jobs this worker still holds. Returns how many it held.
+SETTLE = """
+local settled = 0
+for i = 2, #ARGV do
+    redis.call('ZREM', KEYS[2], ARGV[1] .. '\\n' .. ARGV[i])
+    if redis.call('LREM', KEYS[1], 1, ARGV[i]) > 0 then
+        settled = settled + 1
+        if KEYS[3] then
+            redis.call('LPUSH', KEYS[3], ARGV[i])
+        end
+    end
+end
+return settled
+"""
+
+# KEYS leases | ARGV lease_ms, worker, items...
+# Renews the leases this worker still holds. Returns how many it renewed.
+EXTEND = """
+local t = redis.call('TIME')
+local deadline = t[1] * 1000 + math.floor(t[2] / 1000) + tonumber(ARGV[1])
+local extended = 0
+for i = 3, #ARGV do
+    local member = ARGV[2] .. '\\n' .. ARGV[i]
+    extended = extended + redis.call('ZADD', KEYS[1], 'XX', 'CH', deadline, member)
+end
+return extended
+"""
+
+# KEYS pending, leases | ARGV processing key prefix, max jobs
+# Puts jobs with expired leases back at the front of the queue.
+REQUEUE = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, ARGV[2])
+local requeued = 0
+for _, member in ipairs(expired) do
+    local sep = string.find(member, '\\n', 1, true)
+    local processing = ARGV[1] .. string.sub(member, 1, sep - 1)
+    local item = string.sub(member, sep + 1)
+    redis.call('ZREM', KEYS[2], member)
+    if redis.call('LREM', processing, 1, item) > 0 then
+        redis.call('RPUSH', KEYS[1], item)
+        requeued = requeued + 1
+    end
+end
+return requeued
+"""
+
+# KEYS pending, processing, leases | ARGV worker
+# Puts everything a worker holds back at the front of the queue.
+RECOVER = """
+local items = redis.call('LRANGE', KEYS[2], 0, -1)
+for _, item in ipairs(items) do
+    redis.call('ZREM', KEYS[3], ARGV[1] .. '\\n' .. item)
+    redis.call('RPUSH', KEYS[1], item)
+end
+redis.call('DEL', KEYS[2])
+return #items
+"""
+
+
+class WorkQueue:
+    """
+    A queue where every job is handled at least once.
+
+    Use through AppSpace.work_queue():
+
+        jobs = app.work_queue("emails")
+        jobs.enqueue("welcome:42")
+
+        job = jobs.dequeue(timeout=5)
+        if job:
+            send(job.data)
+            jobs.ack(job)
+
+    Or let run() feed a thread (or process) pool:
+
+        jobs.run(send, workers=8)
+
+    Each WorkQueue object is one worker with its own processing list.
+    Keys: "<name>" (waiting), "<name>:processing:<worker>",
+    "<name>:leases" and "<name>:failed".
+    """
+
+    def __init__(self, app, name, visibility_timeout=30, worker_id=None):
+        app._needs_one_slot("Work queues")
+        self.app = app
+        self.name = name
+        self.visibility_timeout = visibility_timeout
+        self.worker_id = worker_id or (
+            f"{socket.gethostname()}-{os.getpid()}-{os.urandom(3).hex()}"
+        )
+        self._pending = app._key(name)
+        self._processing_prefix = app._key(f"{name}:processing:")
+        self._processing = self._processing_prefix + self.worker_id
+        self._leases = app._key(f"{name}:leases")
+        self._failed = app._key(f"{name}:failed")
+        client = app.client
+        self._take = client.register_script(TAKE)
+        self._settle = client.register_script(SETTLE)
+        self._extend = client.register_script(EXTEND)
+        self._requeue = client.register_script(REQUEUE)
+        self._recover = client.register_script(RECOVER)
+
+    # -------- Producing --------
+
+    def enqueue(self, data):
+        """Add a job to the back of the queue. Returns its id."""
+        return self.enqueue_many([data])[0]
+
+    def enqueue_many(self, items):
+        """Add many jobs in one command. Returns their ids."""
+        ids = [os.urandom(8).hex() for _ in items]
+        if ids:
+            self.app.client.lpush(
+                self._pending, *[self._pack(id, data) for id, data in zip(ids, items)]
+            )
+        return ids
+
+    # -------- Consuming --------
+
+    def dequeue(self, timeout=0):
+        """
+        Take the next job, or None if there is none.
+
+        timeout: Seconds to wait for a job (0: don't wait, None: wait
+                 forever). Waiting blocks in Redis (BLMOVE), so nothing
+                 busy-polls.
+                 Keep it below the client's socket_timeout.
+
+        Finish the job with ack(), or nack() to give it back.
+        """
+        jobs = self.dequeue_many(1, timeout=timeout)
+        return jobs[0] if jobs else None
+
+    def dequeue_many(self, count, timeout=0):
+        """
+        Take up to count jobs in one round trip.
+
+        If the queue is empty, waits up to timeout seconds for the first
+        job (like dequeue), then takes whatever else is there.
+        """
+        if count <= 0:
+            return []
+        items = self._take_items(count)
+        if items or timeout == 0:
+            return self._unpack(items)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not items:
+            wait = 0 if deadline is None else deadline - time.monotonic()
+            if deadline is not None and wait < 0.001:
+                # BLMOVE would read a 0 timeout as "forever"
+                return []
+            # Wait for a job without taking it: BLMOVE from the queue's
+            # right end back to itself leaves the queue as it was. Only
+            # TAKE moves jobs out, together with their leases.
+            client = self.app.client
+            if (
+                client.blmove(self._pending, self._pending, wait, "RIGHT", "RIGHT")
+                is None
+            ):
+                return []
+            # Empty if another worker took the job first
+            items = self._take_items(count)
+        return self._unpack(items)
+
+    def ack(self, *jobs):
+        """Mark jobs as done. Returns how many this worker still held."""
+        return self._settle_jobs(jobs, None)
+
+    def nack(self, *jobs, requeue=True):
+        """
+        Give jobs back.
+
+        requeue: Put them at the back of the queue (True) or on the
+                 "<name>:failed" list (False).
+
+        Returns how many this worker still held.
+        """
+        return self._settle_jobs(jobs, self._pending if requeue else self._failed)
+
+    def extend(self, *jobs):
+        """
+        Renew the lease of jobs still being worked on, for another
+        visibility_timeout seconds from now. run() does this for the jobs
+        its handlers are busy with.
+
+        Returns how many leases this worker still held (a job whose lease
+        already ran out may have been requeued, and is not renewed).
+        """
+        if not jobs:
+            return 0
+        return self._extend(
+            keys=[self._leases],
+            args=[int(self.visibility_timeout * 1000), self.worker_id]
+            + [job.item for job in jobs],
+        )
+
+    # -------- Housekeeping --------
+
+    def requeue_stale(self, max_jobs=1000):
+        """
+        Put jobs whose lease ran out back at the front of the queue.
+
+        Any worker can call this; run() does it regularly. Returns the
+        number of jobs requeued.
+        """
+        return self._requeue(
+            keys=[self._pending, self._leases],
+            args=[self._processing_prefix, max_jobs],
+        )
+
+    def recover(self):
+        """
+        Requeue every job this worker holds, e.g. at startup with a fixed
+        worker_id after a crash. Returns the number of jobs requeued.
+        """
+        return self._recover(
+            keys=[self._pending, self._processing, self._leases],
+            args=[self.worker_id],
+        )
+
+    def stats(self):
+        """Job counts: waiting, in progress (all workers) and failed."""
+        pipe = self.app.client.pipeline(transaction=False)
+        pipe.llen(self._pending)
+        pipe.zcard(self._leases)
+        pipe.llen(self._failed)
+        pending, processing, failed = pipe.execute()
+        return {"pending": pending, "processing": processing, "failed": failed}
+
+    def clear(self):
+        """Delete the waiting, failed and lease keys and this worker's jobs."""
+        self.app.client.delete(
+            self._pending, self._processing, self._leases, self._failed
+        )
+
+    # -------- Worker pool --------
+
+    def run(
+        self,
+        handler,
+        workers=4,
+        processes=False,
+        max_jobs=None,
+        stop=None,
+        poll_seconds=1.0,
+    ):
+        """
+        Handle jobs with handler(data) on a pool until stopped.
+
+        workers: Pool size. Up to this many jobs are in progress at once.
+        processes: Use a process pool (handler must be picklable) instead
+                   of threads, for CPU-bound handlers.
+        max_jobs: Return after this many jobs (optional).
+        stop: A threading.Event that ends the loop when set (optional).
+        poll_seconds: Longest wait for new jobs before checking stop.
+
+        Jobs are acked when handler returns and moved to the failed list
+        when it raises. Leases of jobs in progress are renewed, so handlers
+        may run longer than visibility_timeout. Returns the number of jobs
+        handled.
+        """
+        stop = stop or threading.Event()
+        pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        in_flight = {}
+        handled = 0
+        next_housekeeping = 0
+        # Often enough that a lease is renewed well before it runs out
+        interval = self.visibility_timeout / 3
+        with pool_class(max_workers=workers) as pool:
+            while in_flight or not (stop.is_set() or _reached(handled, max_jobs)):
+                if time.monotonic() >= next_housekeeping:
+                    self.extend(*in_flight.values())
+                    self.requeue_stale()
+                    next_housekeeping = time.monotonic() + interval
+                room = workers - len(in_flight)
+                if max_jobs is not None:
+                    room = min(room, max_jobs - handled - len(in_flight))
+                if room > 0 and not stop.is_set():
+                    # Only block on Redis when there is nothing else to wait for
+                    timeout = 0 if in_flight else poll_seconds
+                    for job in self.dequeue_many(room, timeout=timeout):
+                        in_flight[pool.submit(handler, job.data)] = job
+                if not in_flight:
+                    continue
+                done, _ = wait(
+                    in_flight,
+                    timeout=min(poll_seconds, interval),
+                    return_when=FIRST_COMPLETED,
+                )
+                finished = [(in_flight.pop(f), f.exception()) for f in done]
+                self.ack(*[job for job, error in finished if error is None])
+                self.nack(
+                    *[job for job, error in finished if error is not None],
+                    requeue=False,
+                )
+                handled += len(finished)
+        return handled
+
+    # -------- Helpers --------
+
+    def _take_items(self, count):
+        """Run TAKE for up to count jobs."""
+        return self._take(
+            keys=[self._pending, self._processing, self._leases],
+            args=[count, int(self.visibility_timeout * 1000), self.worker_id],
+        )
+
+    def _settle_jobs(self, jobs, destination):
+        if not jobs:
+            return 0
+        # No empty key for "drop": it would be in another cluster slot
+        keys = [self._processing, self._leases]
+        if destination is not None:
+            keys.append(destination)
+        return self._settle(
+            keys=keys,
+            args=[self.worker_id] + [job.item for job in jobs],
+        )
+
+    def _pack(self, id, data):
+        codec = self.app.codec
+        if codec is None:
+            return f"{id}:{data}"
+        return id.encode() + b":" + codec.encode(data)
+
+    def _unpack(self, items):
+        codec = self.app.codec
+        jobs = []
+        for item in items:
+            if codec is None:
+                id, data = item.split(":", 1)
+            else:
+                id, data = item.split(b":", 1)
+                id, data = id.decode(), codec.decode(data)
+            jobs.append(Job(id, data, item))
+        return jobs
+
+
+def _reached(handled, max_jobs):
+    return max_jobs is not None and handled >= max_jobs
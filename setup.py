@@ -36,11 +36,20 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=[
-        "redis>=4.0.0",
+        "redis>=4.2.0",
     ],
     extras_require={
         "dev": [
             "pytest>=7.0.0",
         ],
+        "msgpack": [
+            "msgpack>=1.0.0",
+        ],
+        "lz4": [
+            "lz4>=4.0.0",
+        ],
+        "zstd": [
+            "zstandard>=0.20.0",
+        ],
     },
 )
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+
+import pytest
+import redis
+from easy_redis.aio import AsyncEasyRedis, AsyncAppSpace
+from easy_redis.batch import BATCHABLE
+
+
+@pytest.fixture(autouse=True)
+def flush_redis():
+    """Fixture to flush Redis after each test."""
+    yield
+    redis.Redis(host="localhost", port=6379).flushdb()
+
+
+def run(test):
+    """Run an async test body against a fresh AsyncAppSpace."""
+
+    async def main():
+        async with AsyncEasyRedis() as db:
+            await test(db.app("test_app"))
+
+    asyncio.run(main())
+
+
+class TestAsyncEasyRedis:
+    """Test the AsyncEasyRedis class."""
+
+    def test_app_returns_async_appspace(self):
+        """Test that app() returns an AsyncAppSpace instance."""
+        db = AsyncEasyRedis()
+        app = db.app("my_app")
+        assert isinstance(app, AsyncAppSpace)
+        assert app._key("k") == "my_app:k"
+
+    def test_apps_share_one_pool(self):
+        """Test that every app of a client uses the same connection pool."""
+        db = AsyncEasyRedis()
+        assert db.app("a").client.connection_pool is db.pool
+        assert db.app("b").client.connection_pool is db.pool
+
+
+class TestAsyncAppSpace:
+    """Test the AsyncAppSpace class."""
+
+    def test_save_and_load(self):
+        """Test saving and loading simple values."""
+
+        async def body(app):
+            await app.save("username", "john_doe", expire_seconds=10)
+            assert await app.load("username") == "john_doe"
+            assert await app.load("missing") is None
+            assert await app.exists("username") is True
+            assert 0 < await app.get_ttl("username") <= 10
+            await app.delete("username")
+            assert await app.exists("username") is False
+
+        run(body)
+
+    def test_dicts_and_lists(self):
+        """Test dictionary and list operations."""
+
+        async def body(app):
+            await app.save_dict("user", {"name": "Alice"}, expire_seconds=5)
+            assert await app.load_dict("user") == {"name": "Alice"}
+            assert await app.load_dict("nope") == {}
+            await app.add_to_list("todos", "a", "b")
+            assert await app.get_list("todos") == ["a", "b"]
+            await app.clear_list("todos")
+            assert await app.get_list("todos") == []
+
+        run(body)
+
+    def test_dict_fields(self):
+        """Test reading and changing single dictionary fields."""
+
+        async def body(app):
+            await app.save_dict("settings", {"theme": "dark", "lang": "en"})
+            assert await app.load_fields("settings", "theme", "nope") == {
+                "theme": "dark",
+                "nope": None,
+            }
+            assert await app.update_dict("settings", {"lang": "de"}, size="xl") == 1
+            assert await app.delete_fields("settings", "theme", "nope") == 1
+            assert await app.dict_size("settings") == 2
+            assert await app.incr_field("scores", "bob", 5) == 5
+            assert await app.incr_field("scores", "bob", 0.5) == 5.5
+            assert dict([pair async for pair in app.iter_dict("settings")]) == {
+                "lang": "de",
+                "size": "xl",
+            }
+
+        run(body)
+
+    def test_list_windows(self):
+        """Test reading and popping lists in pieces."""
+
+        async def body(app):
+            await app.add_to_list("log", *[str(i) for i in range(12)])
+            assert await app.get_list("log", 0, 2) == ["0", "1", "2"]
+            assert await app.get_list("log", -2) == ["10", "11"]
+            assert await app.get_list("nope", 0, 9) == []
+            assert await app.list_length("log") == 12
+            assert [item async for item in app.iter_list("log", chunk=5)] == [
+                str(i) for i in range(12)
+            ]
+            assert await app.pop_from_list("log") == "0"
+            assert await app.pop_from_list("log", 2) == ["1", "2"]
+            assert await app.pop_from_list("nope") is None
+            assert await app.pop_from_list("nope", 2) == []
+
+        run(body)
+
+    def test_expiration_helpers(self):
+        """Test set_expire and remove_expire."""
+
+        async def body(app):
+            await app.save("key", "value")
+            assert await app.set_expire("key", 5) is True
+            assert await app.remove_expire("key") is True
+            assert await app.get_ttl("key") == -1
+            assert await app.set_expire("missing", 5) is False
+
+        run(body)
+
+    def test_bulk_operations(self):
+        """Test the bulk multi-key APIs."""
+
+        async def body(app):
+            await app.save_many({"a": "1", "b": "2"}, expire_seconds=5)
+            assert await app.load_many(["a", "b", "c"]) == {
+                "a": "1",
+                "b": "2",
+                "c": None,
+            }
+            await app.save_dict("u1", {"x": "y"})
+            assert await app.load_dicts(["u1", "u2"]) == {"u1": {"x": "y"}, "u2": {}}
+            assert await app.exists_many(["a", "z"]) == {"a": True, "z": False}
+
+        run(body)
+
+    def test_list_all_and_delete_all(self):
+        """Test listing and deleting every key in the namespace."""
+
+        async def body(app):
+            await app.save_many({f"key{i}": str(i) for i in range(15)})
+            assert sorted(await app.list_all()) == sorted(f"key{i}" for i in range(15))
+            assert await app.delete_all(chunk_size=4) == 15
+            assert await app.list_all() == []
+
+        run(body)
+
+    def test_batch(self):
+        """Test an async pipelined batch."""
+
+        async def body(app):
+            await app.save("name", "alice")
+            async with app.batch(flush_every=3) as b:
+                await b.save_dict("user", {"id": "1"}, expire_seconds=5)
+                name = await b.load("name")
+                found = await b.exists("user")
+            assert name.value == "alice"
+            assert found.value is True
+            assert b.results == [None, "alice", True]
+
+        run(body)
+
+    def test_counters(self):
+        """Test counters, alone and in a batch."""
+
+        async def body(app):
+            assert await app.incr("hits") == 1
+            assert await app.incr_by("hits", 10, expire_seconds=60) == 11
+            assert await app.decr("hits") == 10
+            assert await app.incr_by("ratio", 0.5) == 0.5
+            assert 0 < await app.get_ttl("hits") <= 60
+            async with app.batch() as b:
+                count = await b.incr("c", expire_seconds=60)
+                await b.decr("c")
+                size = await b.list_length("nope")
+            assert (count.value, size.value) == (1, 0)
+            assert await app.load("c") == "0"
+            assert 0 < await app.get_ttl("c") <= 60
+
+        run(body)
+
+    def test_every_batchable_method(self):
+        """Test that every method a batch can queue exists on AsyncAppSpace."""
+        missing = [name for name in BATCHABLE if not hasattr(AsyncAppSpace, name)]
+        assert missing == []
+
+    def test_concurrent_loads_without_threads(self):
+        """Test thousands of concurrent loads on one event loop thread."""
+
+        async def body(app):
+            await app.save("config", "on")
+            # Opening connections may resolve the host name in a helper
+            # thread, so fill the pool before counting threads
+            await asyncio.gather(*(app.load("config") for _ in range(500)))
+            threads_before = threading.active_count()
+            results = await asyncio.gather(*(app.load("config") for _ in range(5000)))
+            assert results == ["on"] * 5000
+            assert threading.active_count() == threads_before
+
+        run(body)
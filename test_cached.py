@@ -0,0 +1,348 @@
+import threading
+import time
+
+import pytest
+from easy_redis import EasyRedis
+from test_near_cache import wait_for
+
+
+@pytest.fixture
+def app_space():
+    """Fixture to create an AppSpace instance for testing."""
+    er = EasyRedis()
+    yield er.app("test_app")
+    er.client.flushdb()
+
+
+def run_together(func, args_list):
+    """Call func once per args tuple, all at the same time."""
+    results = [None] * len(args_list)
+
+    def call(i, args):
+        results[i] = func(*args)
+
+    threads = [
+        threading.Thread(target=call, args=(i, args))
+        for i, args in enumerate(args_list)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestCached:
+    """Test the cached decorator."""
+
+    def test_caches_results(self, app_space):
+        """Test that the second call is served from Redis."""
+        calls = []
+
+        @app_space.cached(ttl=60)
+        def square(x):
+            calls.append(x)
+            return {"x": x, "square": x * x}
+
+        assert square(3) == {"x": 3, "square": 9}
+        assert square(3) == {"x": 3, "square": 9}
+        assert square(4)["square"] == 16
+        assert calls == [3, 4]
+        assert square.cache.stats() == {
+            "hits": 1,
+            "misses": 2,
+            "waits": 0,
+            "stale": 0,
+            "refreshes": 0,
+        }
+
+    def test_keeps_function_metadata(self, app_space):
+        """Test that the wrapper looks like the function."""
+
+        @app_space.cached()
+        def lookup(x):
+            """Look something up."""
+            return x
+
+        assert lookup.__name__ == "lookup"
+        assert lookup.__doc__ == "Look something up."
+
+    def test_caches_none(self, app_space):
+        """Test that None results are cached too."""
+        calls = []
+
+        @app_space.cached()
+        def nothing():
+            calls.append(1)
+
+        assert nothing() is None
+        assert nothing() is None
+        assert len(calls) == 1
+
+    def test_ttl(self, app_space):
+        """Test that results expire after ttl seconds."""
+        calls = []
+
+        @app_space.cached(ttl=0.2)
+        def now():
+            calls.append(1)
+            return len(calls)
+
+        assert now() == 1
+        assert now() == 1
+        time.sleep(0.25)
+        assert now() == 2
+
+    def test_key_format_string(self, app_space):
+        """Test naming results with a format string."""
+
+        @app_space.cached(key="profile:{user_id}:{lang}")
+        def profile(user_id, lang="en"):
+            return {"id": user_id, "lang": lang}
+
+        profile("u1")
+        assert profile.cache_name("u1") == "profile:u1:en"
+        assert app_space.exists("profile:u1:en")
+
+    def test_key_function(self, app_space):
+        """Test naming results with a function."""
+
+        @app_space.cached(key=lambda user_id: f"user:{user_id.lower()}")
+        def profile(user_id):
+            return user_id
+
+        profile("BOB")
+        assert app_space.exists("user:bob")
+
+    def test_default_keys_differ_by_arguments(self, app_space):
+        """Test that different arguments get different keys."""
+
+        @app_space.cached()
+        def echo(*args, **kwargs):
+            return [args, kwargs]
+
+        assert echo.cache_name(1) != echo.cache_name(2)
+        assert echo.cache_name(a=1, b=2) == echo.cache_name(b=2, a=1)
+        assert echo.cache_name(1).startswith("cache:")
+
+    def test_invalidate(self, app_space):
+        """Test dropping one cached result."""
+        calls = []
+
+        @app_space.cached(key="item:{x}")
+        def item(x):
+            calls.append(x)
+            return x
+
+        item(1)
+        item.invalidate(1)
+        item(1)
+        assert calls == [1, 1]
+
+    def test_codec(self, app_space):
+        """Test storing results with another codec."""
+
+        @app_space.cached(codec="pickle")
+        def pair():
+            return (1, {2, 3})
+
+        assert pair() == (1, {2, 3})
+        assert pair() == (1, {2, 3})
+
+    def test_threads_share_one_call(self, app_space):
+        """Test that concurrent misses in one process compute once."""
+        calls = []
+
+        @app_space.cached(key="slow")
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return "done"
+
+        assert run_together(slow, [()] * 10) == ["done"] * 10
+        assert len(calls) == 1
+        assert slow.cache.stats()["waits"] == 9
+
+    def test_processes_share_one_call(self, app_space):
+        """Test that separate caches (like other processes) compute once."""
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return "done"
+
+        # Each decorated copy has its own in-process state, so only the
+        # Redis lock keeps them from computing twice
+        copies = [app_space.cached(key="slow")(slow) for _ in range(5)]
+        results = run_together(lambda f: f(), [(f,) for f in copies])
+        assert results == ["done"] * 5
+        assert len(calls) == 1
+
+    def test_errors_are_not_cached(self, app_space):
+        """Test that a failing call releases the lock and caches nothing."""
+        calls = []
+
+        @app_space.cached(key="flaky")
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return "ok"
+
+        with pytest.raises(RuntimeError):
+            flaky()
+        assert not app_space.exists("flaky:lock")
+        assert flaky() == "ok"
+
+    def test_waiters_give_up(self, app_space):
+        """Test that callers stop waiting for a lock that is never released."""
+        app_space.save("stuck:lock", "someone", expire_seconds=60)
+
+        @app_space.cached(key="stuck", wait_seconds=0.1)
+        def stuck():
+            return "computed"
+
+        assert stuck() == "computed"
+
+    def test_methods(self, app_space):
+        """Test decorating a method."""
+
+        class Repo:
+            @app_space.cached(key="repo:{item_id}")
+            def get(self, item_id):
+                return {"id": item_id}
+
+        assert Repo().get(7) == {"id": 7}
+        assert app_space.exists("repo:7")
+
+
+class TestStaleWhileRevalidate:
+    """Test serving stale results while refreshing in the background."""
+
+    def test_serves_stale_and_refreshes(self, app_space):
+        """Test that an expired result is returned at once and refreshed."""
+        calls = []
+
+        @app_space.cached(ttl=0.1, stale_seconds=10)
+        def version():
+            calls.append(1)
+            time.sleep(0.1)
+            return len(calls)
+
+        assert version() == 1
+        time.sleep(0.15)
+        start = time.monotonic()
+        assert version() == 1
+        assert time.monotonic() - start < 0.05
+        assert wait_for(lambda: version.cache.refreshes == 1)
+        assert version() == 2
+        assert version.cache.stats()["stale"] >= 1
+
+    def test_one_refresh_at_a_time(self, app_space):
+        """Test that many stale reads start only one refresh."""
+        calls = []
+
+        @app_space.cached(ttl=0.1, stale_seconds=10)
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return len(calls)
+
+        slow()
+        time.sleep(0.15)
+        assert run_together(slow, [()] * 10) == [1] * 10
+        assert wait_for(lambda: slow.cache.refreshes == 1)
+        assert len(calls) == 2
+
+    def test_other_process_refreshing(self, app_space):
+        """Test that a refresh is skipped while another process holds the lock."""
+        calls = []
+
+        @app_space.cached(key="swr", ttl=0.1, stale_seconds=10)
+        def value():
+            calls.append(1)
+            return len(calls)
+
+        value()
+        time.sleep(0.15)
+        app_space.save("swr:lock", "other", expire_seconds=60)
+        assert value() == 1
+        time.sleep(0.1)
+        assert len(calls) == 1
+
+    def test_gone_after_grace(self, app_space):
+        """Test that results past ttl + stale_seconds are computed again."""
+        calls = []
+
+        @app_space.cached(ttl=0.1, stale_seconds=0.1)
+        def value():
+            calls.append(1)
+            return len(calls)
+
+        value()
+        time.sleep(0.25)
+        assert value() == 2
+
+    def test_failed_refresh_keeps_stale(self, app_space):
+        """Test that a failing refresh leaves the old value in place."""
+        calls = []
+
+        @app_space.cached(key="flaky", ttl=0.1, stale_seconds=10)
+        def flaky():
+            calls.append(1)
+            if len(calls) > 1:
+                raise RuntimeError("boom")
+            return "old"
+
+        flaky()
+        time.sleep(0.15)
+        assert flaky() == "old"
+        assert wait_for(lambda: len(calls) == 2)
+        assert wait_for(lambda: not app_space.exists("flaky:lock"))
+        assert flaky() == "old"
+
+    def test_early_refresh(self, app_space):
+        """Test that XFetch refreshes a slow result before it expires."""
+        calls = []
+
+        @app_space.cached(ttl=0.5, early_refresh=1000)
+        def slow():
+            calls.append(1)
+            time.sleep(0.05)
+            return len(calls)
+
+        assert slow() == 1
+        # Fresh, but delta * beta is far past the expiry, so refresh now
+        assert slow() == 1
+        assert wait_for(lambda: slow.cache.refreshes == 1)
+        assert slow.cache.stats()["stale"] == 0
+
+    def test_early_refresh_off_for_fresh_values(self, app_space):
+        """Test that fresh values aren't refreshed without early_refresh."""
+
+        @app_space.cached(ttl=60, stale_seconds=10)
+        def value():
+            return 1
+
+        value()
+        value()
+        time.sleep(0.05)
+        assert value.cache.refreshes == 0
+
+    def test_reads_plain_values(self, app_space):
+        """Test that results stored without revalidation still load."""
+
+        @app_space.cached(key="shared")
+        def plain():
+            return "plain"
+
+        @app_space.cached(key="shared", stale_seconds=10)
+        def swr():
+            return "swr"
+
+        assert plain() == "plain"
+        assert swr() == "plain"
+        app_space.delete("shared")
+        assert swr() == "swr"
+        assert plain() == "swr"
@@ -0,0 +1,207 @@
+import threading
+
+import pytest
+import redis
+from redis.cluster import RedisCluster
+from redis.crc import key_slot
+from easy_redis import LRU, EasyRedis, MetricsCollector
+from easy_redis.cluster import by_slot
+
+NODES = ["localhost:7000"]
+
+
+def cluster_available():
+    try:
+        return redis.Redis(port=7000).cluster("info")["cluster_state"] == "ok"
+    except redis.RedisError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(
+    not cluster_available(), reason="needs a Redis Cluster on port 7000"
+)
+
+
+@pytest.fixture
+def er():
+    er = EasyRedis(cluster_nodes=NODES)
+    yield er
+    er.client.flushall()
+
+
+@pytest.fixture
+def app_space(er):
+    """Fixture to create an AppSpace instance with keys spread over slots."""
+    return er.app("test_app")
+
+
+@pytest.fixture
+def tagged(er):
+    """Fixture to create an AppSpace instance with hash-tagged keys."""
+    return er.app("test_app", hash_tag=True)
+
+
+def slot(key):
+    return key_slot(key.encode())
+
+
+class TestCluster:
+    """Test EasyRedis(cluster_nodes=...)."""
+
+    def test_client(self, er):
+        """Test that the clients are shared RedisCluster clients."""
+        assert isinstance(er.client, RedisCluster)
+        assert er.pool is None
+        assert EasyRedis(cluster_nodes=[("localhost", 7000)]).client is er.client
+        assert er.raw_client is not er.client
+
+    def test_warmup(self, er):
+        """Test that every primary gets connections."""
+        assert er.warmup(2) == 2 * len(er.client.get_primaries())
+
+    def test_near_cache_rejected(self, er):
+        """Test that near caches (which need one server) are refused."""
+        with pytest.raises(ValueError):
+            er.app("test_app", near_cache=LRU())
+
+    def test_hash_tags(self, er, tagged):
+        """Test that tagged apps keep every key in one slot."""
+        tagged.save("a", "1")
+        tagged.save_dict("b", {"x": "1"})
+        assert er.client.get("{test_app}:a") == "1"
+        assert {slot(f"{{test_app}}:{name}") for name in "abcdefgh"} == {
+            slot("test_app")
+        }
+        assert EasyRedis(cluster_nodes=NODES, hash_tags=True).app("x")._key("a") == (
+            "{x}:a"
+        )
+        assert EasyRedis(cluster_nodes=NODES, hash_tags=True).app(
+            "x", hash_tag=False
+        )._key("a") == ("x:a")
+
+    def test_hash_tags_without_cluster(self):
+        """Test that hash tags also work against one server."""
+        app = EasyRedis().app("test_app", hash_tag=True)
+        app.save("a", "1")
+        assert app.list_all() == ["a"]
+        assert app.delete_all() == 1
+
+    @pytest.mark.parametrize("hash_tag", [False, True])
+    def test_bulk(self, er, hash_tag):
+        """Test bulk operations with keys in many slots or one."""
+        app = er.app("test_app", hash_tag=hash_tag)
+        values = {f"k{i}": str(i) for i in range(50)}
+        app.save_many(values)
+        app.save_many({"t1": "a", "t2": "b"}, expire_seconds=60)
+        assert app.load_many(list(values) + ["missing"]) == {
+            **values,
+            "missing": None,
+        }
+        assert app.exists_many(["k1", "t2", "nope"]) == {
+            "k1": True,
+            "t2": True,
+            "nope": False,
+        }
+        assert 0 < app.get_ttl("t1") <= 60
+
+    def test_codec_app(self, er):
+        """Test bulk operations on the bytes-mode cluster client."""
+        app = er.app("test_app", codec="json")
+        app.save_many({f"k{i}": {"n": i} for i in range(20)})
+        assert app.load_many(["k3", "k7"]) == {"k3": {"n": 3}, "k7": {"n": 7}}
+        assert sorted(app.list_all()) == sorted(f"k{i}" for i in range(20))
+
+    def test_list_all_every_primary(self, er, app_space):
+        """Test that keys from every primary are listed."""
+        names = [f"user_{i}" for i in range(100)]
+        app_space.save_many(dict.fromkeys(names, "x"))
+        nodes = {er.client.get_node_from_key(app_space._key(n)).name for n in names}
+        assert len(nodes) == len(er.client.get_primaries())
+        er.app("other").save("user_1", "x")
+        assert sorted(app_space.list_all()) == sorted(names)
+        assert sorted(app_space.iter_keys(match="user_1*")) == sorted(
+            n for n in names if n.startswith("user_1")
+        )
+
+    def test_delete_all(self, er, app_space):
+        """Test deleting keys spread over every primary, chunk by chunk."""
+        app_space.save_many({f"k{i}": "x" for i in range(200)})
+        other = er.app("other")
+        other.save("k1", "keep")
+        totals = []
+        lock = threading.Lock()
+
+        def progress(total):
+            with lock:
+                totals.append(total)
+
+        assert app_space.delete_all(chunk_size=30, progress=progress) == 200
+        assert app_space.list_all() == []
+        assert other.load("k1") == "keep"
+        assert sorted(totals) == totals and totals[-1] == 200
+
+    def test_round_trips(self, er):
+        """Test that hooks see the round trips of the scanning threads."""
+        metrics = MetricsCollector()
+        app = er.app("test_app", hooks=[metrics])
+        app.save_many({f"k{i}": "x" for i in range(20)})
+        app.list_all()
+        stats = metrics.stats()["test_app"]
+        assert stats["save_many"]["round_trips"] == 1
+        assert stats["list_all"]["round_trips"] >= len(er.client.get_primaries())
+
+    def test_batch(self, app_space):
+        """Test that a batch works across slots."""
+        with app_space.batch() as b:
+            b.save("a", "1")
+            b.save("b", "2")
+            b.incr("c")
+            a = b.load("a")
+        assert a.value == "1"
+        assert app_space.load_many(["a", "b", "c"]) == {"a": "1", "b": "2", "c": "1"}
+
+    def test_counter_with_expire(self, app_space):
+        """Test INCR + EXPIRE on one key in a cluster pipeline."""
+        assert app_space.incr("hits", expire_seconds=60) == 1
+        assert 0 < app_space.get_ttl("hits") <= 60
+
+    def test_multi_key_scripts(self, tagged):
+        """Test features whose Lua scripts need the app in one slot."""
+        jobs = tagged.work_queue("emails", visibility_timeout=5)
+        jobs.enqueue("welcome")
+        job = jobs.dequeue(timeout=1)
+        assert jobs.ack(job) == 1
+        with tagged.config("flags") as flags:
+            flags.set(beta="true")
+            assert flags.get("beta") == "true"
+        assert tagged.cached(ttl=5)(lambda: 42)() == 42
+
+    def test_multi_key_scripts_need_hash_tag(self, app_space):
+        """Test that those features are refused on an untagged app."""
+        with pytest.raises(ValueError, match="hash_tag=True"):
+            app_space.work_queue("emails")
+        with pytest.raises(ValueError, match="hash_tag=True"):
+            app_space.sessions()
+
+    @pytest.mark.parametrize("hash_tag", [False, True])
+    def test_rate_limiter_check_many(self, er, hash_tag):
+        """Test checking several ids in one cluster pipeline."""
+        limiter = er.app("test_app", hash_tag=hash_tag).rate_limiter(
+            limit=2, window_seconds=10
+        )
+        ids = [f"user{i}" for i in range(10)]
+        assert all(r.allowed for r in limiter.check_many(ids).values())
+        for port in (7000, 7001, 7002):
+            redis.Redis(port=port).script_flush()
+        assert all(r.allowed for r in limiter.check_many(ids).values())
+        assert not any(r.allowed for r in limiter.check_many(ids).values())
+
+
+class TestBySlot:
+    """Test grouping keys by hash slot."""
+
+    def test_groups(self):
+        keys = ["{a}1", "b", "{a}2", "c", "b"]
+        groups = by_slot(keys)
+        assert sorted(groups) == sorted([[0, 2], [1, 4], [3]])
+        assert by_slot([b"{a}1", "{a}2"]) == [[0, 1]]
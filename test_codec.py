@@ -0,0 +1,171 @@
+import datetime
+
+import pytest
+from easy_redis import EasyRedis, JsonCodec, LRU, PickleCodec, RawCodec
+from easy_redis import codec as codec_module
+from easy_redis.codec import get_codec
+from test_near_cache import wait_for
+
+
+@pytest.fixture
+def easy_redis():
+    """Fixture to create an EasyRedis instance."""
+    er = EasyRedis()
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def json_app(easy_redis):
+    """Fixture to create an AppSpace with the JSON codec."""
+    return easy_redis.app("test_app", codec="json")
+
+
+class TestCodecs:
+    """Test the codec objects on their own."""
+
+    def test_get_codec_by_name(self):
+        """Test looking codecs up by name."""
+        assert isinstance(get_codec("raw"), RawCodec)
+        assert isinstance(get_codec("json"), JsonCodec)
+        assert isinstance(get_codec("pickle"), PickleCodec)
+        assert get_codec(None) is None
+
+    def test_get_codec_passes_objects_through(self):
+        """Test that codec objects are used as they are."""
+        codec = JsonCodec()
+        assert get_codec(codec) is codec
+
+    def test_unknown_codec(self):
+        """Test that an unknown codec name raises ValueError."""
+        with pytest.raises(ValueError):
+            get_codec("yaml")
+
+    def test_msgpack_missing(self, monkeypatch):
+        """Test the error when msgpack isn't installed."""
+        monkeypatch.setattr(codec_module, "msgpack", None)
+        with pytest.raises(ImportError):
+            get_codec("msgpack")
+
+    def test_msgpack_round_trip(self):
+        """Test the msgpack codec when it is installed."""
+        pytest.importorskip("msgpack")
+        codec = get_codec("msgpack")
+        assert codec.decode(codec.encode({"a": [1, 2.5, None]})) == {
+            "a": [1, 2.5, None]
+        }
+
+
+class TestCodecAppSpace:
+    """Test AppSpace with a codec."""
+
+    def test_json_native_types(self, json_app):
+        """Test that save/load keep native Python types."""
+        json_app.save("credits", 1000)
+        json_app.save("flags", {"beta": True, "ratio": 0.5, "tags": ["a"]})
+        assert json_app.load("credits") == 1000
+        assert json_app.load("flags") == {"beta": True, "ratio": 0.5, "tags": ["a"]}
+        assert json_app.load("missing") is None
+
+    def test_json_dict_fields(self, json_app):
+        """Test that save_dict/load_dict keep field value types."""
+        json_app.save_dict("user", {"age": 30, "admin": False, "tags": ["x"]})
+        assert json_app.load_dict("user") == {"age": 30, "admin": False, "tags": ["x"]}
+        assert json_app.load_dict("missing") == {}
+
+    def test_json_dict_field_ops(self, json_app):
+        """Test that field-level operations encode and decode values."""
+        json_app.save_dict("user", {"age": 30, "tags": ["a"]})
+        json_app.update_dict("user", admin=True)
+        assert json_app.load_fields("user", "age", "admin", "x") == {
+            "age": 30,
+            "admin": True,
+            "x": None,
+        }
+        assert json_app.incr_field("user", "age") == 31
+        assert dict(json_app.iter_dict("user")) == {
+            "age": 31,
+            "tags": ["a"],
+            "admin": True,
+        }
+
+    def test_json_lists(self, json_app):
+        """Test that list items are encoded one by one."""
+        json_app.add_to_list("events", {"id": 1}, {"id": 2})
+        assert json_app.get_list("events") == [{"id": 1}, {"id": 2}]
+
+    def test_json_list_windows(self, json_app):
+        """Test that windowed reads and pops decode items."""
+        json_app.add_to_list("events", 1, 2, 3)
+        assert json_app.get_list("events", 0, 1) == [1, 2]
+        assert list(json_app.iter_list("events", chunk=2)) == [1, 2, 3]
+        assert json_app.pop_from_list("events") == 1
+        assert json_app.pop_from_list("events", count=5) == [2, 3]
+
+    def test_json_bulk(self, json_app):
+        """Test the bulk APIs with a codec."""
+        json_app.save_many({"a": 1, "b": [2]})
+        assert json_app.load_many(["a", "b", "c"]) == {"a": 1, "b": [2], "c": None}
+        json_app.save_dict("u", {"n": 1})
+        assert json_app.load_dicts(["u", "v"]) == {"u": {"n": 1}, "v": {}}
+
+    def test_pickle_any_object(self, easy_redis):
+        """Test that pickle stores arbitrary Python objects."""
+        app = easy_redis.app("test_app", codec="pickle")
+        when = datetime.datetime(2026, 1, 22, 12, 30)
+        app.save("when", when)
+        assert app.load("when") == when
+
+    def test_raw_bytes_not_decoded(self, easy_redis):
+        """Test that binary payloads come back byte for byte."""
+        app = easy_redis.app("test_app", codec="raw")
+        payload = bytes(range(256))
+        app.save("blob", payload)
+        assert app.load("blob") == payload
+
+    def test_per_call_codec(self, easy_redis):
+        """Test overriding the codec for one call on a plain app."""
+        app = easy_redis.app("test_app")
+        app.save("obj", {"x": 1}, codec="pickle")
+        assert app.load("obj", codec="pickle") == {"x": 1}
+        app.save_dict("d", {"n": 2}, codec="json")
+        assert app.load_dict("d", codec="json") == {"n": 2}
+        assert app.load_dict("d") == {"n": "2"}
+
+    def test_keys_are_strings(self, json_app):
+        """Test that key listing returns str names on a bytes client."""
+        json_app.save("a", 1)
+        assert json_app.list_all() == ["a"]
+        assert json_app.delete_all() == 1
+
+    def test_batch_with_codec(self, json_app):
+        """Test that batched reads are decoded."""
+        json_app.save("n", 5)
+        with json_app.batch() as b:
+            b.save_dict("d", {"x": [1]}, expire_seconds=10)
+            n = b.load("n")
+            d = b.load_dict("d")
+        assert n.value == 5
+        assert d.value == {"x": [1]}
+
+    def test_batch_per_call_codec_needs_codec_app(self, easy_redis):
+        """Test that a plain app can't switch codecs inside a batch."""
+        app = easy_redis.app("test_app")
+        with app.batch() as b:
+            with pytest.raises(ValueError):
+                b.load("x", codec="json")
+
+    def test_near_cache_with_codec(self, easy_redis):
+        """Test that cached reads return decoded values."""
+        cache = LRU()
+        try:
+            app = easy_redis.app("test_app", codec="json", near_cache=cache)
+            generation = cache.generation
+            app.save("cfg", {"on": True})
+            # Let the invalidation for our own write arrive before reading
+            assert wait_for(lambda: cache.generation >= generation + 2)
+            assert app.load("cfg") == {"on": True}
+            assert app.load("cfg") == {"on": True}
+            assert cache.stats()["hits"] == 1
+        finally:
+            cache.close()
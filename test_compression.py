@@ -0,0 +1,130 @@
+import os
+
+import pytest
+from easy_redis import Compressor, EasyRedis
+from easy_redis import compression as compression_module
+from easy_redis.compression import MAGIC
+
+
+@pytest.fixture
+def easy_redis():
+    """Fixture to create an EasyRedis instance."""
+    er = EasyRedis()
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def pages(easy_redis):
+    """Fixture to create an AppSpace that compresses values of 100+ bytes."""
+    return easy_redis.app("test_app", compression=Compressor(threshold=100))
+
+
+class TestCompressor:
+    """Test the Compressor on its own."""
+
+    def test_small_values_untouched(self):
+        """Test that values below the threshold are stored as they are."""
+        compressor = Compressor(threshold=100)
+        assert compressor.compress(b"short") == b"short"
+        assert compressor.stats()["skipped"] == 1
+
+    def test_round_trip(self):
+        """Test compressing and decompressing a large value."""
+        compressor = Compressor(threshold=100)
+        data = b"<div>hello</div>" * 1000
+        packed = compressor.compress(data)
+        assert packed.startswith(MAGIC)
+        assert len(packed) < len(data)
+        assert compressor.decompress(packed) == data
+
+    def test_incompressible_values_untouched(self):
+        """Test that values that don't shrink are stored as they are."""
+        compressor = Compressor(threshold=10)
+        data = os.urandom(2000)
+        assert compressor.compress(data) == data
+        assert compressor.stats()["compressed"] == 0
+
+    def test_stats(self):
+        """Test the bytes saved and timing counters."""
+        compressor = Compressor(threshold=10)
+        data = b"a" * 10_000
+        compressor.decompress(compressor.compress(data))
+        stats = compressor.stats()
+        assert stats["compressed"] == 1
+        assert stats["decompressed"] == 1
+        assert stats["bytes_in"] == 10_000
+        assert stats["bytes_saved"] == 10_000 - stats["bytes_out"]
+        assert stats["compress_seconds"] >= 0
+        compressor.reset_stats()
+        assert compressor.stats()["compressed"] == 0
+
+    def test_unknown_algorithm(self):
+        """Test that an unknown algorithm raises ValueError."""
+        with pytest.raises(ValueError):
+            Compressor("brotli")
+
+    def test_missing_optional_algorithm(self, monkeypatch):
+        """Test the error when lz4 isn't installed."""
+        monkeypatch.setattr(compression_module, "lz4_frame", None)
+        with pytest.raises(ImportError):
+            Compressor("lz4")
+
+    @pytest.mark.parametrize(
+        "algorithm,package", [("lz4", "lz4"), ("zstd", "zstandard")]
+    )
+    def test_optional_algorithms(self, algorithm, package):
+        """Test lz4 and zstd when they are installed."""
+        pytest.importorskip(package)
+        compressor = Compressor(algorithm, threshold=10)
+        data = b"x" * 5000
+        assert compressor.decompress(compressor.compress(data)) == data
+
+
+class TestCompressedAppSpace:
+    """Test AppSpace with compression turned on."""
+
+    def test_large_string_round_trip(self, pages):
+        """Test that large strings are compressed in Redis and loaded back."""
+        html = "<li>item</li>" * 2000
+        pages.save("home", html)
+        stored = pages.raw_client.get("test_app:home")
+        assert stored.startswith(MAGIC)
+        assert len(stored) < len(html)
+        assert pages.load("home") == html
+
+    def test_small_string_stored_plain(self, pages, easy_redis):
+        """Test that small values stay readable by plain apps."""
+        pages.save("title", "Home")
+        assert easy_redis.app("test_app").load("title") == "Home"
+        assert pages.load("title") == "Home"
+
+    def test_reads_uncompressed_keys(self, pages, easy_redis):
+        """Test that keys written without compression still load."""
+        easy_redis.app("test_app").save("old", "x" * 500)
+        assert pages.load("old") == "x" * 500
+
+    def test_with_json_codec(self, easy_redis):
+        """Test compression on top of a codec."""
+        app = easy_redis.app("test_app", codec="json", compression="zlib")
+        data = {"rows": [{"id": i, "name": "row"} for i in range(200)]}
+        app.save("report", data)
+        assert app.load("report") == data
+        assert app.compression.stats()["compressed"] == 1
+
+    def test_dicts_lists_and_bulk(self, pages):
+        """Test that every value path is compressed and decompressed."""
+        big = "y" * 1000
+        pages.save_dict("d", {"big": big, "small": "s"})
+        assert pages.load_dict("d") == {"big": big, "small": "s"}
+        pages.add_to_list("l", big, "s")
+        assert pages.get_list("l") == [big, "s"]
+        pages.save_many({"a": big, "b": "s"})
+        assert pages.load_many(["a", "b"]) == {"a": big, "b": "s"}
+
+    def test_switching_algorithm_keeps_old_values(self, easy_redis):
+        """Test that values written with one setting load with another."""
+        zlib_app = easy_redis.app("test_app", compression=Compressor(threshold=10))
+        zlib_app.save("page", "z" * 1000)
+        other = easy_redis.app("test_app", compression=Compressor(threshold=5000))
+        assert other.load("page") == "z" * 1000
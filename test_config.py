@@ -0,0 +1,131 @@
+import pytest
+from easy_redis import EasyRedis, VersionConflict
+from test_near_cache import wait_for
+
+
+@pytest.fixture
+def easy_redis():
+    """Fixture to create an EasyRedis instance."""
+    er = EasyRedis()
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def app_space(easy_redis):
+    """Fixture to create an AppSpace instance for testing."""
+    return easy_redis.app("test_app")
+
+
+@pytest.fixture
+def stores(app_space):
+    """Fixture to open config stores and close them afterwards."""
+    opened = []
+
+    def open_store(**kwargs):
+        store = app_space.config("flags", **kwargs)
+        opened.append(store)
+        return store
+
+    yield open_store
+    for store in opened:
+        store.close()
+
+
+class TestConfigStore:
+    """Test the versioned config store."""
+
+    def test_empty(self, stores):
+        """Test a config that was never written."""
+        flags = stores()
+        assert flags.version == 0
+        assert flags.snapshot() == {}
+        assert flags.get("missing", "default") == "default"
+        assert not flags.is_enabled("missing")
+        assert flags.is_enabled("missing", default=True)
+
+    def test_set_and_read(self, stores):
+        """Test that writes show up in the writer's snapshot at once."""
+        flags = stores()
+        assert flags.set({"theme": "dark"}, beta="true") == 1
+        assert flags.version == 1
+        assert flags.snapshot() == {"theme": "dark", "beta": "true"}
+        assert flags["theme"] == "dark"
+        assert "beta" in flags
+        assert flags.is_enabled("beta")
+
+    def test_is_enabled_values(self, stores):
+        """Test which values count as enabled."""
+        flags = stores()
+        flags.set(a="1", b="TRUE", c="yes", d="On", e="0", f="false", g="off")
+        assert [flags.is_enabled(f) for f in "abcdefg"] == [True] * 4 + [False] * 3
+
+    def test_other_process_notified(self, stores):
+        """Test that another store picks up a write via pub/sub."""
+        reader, writer = stores(poll_seconds=60), stores()
+        version = writer.set(theme="dark")
+        assert wait_for(lambda: reader.version == version, timeout=1)
+        assert reader.get("theme") == "dark"
+
+    def test_polling_fallback(self, stores, app_space):
+        """Test that polling catches changes without a notification."""
+        reader = stores(poll_seconds=0.1)
+        # Write the keys directly, as if the message was lost
+        app_space.update_dict("flags", theme="light")
+        app_space.incr("flags:version")
+        assert wait_for(lambda: reader.get("theme") == "light", timeout=1)
+        assert reader.version == 1
+
+    def test_reads_are_local(self, stores, app_space):
+        """Test that reads don't touch Redis."""
+        flags = stores(poll_seconds=60)
+        flags.set(theme="dark")
+        app_space.client.hset("test_app:flags", "theme", "changed")
+        assert flags.get("theme") == "dark"
+
+    def test_optimistic_versioning(self, stores):
+        """Test that a write based on an old version is rejected."""
+        one, two = stores(), stores()
+        seen = one.version
+        two.set(theme="light")
+        with pytest.raises(VersionConflict) as error:
+            one.set(theme="dark", expected_version=seen)
+        assert error.value.expected == seen
+        assert error.value.current == 1
+        assert wait_for(lambda: one.version == 1)
+        assert one.set(theme="dark", expected_version=one.version) == 2
+
+    def test_delete_and_replace(self, stores):
+        """Test removing settings and replacing the whole config."""
+        flags = stores()
+        flags.set(a="1", b="2", c="3")
+        flags.delete("a")
+        assert flags.snapshot() == {"b": "2", "c": "3"}
+        flags.replace({"z": "9"})
+        assert flags.snapshot() == {"z": "9"}
+        assert flags.version == 3
+
+    def test_config_deleted(self, stores, app_space):
+        """Test that the snapshot follows a config that was deleted."""
+        flags = stores(poll_seconds=0.1)
+        flags.set(theme="dark")
+        app_space.delete("flags")
+        app_space.delete("flags:version")
+        assert wait_for(lambda: flags.snapshot() == {}, timeout=1)
+        assert flags.version == 0
+
+    def test_codec(self, easy_redis):
+        """Test that values go through the app codec."""
+        app = easy_redis.app("test_app", codec="json")
+        with app.config("flags") as flags:
+            flags.set(limits={"upload_mb": 100}, beta=True)
+            assert flags.get("limits") == {"upload_mb": 100}
+            assert flags.is_enabled("beta")
+        with app.config("flags") as other:
+            assert other.snapshot() == {"limits": {"upload_mb": 100}, "beta": True}
+
+    def test_close_stops_thread(self, app_space):
+        """Test that close stops the background thread."""
+        flags = app_space.config("flags", poll_seconds=0.1)
+        flags.close()
+        assert not flags._thread.is_alive()
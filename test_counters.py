@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+import redis
+from easy_redis import EasyRedis
+
+
+@pytest.fixture
+def app_space():
+    """Fixture to create an AppSpace instance for testing."""
+    er = EasyRedis()
+    yield er.app("test_app")
+    er.client.flushdb()
+
+
+class TestCounterBuffer:
+    """Test write-behind counters."""
+
+    def test_counts_in_memory_until_flush(self, app_space):
+        """Test that increments stay local until flushed."""
+        with app_space.write_behind(flush_ms=60_000) as views:
+            views.incr("home")
+            views.incr("home")
+            views.incr_by("about", 5)
+            views.decr("about")
+            assert app_space.load("home") is None
+            assert views.pending() == {"home": 2, "about": 4}
+            assert views.flush() == {"home": 2, "about": 4}
+            assert views.pending("home") == 0
+        assert app_space.load("home") == "2"
+
+    def test_flush_adds_to_existing_value(self, app_space):
+        """Test that flushes use INCRBY, not SET."""
+        app_space.incr_by("home", 100)
+        with app_space.write_behind(flush_ms=60_000) as views:
+            views.incr_by("home", 5)
+            views.incr_by("ratio", 0.5)
+            assert views.flush() == {"home": 105, "ratio": 0.5}
+
+    def test_flush_every(self, app_space):
+        """Test flushing once enough increments are pending."""
+        with app_space.write_behind(flush_ms=60_000, flush_every=3) as views:
+            views.incr("home")
+            views.incr("home")
+            assert app_space.load("home") is None
+            views.incr("home")
+            assert app_space.load("home") == "3"
+
+    def test_timed_flush(self, app_space):
+        """Test the background flush."""
+        with app_space.write_behind(flush_ms=20) as views:
+            views.incr("home")
+            deadline = time.monotonic() + 2
+            while app_space.load("home") is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+        assert app_space.load("home") == "1"
+
+    def test_close_flushes(self, app_space):
+        """Test that closing sends what's left."""
+        views = app_space.write_behind(flush_ms=60_000)
+        views.incr_by("home", 7)
+        views.close()
+        assert app_space.load("home") == "7"
+
+    def test_expiration_on_flush(self, app_space):
+        """Test that flushed counters get a TTL."""
+        with app_space.write_behind(flush_ms=60_000, expire_seconds=10) as views:
+            views.incr("home")
+        assert 0 < app_space.get_ttl("home") <= 10
+
+    def test_failed_flush_keeps_increments(self, app_space, monkeypatch):
+        """Test that a failed flush doesn't lose increments."""
+        with app_space.write_behind(flush_ms=60_000) as views:
+            views.incr_by("home", 2)
+
+            def broken(*args, **kwargs):
+                raise redis.ConnectionError("down")
+
+            monkeypatch.setattr(redis.client.Pipeline, "execute", broken)
+            with pytest.raises(redis.ConnectionError):
+                views.flush()
+            views.incr("home")
+            assert views.pending("home") == 3
+            monkeypatch.undo()
+        assert app_space.load("home") == "3"
+
+    def test_concurrent_increments(self, app_space):
+        """Test that no increments are lost across threads."""
+        with app_space.write_behind(flush_ms=5, flush_every=100) as views:
+
+            def worker():
+                for _ in range(1000):
+                    views.incr("home")
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert app_space.load("home") == "8000"
@@ -1,6 +1,6 @@
 import pytest
 import redis
-from easy_redis import EasyRedis, AppSpace
+from easy_redis import EasyRedis, AppSpace, close_pools
 
 
 @pytest.fixture
@@ -12,10 +12,10 @@ def redis_client():
     client.flushdb()
 
 
-@pytest.fixture
-def easy_redis():
-    """Fixture to create an EasyRedis instance."""
-    er = EasyRedis()
+@pytest.fixture(params=["redis", "memory"])
+def easy_redis(request):
+    """Fixture to create an EasyRedis instance on each backend."""
+    er = EasyRedis(backend=request.param)
     yield er
     # Cleanup
     er.client.flushdb()
@@ -58,6 +58,71 @@ class TestEasyRedis:
         assert value == "test_value"
 
 
+class TestConnectionPool:
+    """Test the shared connection pool registry."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_pools(self):
+        """Start and end every test with an empty pool registry."""
+        close_pools()
+        yield
+        close_pools()
+
+    def test_instances_share_pool(self):
+        """Test that EasyRedis instances for one server share a pool."""
+        assert EasyRedis().pool is EasyRedis().pool
+        assert EasyRedis().client.connection_pool is EasyRedis().pool
+
+    def test_different_db_gets_own_pool(self):
+        """Test that pools are keyed by database."""
+        assert EasyRedis(db=0).pool is not EasyRedis(db=1).pool
+
+    def test_different_options_warn(self):
+        """Test that asking an existing pool for other options warns."""
+        pool = EasyRedis().pool
+        with pytest.warns(UserWarning, match="socket_timeout=1"):
+            assert EasyRedis(socket_timeout=1).pool is pool
+        with pytest.warns(UserWarning, match="blocking=True"):
+            EasyRedis(blocking=True)
+
+    def test_pool_options(self):
+        """Test that pool and socket options are applied."""
+        er = EasyRedis(
+            max_connections=7,
+            socket_timeout=2,
+            socket_connect_timeout=1,
+            socket_keepalive=True,
+            health_check_interval=30,
+        )
+        kwargs = er.pool.connection_kwargs
+        assert er.pool.max_connections == 7
+        assert kwargs["socket_timeout"] == 2
+        assert kwargs["socket_connect_timeout"] == 1
+        assert kwargs["socket_keepalive"] is True
+        assert kwargs["health_check_interval"] == 30
+
+    def test_blocking_pool(self):
+        """Test the BlockingConnectionPool mode."""
+        er = EasyRedis(blocking=True, max_connections=3, pool_timeout=1)
+        assert isinstance(er.pool, redis.BlockingConnectionPool)
+        er.app("test_app").save("k", "v")
+        assert er.app("test_app").load("k") == "v"
+        er.client.flushdb()
+
+    def test_warmup(self):
+        """Test that warmup opens connections ahead of time."""
+        er = EasyRedis()
+        before = len(er.client.client_list())
+        assert er.warmup(4) == 4
+        # The CLIENT LIST call reuses one of the warm connections
+        assert len(er.client.client_list()) >= before + 3
+
+    def test_warmup_capped_by_blocking_pool(self):
+        """Test that warmup never waits on a full blocking pool."""
+        er = EasyRedis(blocking=True, max_connections=2, pool_timeout=0.1)
+        assert er.warmup(5) == 2
+
+
 class TestAppSpace:
     """Test the AppSpace class."""
 
@@ -381,3 +446,319 @@ class TestAppSpace:
         assert len(app2.list_all()) == 2
         assert app2.exists("key1")
         assert app2.exists("key2")
+
+
+class TestBatch:
+    """Test pipelined batches."""
+
+    def test_batch_applies_on_exit(self, app_space):
+        """Test that queued writes are sent when the block exits."""
+        with app_space.batch() as b:
+            b.save("a", "1")
+            b.save_dict("user", {"name": "Bob"})
+            b.add_to_list("logs", "x", "y")
+            assert app_space.load("a") is None
+        assert app_space.load("a") == "1"
+        assert app_space.load_dict("user") == {"name": "Bob"}
+        assert app_space.get_list("logs") == ["x", "y"]
+
+    def test_batch_results_in_order(self, app_space):
+        """Test that reads return futures and results keep call order."""
+        app_space.save("name", "alice")
+        app_space.save_dict("profile", {"role": "admin"})
+        with app_space.batch() as b:
+            name = b.load("name")
+            missing = b.load("missing")
+            profile = b.load_dict("profile")
+            empty = b.load_dict("nope")
+            found = b.exists("name")
+        assert name.value == "alice"
+        assert missing.value is None
+        assert profile.value == {"role": "admin"}
+        assert empty.value == {}
+        assert found.value is True
+        assert b.results == ["alice", None, {"role": "admin"}, {}, True]
+
+    def test_batch_result_not_ready(self, app_space):
+        """Test that reading a future before the batch is sent raises."""
+        with app_space.batch() as b:
+            result = b.load("name")
+            assert not result.ready
+            with pytest.raises(RuntimeError):
+                result.value
+        assert result.ready
+
+    def test_batch_expiration_one_round_trip(self, app_space):
+        """Test that save_dict expiration is queued with the write."""
+        with app_space.batch() as b:
+            b.save_dict("session", {"id": "1"}, expire_seconds=5)
+            assert len(b) == 2
+        assert 0 < app_space.get_ttl("session") <= 5
+
+    def test_batch_transaction(self, app_space):
+        """Test a MULTI/EXEC batch."""
+        with app_space.batch(transaction=True) as b:
+            b.save("x", "1")
+            b.save("y", "2")
+            ttl = b.get_ttl("x")
+        assert ttl.value == -1
+        assert app_space.load("y") == "2"
+
+    def test_batch_flush_every(self, app_space):
+        """Test automatic flushing every N commands."""
+        with app_space.batch(flush_every=2) as b:
+            b.save("a", "1")
+            first = b.load("a")
+            assert first.ready
+            assert first.value == "1"
+            b.save("b", "2")
+            assert len(b) == 1
+        assert app_space.load("b") == "2"
+
+    def test_batch_discarded_on_error(self, app_space):
+        """Test that nothing is sent when the block raises."""
+        with pytest.raises(ValueError):
+            with app_space.batch() as b:
+                b.save("a", "1")
+                raise ValueError("boom")
+        assert app_space.load("a") is None
+
+    def test_batch_rejects_unbatchable(self, app_space):
+        """Test that methods needing several round trips can't be queued."""
+        with app_space.batch() as b:
+            with pytest.raises(AttributeError):
+                b.delete_all()
+
+
+class TestBulkOperations:
+    """Test the multi-key bulk APIs."""
+
+    def test_save_many_and_load_many(self, app_space):
+        """Test saving and loading many values at once."""
+        app_space.save_many({"a": "1", "b": "2", "c": "3"})
+        loaded = app_space.load_many(["a", "b", "c", "missing"])
+        assert loaded == {"a": "1", "b": "2", "c": "3", "missing": None}
+
+    def test_save_many_namespaced(self, app_space):
+        """Test that bulk saves use the app prefix."""
+        app_space.save_many({"k": "v"})
+        assert app_space.load("k") == "v"
+        assert app_space.client.get("test_app:k") == "v"
+
+    def test_save_many_with_expiration(self, app_space):
+        """Test saving many values with a TTL."""
+        app_space.save_many({"a": "1", "b": "2"}, expire_seconds=5)
+        assert 0 < app_space.get_ttl("a") <= 5
+        assert 0 < app_space.get_ttl("b") <= 5
+
+    def test_load_many_chunked(self, app_space):
+        """Test that large inputs are split into chunks."""
+        data = {f"key{i}": str(i) for i in range(25)}
+        app_space.save_many(data, chunk_size=7)
+        assert app_space.load_many(data, chunk_size=4) == data
+
+    def test_load_many_empty(self, app_space):
+        """Test loading an empty list of names."""
+        assert app_space.load_many([]) == {}
+
+    def test_load_dicts(self, app_space):
+        """Test loading many dictionaries at once."""
+        app_space.save_dict("u1", {"name": "Alice"})
+        app_space.save_dict("u2", {"name": "Bob"})
+        loaded = app_space.load_dicts(["u1", "u2", "u3"], chunk_size=2)
+        assert loaded == {"u1": {"name": "Alice"}, "u2": {"name": "Bob"}, "u3": {}}
+
+    def test_exists_many(self, app_space):
+        """Test checking many keys at once."""
+        app_space.save("a", "1")
+        app_space.save_dict("b", {"x": "y"})
+        assert app_space.exists_many(["a", "b", "c"]) == {
+            "a": True,
+            "b": True,
+            "c": False,
+        }
+
+
+class TestKeyScanning:
+    """Test SCAN-based key listing and deletion."""
+
+    def test_iter_keys(self, app_space):
+        """Test iterating over all keys of an app."""
+        app_space.save_many({f"key{i}": str(i) for i in range(30)})
+        names = sorted(app_space.iter_keys(count=5))
+        assert names == sorted(f"key{i}" for i in range(30))
+
+    def test_iter_keys_match(self, app_space):
+        """Test iterating over keys matching a pattern."""
+        app_space.save("user_1", "a")
+        app_space.save("user_2", "b")
+        app_space.save("order_1", "c")
+        assert sorted(app_space.iter_keys(match="user_*")) == ["user_1", "user_2"]
+
+    def test_list_all_strips_only_prefix(self, easy_redis):
+        """Test that the app name inside a key name is kept."""
+        app = easy_redis.app("app")
+        app.save("app:nested", "value")
+        assert app.list_all() == ["app:nested"]
+
+    def test_delete_all_in_chunks(self, app_space):
+        """Test deleting many keys in small chunks with progress."""
+        app_space.save_many({f"key{i}": str(i) for i in range(25)})
+        reports = []
+        deleted = app_space.delete_all(chunk_size=10, progress=reports.append)
+        assert deleted == 25
+        assert reports[-1] == 25
+        assert reports == sorted(reports)
+        assert app_space.list_all() == []
+
+
+class TestListWindows:
+    """Test paginated list reads and pops."""
+
+    def test_get_list_window(self, app_space):
+        """Test reading a window of a list."""
+        app_space.add_to_list("log", *[str(i) for i in range(10)])
+        assert app_space.get_list("log", 0, 2) == ["0", "1", "2"]
+        assert app_space.get_list("log", -2, -1) == ["8", "9"]
+        assert app_space.get_list("log", 20, 30) == []
+
+    def test_list_length(self, app_space):
+        """Test counting list items."""
+        assert app_space.list_length("log") == 0
+        app_space.add_to_list("log", "a", "b", "c")
+        assert app_space.list_length("log") == 3
+
+    def test_iter_list(self, app_space):
+        """Test streaming a list in chunks."""
+        items = [str(i) for i in range(23)]
+        app_space.add_to_list("log", *items)
+        assert list(app_space.iter_list("log", chunk=5)) == items
+        assert list(app_space.iter_list("log", chunk=23)) == items
+        assert list(app_space.iter_list("missing")) == []
+
+    def test_pop_from_list(self, app_space):
+        """Test popping one item at a time."""
+        app_space.add_to_list("queue", "a", "b")
+        assert app_space.pop_from_list("queue") == "a"
+        assert app_space.pop_from_list("queue") == "b"
+        assert app_space.pop_from_list("queue") is None
+
+    def test_pop_from_list_count(self, app_space):
+        """Test popping several items in one call."""
+        app_space.add_to_list("queue", "a", "b", "c")
+        assert app_space.pop_from_list("queue", count=2) == ["a", "b"]
+        assert app_space.pop_from_list("queue", count=2) == ["c"]
+        assert app_space.pop_from_list("queue", count=2) == []
+
+    def test_list_windows_in_batch(self, app_space):
+        """Test that list reads can be batched."""
+        app_space.add_to_list("queue", "a", "b", "c")
+        with app_space.batch() as b:
+            size = b.list_length("queue")
+            head = b.pop_from_list("queue", count=2)
+        assert size.value == 3
+        assert head.value == ["a", "b"]
+
+
+class TestDictFields:
+    """Test field-level dictionary operations."""
+
+    def test_load_fields(self, app_space):
+        """Test loading only some fields."""
+        app_space.save_dict("settings", {"theme": "dark", "lang": "en", "tz": "UTC"})
+        assert app_space.load_fields("settings", "theme", "missing") == {
+            "theme": "dark",
+            "missing": None,
+        }
+
+    def test_load_fields_missing_dict(self, app_space):
+        """Test loading fields of a dictionary that doesn't exist."""
+        assert app_space.load_fields("nope", "a") == {"a": None}
+
+    def test_update_dict(self, app_space):
+        """Test changing some fields without touching the others."""
+        app_space.save_dict("settings", {"theme": "dark", "lang": "en"})
+        added = app_space.update_dict("settings", {"tz": "UTC"}, theme="light")
+        assert added == 1
+        assert app_space.load_dict("settings") == {
+            "theme": "light",
+            "lang": "en",
+            "tz": "UTC",
+        }
+
+    def test_update_dict_keeps_expiration(self, app_space):
+        """Test that a partial update leaves the TTL alone."""
+        app_space.save_dict("session", {"id": "1"}, expire_seconds=10)
+        app_space.update_dict("session", seen="now")
+        assert 0 < app_space.get_ttl("session") <= 10
+
+    def test_update_dict_field_named_name(self, app_space):
+        """Test that field names can match the parameter names."""
+        app_space.update_dict("user", name="Bob", mapping="x")
+        assert app_space.load_dict("user") == {"name": "Bob", "mapping": "x"}
+
+    def test_delete_fields_and_dict_size(self, app_space):
+        """Test removing fields and counting them."""
+        app_space.save_dict("settings", {"a": "1", "b": "2", "c": "3"})
+        assert app_space.dict_size("settings") == 3
+        assert app_space.delete_fields("settings", "a", "b", "zzz") == 2
+        assert app_space.dict_size("settings") == 1
+        assert app_space.dict_size("missing") == 0
+
+    def test_incr_field(self, app_space):
+        """Test atomic increments of a field."""
+        assert app_space.incr_field("scores", "alice") == 1
+        assert app_space.incr_field("scores", "alice", 49) == 50
+        assert app_space.incr_field("scores", "alice", -10) == 40
+        assert app_space.incr_field("prices", "apple", 0.5) == 0.5
+        assert app_space.load_dict("scores") == {"alice": "40"}
+
+    def test_iter_dict(self, app_space):
+        """Test walking a large dictionary with HSCAN."""
+        data = {f"field{i}": str(i) for i in range(600)}
+        app_space.save_dict("big", data)
+        assert dict(app_space.iter_dict("big", count=100)) == data
+        matched = dict(app_space.iter_dict("big", match="field1?"))
+        assert len(matched) == 10
+
+    def test_field_ops_in_batch(self, app_space):
+        """Test that field operations can be batched."""
+        app_space.save_dict("settings", {"theme": "dark"})
+        with app_space.batch() as b:
+            b.update_dict("settings", lang="en")
+            b.incr_field("settings", "visits")
+            fields = b.load_fields("settings", "theme", "lang")
+        assert fields.value == {"theme": "dark", "lang": "en"}
+
+
+class TestCounters:
+    """Test atomic counters."""
+
+    def test_incr_and_decr(self, app_space):
+        """Test adding and subtracting one."""
+        assert app_space.incr("views") == 1
+        assert app_space.incr("views") == 2
+        assert app_space.decr("views") == 1
+        assert app_space.load("views") == "1"
+
+    def test_incr_by(self, app_space):
+        """Test adding any amount."""
+        assert app_space.incr_by("views", 10) == 10
+        assert app_space.incr_by("views", -3) == 7
+        assert app_space.incr_by("ratio", 0.25) == 0.25
+
+    def test_incr_with_expiration(self, app_space):
+        """Test setting the TTL together with the increment."""
+        assert app_space.incr("hits", expire_seconds=10) == 1
+        assert 0 < app_space.get_ttl("hits") <= 10
+        assert app_space.incr_by("hits", 2, expire_seconds=5) == 3
+        assert 0 < app_space.get_ttl("hits") <= 5
+
+    def test_incr_in_batch(self, app_space):
+        """Test that counters can be batched, TTL included."""
+        with app_space.batch() as b:
+            first = b.incr("hits", expire_seconds=10)
+            second = b.incr_by("hits", 4)
+        assert first.value == 1
+        assert second.value == 5
+        assert 0 < app_space.get_ttl("hits") <= 10
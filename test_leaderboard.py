@@ -0,0 +1,108 @@
+import pytest
+from easy_redis import EasyRedis, LeaderboardEntry
+
+
+@pytest.fixture
+def easy_redis():
+    """Fixture to create an EasyRedis instance."""
+    er = EasyRedis()
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def board(easy_redis):
+    """Fixture to create a leaderboard with a few players."""
+    board = easy_redis.app("test_app").leaderboard("scores")
+    board.set_scores({"alice": 1500, "bob": 2300, "charlie": 1800, "diana": 2100})
+    return board
+
+
+class TestLeaderboard:
+    """Test sorted-set leaderboards."""
+
+    def test_top(self, board):
+        """Test that top returns the highest scores first."""
+        assert board.top(2) == [
+            LeaderboardEntry(1, "bob", 2300),
+            LeaderboardEntry(2, "diana", 2100),
+        ]
+
+    def test_top_pages(self, board):
+        """Test paging through the board with offset."""
+        assert [e.member for e in board.top(2, offset=2)] == ["charlie", "alice"]
+        assert [e.rank for e in board.top(2, offset=2)] == [3, 4]
+        assert board.top(2, offset=10) == []
+        assert board.top(0) == []
+
+    def test_rank_and_score(self, board):
+        """Test looking up one member."""
+        assert board.rank("bob") == 1
+        assert board.rank("alice") == 4
+        assert board.score("diana") == 2100
+        assert board.rank("nobody") is None
+        assert board.score("nobody") is None
+
+    def test_incr_score(self, board):
+        """Test that incr_score moves a member up."""
+        assert board.incr_score("alice", 1000) == 2500
+        assert board.rank("alice") == 1
+        assert board.incr_score("eve") == 1
+        assert board.size() == 5
+
+    def test_float_scores(self, board):
+        """Test that fractional scores are kept."""
+        board.set_score("eve", 99.5)
+        assert board.score("eve") == 99.5
+        assert board.incr_score("eve", 0.25) == 99.75
+
+    def test_around(self, board):
+        """Test getting the neighbours of a member."""
+        around = board.around("charlie", radius=1)
+        assert around == [
+            LeaderboardEntry(2, "diana", 2100),
+            LeaderboardEntry(3, "charlie", 1800),
+            LeaderboardEntry(4, "alice", 1500),
+        ]
+        assert [e.rank for e in board.around("bob", radius=2)] == [1, 2, 3]
+        assert board.around("nobody") == []
+
+    def test_only_if_better(self, board):
+        """Test that only_if_better keeps the best score."""
+        board.set_score("bob", 100, only_if_better=True)
+        assert board.score("bob") == 2300
+        board.set_score("bob", 3000, only_if_better=True)
+        assert board.score("bob") == 3000
+
+    def test_lowest_first(self, easy_redis):
+        """Test boards where a lower score is better."""
+        board = easy_redis.app("test_app").leaderboard("laps", highest_first=False)
+        board.set_scores({"ann": 61.2, "ben": 59.8, "cat": 60.5})
+        assert [e.member for e in board.top(3)] == ["ben", "cat", "ann"]
+        assert board.rank("ann") == 3
+        assert [e.member for e in board.around("ben", radius=1)] == ["ben", "cat"]
+        board.set_score("ann", 62, only_if_better=True)
+        assert board.score("ann") == 61.2
+        board.set_score("ann", 58, only_if_better=True)
+        assert board.rank("ann") == 1
+
+    def test_remove_and_clear(self, board, easy_redis):
+        """Test removing members and the whole board."""
+        assert board.remove("bob", "nobody") == 1
+        assert board.size() == 3
+        assert board.remove() == 0
+        board.clear()
+        assert board.size() == 0
+        assert not easy_redis.client.exists("test_app:scores")
+
+    def test_codec_app_returns_strings(self, easy_redis):
+        """Test that members come back as str on apps with a codec."""
+        board = easy_redis.app("test_app", codec="json").leaderboard("scores")
+        board.set_score("alice", 10)
+        assert board.top(1) == [LeaderboardEntry(1, "alice", 10)]
+        assert board.around("alice") == [LeaderboardEntry(1, "alice", 10)]
+
+    def test_around_after_script_flush(self, board, easy_redis):
+        """Test that around reloads its script after SCRIPT FLUSH."""
+        easy_redis.client.script_flush()
+        assert len(board.around("bob", radius=1)) == 2
@@ -0,0 +1,327 @@
+import time
+
+import pytest
+import redis
+from easy_redis import LRU, EasyRedis, MemoryRedis, MetricsCollector
+from easy_redis.memory import MemoryStore
+
+
+@pytest.fixture
+def er():
+    er = EasyRedis(backend="memory")
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def app_space(er):
+    """Fixture to create an AppSpace instance in memory."""
+    return er.app("test_app")
+
+
+@pytest.fixture
+def client():
+    return MemoryRedis(MemoryStore(), decode_responses=True)
+
+
+class TestMemoryBackend:
+    """Test EasyRedis(backend="memory")."""
+
+    def test_unknown_backend(self):
+        """Test that a typo in the backend name is caught."""
+        with pytest.raises(ValueError):
+            EasyRedis(backend="memcached")
+
+    def test_instances_share_data(self, er):
+        """Test that memory backends for the same db see the same keys."""
+        er.app("a").save("k", "v")
+        assert EasyRedis(backend="memory").app("a").load("k") == "v"
+        other = EasyRedis(backend="memory", db=1)
+        assert other.app("a").load("k") is None
+
+    def test_no_connections(self, er):
+        """Test that warmup has nothing to do."""
+        assert er.pool is None
+        assert er.warmup(5) == 0
+
+    def test_near_cache_rejected(self, er):
+        """Test that a near cache in front of memory is refused."""
+        with pytest.raises(ValueError):
+            er.app("a", near_cache=LRU())
+
+    def test_codec_app(self, er):
+        """Test that codec apps get bytes from the raw client."""
+        app = er.app("test_app", codec="json")
+        app.save("user", {"id": 1, "tags": ["a"]})
+        app.save_dict("profile", {"age": 30})
+        assert app.load("user") == {"id": 1, "tags": ["a"]}
+        assert app.load_dict("profile") == {"age": 30}
+        assert er.raw_client.get("test_app:user") == b'{"id":1,"tags":["a"]}'
+        assert er.raw_client.hget("test_app:profile", "age") == b"30"
+
+    def test_lua_features_need_server(self, app_space):
+        """Test that features built on Lua scripts say what's missing."""
+        with pytest.raises(NotImplementedError):
+            app_space.cached(ttl=60)(lambda: 1)
+        with pytest.raises(NotImplementedError):
+            app_space.rate_limiter(10, 60)
+        with pytest.raises(NotImplementedError):
+            app_space.client.evalsha("0" * 40, 0)
+
+    def test_hooks(self, er):
+        """Test that metrics work on the memory backend too."""
+        metrics = MetricsCollector()
+        app = er.app("test_app", hooks=[metrics])
+        app.save("a", "1")
+        app.save_many({"b": "2", "c": "3"}, expire_seconds=10)
+        stats = metrics.stats()["test_app"]
+        assert stats["save"]["round_trips"] == 1
+        assert stats["save_many"]["round_trips"] == 1
+
+
+class TestExpiry:
+    """Test the deadline heap."""
+
+    def test_expired_keys_are_removed_without_reads(self, client):
+        """Test that any command removes keys whose deadline passed."""
+        client.set("a", "1", px=20)
+        client.set("b", "2", px=10_000)
+        time.sleep(0.05)
+        assert client.dbsize() == 1
+        assert client.get("a") is None
+        assert client.ttl("b") == 10
+
+    def test_new_deadline_replaces_old(self, client):
+        """Test that a stale heap entry doesn't expire a renewed key."""
+        client.set("a", "1", px=20)
+        client.pexpire("a", 10_000)
+        time.sleep(0.05)
+        assert client.get("a") == "1"
+
+    def test_overwrite_clears_ttl(self, client):
+        """Test that SET without a TTL makes the key permanent, like Redis."""
+        client.set("a", "1", px=20)
+        client.set("a", "2")
+        time.sleep(0.05)
+        assert client.get("a") == "2"
+        assert client.ttl("a") == -1
+
+    def test_heap_stays_small(self, client):
+        """Test that renewing one key many times doesn't grow the heap."""
+        client.set("session", "x")
+        for _ in range(1000):
+            client.expire("session", 60)
+        assert len(client.store._heap) < 100
+
+    def test_zero_ttl_deletes(self, client):
+        """Test that a non-positive TTL deletes the key, like Redis."""
+        client.set("a", "1")
+        assert client.expire("a", 0) is True
+        assert client.exists("a") == 0
+
+
+class TestScan:
+    """Test SCAN-style iteration."""
+
+    def test_pages(self, client):
+        """Test walking the keys with a cursor."""
+        client.mset({f"k{i}": i for i in range(25)})
+        cursor, keys = client.scan(0, count=10)
+        assert cursor != 0
+        # Whole buckets, like Redis, so a page may hold a few more
+        assert 10 <= len(keys) < 25
+        seen = list(keys)
+        while cursor != 0:
+            cursor, keys = client.scan(cursor, count=10)
+            seen += keys
+        assert sorted(seen) == sorted(f"k{i}" for i in range(25))
+
+    def test_cursor_is_stateless(self, client):
+        """Test that cursors hold no snapshot and can be used again."""
+        client.mset({f"k{i}": i for i in range(100)})
+        cursor, _ = client.scan(0, count=10)
+        assert client.scan(cursor, count=10) == client.scan(cursor, count=10)
+        assert not hasattr(client.store, "_scans")
+
+    def test_changes_during_walk(self, client):
+        """Test that keys present for the whole walk are all returned."""
+        client.mset({f"k{i}": i for i in range(20)})
+        cursor, seen = client.scan(0, count=3)
+        # Keys deleted before their page is read are not returned
+        deleted = {f"k{i}" for i in range(15, 20)} - set(seen)
+        client.delete(*deleted)
+        client.set("new", "1")
+        while cursor != 0:
+            cursor, keys = client.scan(cursor, count=3)
+            seen += keys
+        assert set(f"k{i}" for i in range(20)) - deleted <= set(seen)
+        assert not deleted & set(seen)
+        assert len(seen) == len(set(seen))
+
+    def test_match(self, client):
+        """Test glob patterns."""
+        client.mset({"user:1": "a", "user:2": "b", "order:1": "c", "user[x]": "d"})
+        assert sorted(client.scan_iter(match="user:*")) == ["user:1", "user:2"]
+        assert sorted(client.scan_iter(match="user:?")) == ["user:1", "user:2"]
+        assert sorted(client.keys("*:1")) == ["order:1", "user:1"]
+
+    def test_hscan(self, client):
+        """Test walking a hash."""
+        client.hset("h", mapping={f"f{i}": i for i in range(12)})
+        fields = dict(client.hscan_iter("h", count=5))
+        assert fields == {f"f{i}": str(i) for i in range(12)}
+        assert dict(client.hscan_iter("h", match="f1*")) == {
+            "f1": "1",
+            "f10": "10",
+            "f11": "11",
+        }
+
+
+class TestSameAsRedis:
+    """Run the same commands on Redis and in memory and compare replies."""
+
+    @pytest.fixture(params=[True, False], ids=["decoded", "bytes"])
+    def clients(self, request):
+        real = redis.Redis(decode_responses=request.param)
+        real.flushdb()
+        yield real, MemoryRedis(MemoryStore(), decode_responses=request.param)
+        real.flushdb()
+
+    def compare(self, clients, *calls):
+        for call in calls:
+            replies = []
+            for client in clients:
+                try:
+                    replies.append(call(client))
+                except redis.ResponseError as e:
+                    replies.append(type(e))
+            assert replies[0] == replies[1]
+
+    def test_strings(self, clients):
+        self.compare(
+            clients,
+            lambda c: c.set("a", "1"),
+            lambda c: c.set("a", "2", nx=True),
+            lambda c: c.set("b", "x", ex=10, xx=True),
+            lambda c: c.get("a"),
+            lambda c: c.getex("a", ex=100),
+            lambda c: c.ttl("a"),
+            lambda c: c.mget(["a", "missing"]),
+            lambda c: c.mset({"c": 3, "d": 1.5}),
+            lambda c: c.incrby("c", 4),
+            lambda c: c.incrbyfloat("d", 1.5),
+            lambda c: c.get("d"),
+            lambda c: c.incrbyfloat("d", 0.1),
+            lambda c: c.get("d"),
+            lambda c: c.exists("a", "b", "c", "missing"),
+            lambda c: c.delete("a", "missing"),
+            lambda c: c.set("s", "text"),
+            lambda c: c.incrby("s", 1),
+            lambda c: c.incrbyfloat("s", 1),
+            lambda c: c.hgetall("s"),
+        )
+
+    def test_ttls(self, clients):
+        self.compare(
+            clients,
+            lambda c: c.ttl("missing"),
+            lambda c: c.set("a", "1"),
+            lambda c: c.ttl("a"),
+            lambda c: c.expire("a", 100),
+            lambda c: c.ttl("a"),
+            lambda c: c.persist("a"),
+            lambda c: c.persist("a"),
+            lambda c: c.expire("missing", 10),
+            lambda c: c.ttl("a"),
+        )
+
+    def test_hashes(self, clients):
+        self.compare(
+            clients,
+            lambda c: c.hset("h", mapping={"x": "1", "y": 2}),
+            lambda c: c.hset("h", "x", "3"),
+            lambda c: c.hgetall("h"),
+            lambda c: c.hgetall("missing"),
+            lambda c: c.hmget("h", ["x", "nope"]),
+            lambda c: c.hincrby("h", "y", 5),
+            lambda c: c.hincrbyfloat("h", "z", 0.25),
+            lambda c: c.hincrby("h", "z", 1),
+            lambda c: c.hlen("h"),
+            lambda c: c.hdel("h", "x", "nope"),
+            lambda c: c.hdel("h", "y", "z"),
+            lambda c: c.exists("h"),
+            lambda c: c.rpush("l", "a"),
+            lambda c: c.hget("l", "a"),
+        )
+
+    def test_lists(self, clients):
+        self.compare(
+            clients,
+            lambda c: c.rpush("l", *"abcdefg"),
+            lambda c: c.lpush("l", "z", "y"),
+            lambda c: c.lrange("l", 0, -1),
+            lambda c: c.lrange("l", 2, 4),
+            lambda c: c.lrange("l", -3, -1),
+            lambda c: c.lrange("l", -100, 1),
+            lambda c: c.lrange("l", 5, 2),
+            lambda c: c.lrange("l", 50, 60),
+            lambda c: c.llen("l"),
+            lambda c: c.lpop("l"),
+            lambda c: c.lpop("l", 3),
+            lambda c: c.rpop("l", 2),
+            lambda c: c.lpop("l", 100),
+            lambda c: c.exists("l"),
+            lambda c: c.lpop("l"),
+            lambda c: c.lpop("l", 2),
+            lambda c: c.llen("missing"),
+            lambda c: c.set("s", "1"),
+            lambda c: c.rpush("s", "a"),
+        )
+
+    def test_match(self, clients):
+        keys = ["user_a", "user_b", "user!", "x*y", "xzy", "a-b", "b]", "c^", "d\\e"]
+        patterns = [
+            "user_[^a]",
+            "user_[!a]",
+            "user[!]",
+            "x\\*y",
+            "x*y",
+            "user_[a-b]",
+            "user_[b-a]",
+            "[^u]*",
+            "?[\\-]b",
+            "[a-c]]",
+            "[]]",
+            "c[\\^]",
+            "d\\\\e",
+            "user_[ab",
+            "*\\",
+        ]
+        self.compare(
+            clients,
+            lambda c: c.mset({key: "1" for key in keys}),
+            *[lambda c, p=p: sorted(c.scan_iter(match=p)) for p in patterns],
+        )
+
+    def test_pipeline(self, clients):
+        def run(c):
+            pipe = c.pipeline(transaction=False)
+            pipe.set("p", "1").get("p")
+            pipe.incrby("p", 2)
+            pipe.hset("h", mapping={"a": "1"})
+            pipe.hgetall("h")
+            assert len(pipe) == 5
+            return pipe.execute()
+
+        self.compare(clients, run)
+
+    def test_pipeline_error(self, clients):
+        """Test that errors are raised after every command ran."""
+        for client in clients:
+            client.set("s", "text")
+            pipe = client.pipeline()
+            pipe.incrby("s", 1)
+            pipe.set("t", "1")
+            with pytest.raises(redis.ResponseError, match="Command # 1"):
+                pipe.execute()
+            assert client.exists("t") == 1
@@ -0,0 +1,176 @@
+import pytest
+import redis
+from easy_redis import LRU, EasyRedis, Hook, MetricsCollector
+
+
+class Recorder(Hook):
+    """Hook that remembers what it was told."""
+
+    def __init__(self):
+        self.before_ops = []
+        self.ops = []
+
+    def before(self, op):
+        self.before_ops.append((op.method, op.duration))
+
+    def after(self, op):
+        self.ops.append(op)
+
+
+@pytest.fixture
+def er():
+    er = EasyRedis()
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+@pytest.fixture
+def app_space(er, recorder):
+    """Fixture to create an AppSpace instance with a hook."""
+    return er.app("test_app", hooks=[recorder])
+
+
+class TestHooks:
+    """Test the hooks around AppSpace operations."""
+
+    def test_no_hooks_by_default(self, er):
+        """Test that plain apps use the shared clients untouched."""
+        app = er.app("test_app")
+        assert app._hooks is None
+        assert app.client is er.client
+
+    def test_operation_details(self, app_space, recorder):
+        """Test what a hook learns about one call."""
+        app_space.save("greeting", "hello")
+        assert recorder.before_ops == [("save", None)]
+        (op,) = recorder.ops
+        assert op.app == "test_app"
+        assert op.method == "save"
+        assert op.keys == 1
+        assert op.payload_bytes == len("greeting") + len("hello")
+        assert op.round_trips == 1
+        assert op.duration > 0
+        assert op.error is None
+
+    def test_returned_bytes_count(self, app_space, recorder):
+        """Test that values read back add to the payload size."""
+        app_space.save_dict("user", {"name": "Bob"})
+        app_space.load_dict("user")
+        op = recorder.ops[-1]
+        assert op.method == "load_dict"
+        assert op.payload_bytes == len("user") + len("name") + len("Bob")
+
+    def test_nested_calls_reported_once(self, app_space, recorder):
+        """Test that incr (which calls incr_by) is one operation."""
+        app_space.incr("hits", expire_seconds=60)
+        assert [op.method for op in recorder.ops] == ["incr"]
+        assert recorder.ops[0].round_trips == 1
+
+    def test_bulk_round_trips(self, app_space, recorder):
+        """Test counting the chunks of a bulk operation."""
+        app_space.save_many({f"k{i}": str(i) for i in range(10)}, chunk_size=4)
+        (op,) = recorder.ops
+        assert op.keys == 10
+        assert op.round_trips == 3
+
+    def test_near_cache_hit_has_no_round_trip(self, er, recorder):
+        """Test that values served from memory report 0 round trips."""
+        app = er.app("test_app", near_cache=LRU(100), hooks=[recorder])
+        app.save("name", "Alice")
+        app.load("name")
+        app.load("name")
+        assert [op.round_trips for op in recorder.ops] == [1, 1, 0]
+
+    def test_batch_reported_once(self, app_space, recorder):
+        """Test that a batch is one "batch" operation, not one per call."""
+        with app_space.batch() as b:
+            b.save("a", "1")
+            b.incr("count")
+            b.load("a")
+        (op,) = recorder.ops
+        assert op.method == "batch"
+        assert op.keys == 3
+        assert op.round_trips == 1
+
+    def test_error(self, app_space, recorder):
+        """Test that failed operations are reported with their error."""
+        app_space.save("name", "Alice")
+        with pytest.raises(redis.ResponseError):
+            app_space.incr("name")
+        assert isinstance(recorder.ops[-1].error, redis.ResponseError)
+
+    def test_remove_hook(self, er, app_space, recorder):
+        """Test that removing the last hook restores the shared clients."""
+        app_space.remove_hook(recorder)
+        app_space.save("a", "1")
+        assert recorder.ops == []
+        assert app_space._hooks is None
+        assert app_space.client is er.client
+
+    def test_codec_app(self, er, recorder):
+        """Test hooks on an app with a bytes-mode client."""
+        app = er.app("test_app", codec="json", hooks=[recorder])
+        app.save("user", {"id": 1})
+        assert app.load("user") == {"id": 1}
+        assert [op.round_trips for op in recorder.ops] == [1, 1]
+
+
+class TestMetricsCollector:
+    """Test the built-in metrics collector."""
+
+    def test_stats(self, er):
+        """Test totals per app and method."""
+        metrics = MetricsCollector()
+        shop = er.app("shop", hooks=[metrics])
+        blog = er.app("blog", hooks=[metrics])
+        shop.save("a", "1")
+        shop.save("b", "2")
+        shop.load("a")
+        blog.exists("post")
+        stats = metrics.stats()
+        assert set(stats) == {"shop", "blog"}
+        assert stats["shop"]["save"]["calls"] == 2
+        assert stats["shop"]["save"]["round_trips"] == 2
+        assert stats["shop"]["load"]["calls"] == 1
+        assert stats["blog"]["exists"]["errors"] == 0
+        metrics.reset()
+        assert metrics.stats() == {}
+
+    def test_prometheus_format(self, er):
+        """Test the exported histogram and counters."""
+        metrics = MetricsCollector(buckets=(10.0, 0.0))
+        app = er.app("shop", hooks=[metrics])
+        app.save("a", "1")
+        app.load("a")
+        text = metrics.to_prometheus()
+        labels = 'app="shop",method="save"'
+        assert "# TYPE easy_redis_operation_duration_seconds histogram" in text
+        assert (
+            f'easy_redis_operation_duration_seconds_bucket{{{labels},le="0"}} 0' in text
+        )
+        assert (
+            f'easy_redis_operation_duration_seconds_bucket{{{labels},le="10"}} 1'
+            in text
+        )
+        assert (
+            f'easy_redis_operation_duration_seconds_bucket{{{labels},le="+Inf"}} 1'
+            in text
+        )
+        assert f"easy_redis_operation_duration_seconds_count{{{labels}}} 1" in text
+        assert f"easy_redis_round_trips_total{{{labels}}} 1" in text
+        assert "# TYPE easy_redis_round_trips_total counter" in text
+        assert text.endswith("\n")
+
+    def test_label_escaping(self, er):
+        """Test that odd app names can't break the format."""
+        metrics = MetricsCollector(namespace="myapp")
+        app = er.app('we"ird\\app', hooks=[metrics])
+        app.exists("a")
+        assert 'myapp_keys_total{app="we\\"ird\\\\app",method="exists"} 1' in (
+            metrics.to_prometheus()
+        )
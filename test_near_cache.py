@@ -0,0 +1,176 @@
+import time
+
+import pytest
+import redis
+from easy_redis import EasyRedis, LRU
+from easy_redis.near_cache import MISSING
+
+
+@pytest.fixture
+def easy_redis():
+    """Fixture to create an EasyRedis instance."""
+    er = EasyRedis()
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def cache():
+    """Fixture to create a near cache and stop its listener afterwards."""
+    lru = LRU(maxsize=100)
+    yield lru
+    lru.close()
+
+
+@pytest.fixture
+def cached_app(easy_redis, cache):
+    """Fixture to create an AppSpace with a near cache."""
+    return easy_redis.app("test_app", near_cache=cache)
+
+
+def wait_for(condition, timeout=2.0):
+    """Poll until condition() is true or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def save_settled(app, cache, name, value):
+    """
+    Save a value and wait for Redis to announce the write back to us.
+
+    Otherwise the announcement can arrive during the next load and stop
+    its result from being cached.
+    """
+    generation = cache.generation
+    app.save(name, value)
+    # One bump for the local eviction, one for the invalidation message
+    assert wait_for(lambda: cache.generation >= generation + 2)
+
+
+class TestLRU:
+    """Test the LRU cache on its own."""
+
+    def test_get_put(self):
+        """Test storing and reading an entry."""
+        lru = LRU()
+        assert lru.get("k") is MISSING
+        lru.put("k", "v", -1, lru.generation)
+        assert lru.get("k") == "v"
+        assert lru.stats()["hits"] == 1
+        assert lru.stats()["misses"] == 1
+
+    def test_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        lru = LRU(maxsize=2)
+        for key in ("a", "b"):
+            lru.put(key, key, -1, lru.generation)
+        lru.get("a")
+        lru.put("c", "c", -1, lru.generation)
+        assert lru.get("b") is MISSING
+        assert lru.get("a") == "a"
+        assert lru.stats()["evictions"] == 1
+
+    def test_entry_expires_with_pttl(self):
+        """Test that entries don't outlive the Redis TTL."""
+        lru = LRU()
+        lru.put("k", "v", 50, lru.generation)
+        assert lru.get("k") == "v"
+        time.sleep(0.06)
+        assert lru.get("k") is MISSING
+
+    def test_max_age(self):
+        """Test the cache-wide ttl bound."""
+        lru = LRU(ttl=0.05)
+        lru.put("k", "v", -1, lru.generation)
+        time.sleep(0.06)
+        assert len(lru) == 1
+        assert lru.get("k") is MISSING
+        assert len(lru) == 0
+
+    def test_stale_put_is_dropped(self):
+        """Test that a read racing with an invalidation isn't cached."""
+        lru = LRU()
+        generation = lru.generation
+        lru.invalidate(["k"])
+        lru.put("k", "old", -1, generation)
+        assert len(lru) == 0
+
+
+class TestNearCache:
+    """Test an AppSpace with a near cache attached."""
+
+    def test_repeated_load_served_from_memory(self, cached_app, cache):
+        """Test that the second load is a cache hit."""
+        save_settled(cached_app, cache, "theme", "dark")
+        assert cached_app.load("theme") == "dark"
+        assert cached_app.load("theme") == "dark"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_load_dict_returns_copy(self, cached_app):
+        """Test that changing a loaded dict doesn't change the cache."""
+        cached_app.save_dict("cfg", {"a": "1"})
+        cached_app.load_dict("cfg")["a"] = "changed"
+        assert cached_app.load_dict("cfg") == {"a": "1"}
+
+    def test_missing_key_cached(self, cached_app, cache):
+        """Test that misses are cached until the key is written."""
+        assert cached_app.load("nope") is None
+        assert cached_app.load("nope") is None
+        assert cache.stats()["hits"] == 1
+        cached_app.save("nope", "now")
+        assert cached_app.load("nope") == "now"
+
+    def test_local_write_evicts(self, cached_app):
+        """Test read-your-writes within the same process."""
+        cached_app.save("theme", "dark")
+        cached_app.load("theme")
+        cached_app.save("theme", "light")
+        assert cached_app.load("theme") == "light"
+        cached_app.delete("theme")
+        assert cached_app.load("theme") is None
+
+    def test_remote_write_invalidates(self, cached_app, cache):
+        """Test that a write from another client evicts the entry."""
+        save_settled(cached_app, cache, "theme", "dark")
+        cached_app.load("theme")
+        other = redis.Redis(host="localhost", port=6379, decode_responses=True)
+        other.set("test_app:theme", "light")
+        assert wait_for(lambda: cache.stats()["invalidations"] >= 1)
+        assert cached_app.load("theme") == "light"
+
+    def test_other_prefix_not_invalidated(self, cached_app, cache, easy_redis):
+        """Test that writes to other apps don't touch this cache."""
+        save_settled(cached_app, cache, "theme", "dark")
+        cached_app.load("theme")
+        easy_redis.app("other_app").save("theme", "light")
+        time.sleep(0.1)
+        assert cached_app.load("theme") == "dark"
+        assert cache.stats()["invalidations"] == 0
+
+    def test_flush_invalidates_everything(self, cached_app, cache, easy_redis):
+        """Test that FLUSHDB clears the cache."""
+        cached_app.save("a", "1")
+        cached_app.load("a")
+        easy_redis.client.flushdb()
+        assert wait_for(lambda: len(cache) == 0)
+        assert cached_app.load("a") is None
+
+    def test_respects_key_ttl(self, cached_app):
+        """Test that cached values expire with the key."""
+        cached_app.save("token", "abc", expire_seconds=1)
+        assert cached_app.load("token") == "abc"
+        time.sleep(1.1)
+        assert cached_app.load("token") is None
+
+    def test_batch_bypasses_cache(self, cached_app, cache):
+        """Test that batched reads go to Redis."""
+        cached_app.save("a", "1")
+        with cached_app.batch() as b:
+            value = b.load("a")
+        assert value.value == "1"
+        assert cache.stats()["misses"] == 0
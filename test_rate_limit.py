@@ -0,0 +1,110 @@
+import time
+
+import pytest
+from easy_redis import EasyRedis, RateLimiter, RateLimitResult
+
+
+@pytest.fixture
+def app_space():
+    """Fixture to create an AppSpace instance for testing."""
+    er = EasyRedis()
+    yield er.app("test_app")
+    er.client.flushdb()
+
+
+ALGORITHMS = ["fixed", "sliding", "token_bucket"]
+
+
+class TestRateLimiter:
+    """Test the Lua rate limiters."""
+
+    @pytest.mark.parametrize("algorithm", ALGORITHMS)
+    def test_allows_up_to_limit(self, app_space, algorithm):
+        """Test that limit requests pass and the next one is rejected."""
+        limiter = app_space.rate_limiter(3, 10, algorithm=algorithm)
+        results = [limiter.check("user") for _ in range(4)]
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results[:3]] == [2, 1, 0]
+        assert results[3].remaining == 0
+        assert 0 < results[3].retry_after <= 10
+
+    @pytest.mark.parametrize("algorithm", ALGORITHMS)
+    def test_ids_are_independent(self, app_space, algorithm):
+        """Test that each id has its own budget."""
+        limiter = app_space.rate_limiter(1, 10, algorithm=algorithm)
+        assert limiter.check("a").allowed
+        assert limiter.check("b").allowed
+        assert not limiter.check("a").allowed
+
+    @pytest.mark.parametrize("algorithm", ALGORITHMS)
+    def test_cost(self, app_space, algorithm):
+        """Test that a check can use several requests at once."""
+        limiter = app_space.rate_limiter(5, 10, algorithm=algorithm)
+        assert limiter.check("user", cost=4).remaining == 1
+        assert not limiter.check("user", cost=2).allowed
+        assert limiter.check("user").allowed
+
+    @pytest.mark.parametrize("algorithm", ALGORITHMS)
+    def test_window_resets(self, app_space, algorithm):
+        """Test that requests are allowed again after the window."""
+        limiter = app_space.rate_limiter(2, 0.2, algorithm=algorithm)
+        assert limiter.check("user").allowed
+        assert limiter.check("user").allowed
+        assert not limiter.check("user").allowed
+        time.sleep(0.25)
+        assert limiter.check("user").allowed
+
+    def test_token_bucket_refills_gradually(self, app_space):
+        """Test that tokens come back a little at a time."""
+        limiter = app_space.rate_limiter(10, 1, algorithm="token_bucket")
+        limiter.check("user", cost=10)
+        rejected = limiter.check("user", cost=5)
+        assert not rejected.allowed
+        assert 0.3 < rejected.retry_after <= 0.5
+        time.sleep(0.15)
+        assert limiter.check("user").allowed
+
+    @pytest.mark.parametrize("algorithm", ALGORITHMS)
+    def test_reset(self, app_space, algorithm):
+        """Test that reset forgets an id's requests."""
+        limiter = app_space.rate_limiter(1, 10, algorithm=algorithm)
+        limiter.check("user")
+        limiter.reset("user")
+        assert limiter.check("user").allowed
+
+    def test_keys_are_namespaced(self, app_space):
+        """Test that limiter keys live in the app namespace."""
+        limiter = app_space.rate_limiter(5, 10, prefix="api")
+        limiter.check("user")
+        assert app_space.client.exists("test_app:api:user")
+        assert app_space.get_ttl("api:user") > 0
+
+    def test_check_many(self, app_space):
+        """Test checking several ids in one round trip."""
+        limiter = app_space.rate_limiter(1, 10)
+        limiter.check("a")
+        results = limiter.check_many(["a", "b"])
+        assert results == {
+            "a": RateLimitResult(False, 0, results["a"].retry_after),
+            "b": RateLimitResult(True, 0, 0),
+        }
+
+    def test_reloads_flushed_script(self, app_space):
+        """Test that checks still work after SCRIPT FLUSH."""
+        limiter = app_space.rate_limiter(5, 10)
+        app_space.client.script_flush()
+        assert limiter.check("user").allowed
+        app_space.client.script_flush()
+        assert limiter.check_many(["user"])["user"].remaining == 3
+
+    def test_unknown_algorithm(self, app_space):
+        """Test that an unknown algorithm is rejected."""
+        with pytest.raises(ValueError):
+            app_space.rate_limiter(5, 10, algorithm="leaky")
+
+    def test_is_rate_limiter(self, app_space):
+        """Test that the factory returns a RateLimiter."""
+        limiter = app_space.rate_limiter(5, 10)
+        assert isinstance(limiter, RateLimiter)
+        assert limiter.limit == 5
+        assert limiter.algorithm == "fixed"
@@ -0,0 +1,325 @@
+import threading
+import time
+
+import pytest
+import redis
+from easy_redis import (
+    LRU,
+    EasyRedis,
+    MetricsCollector,
+    ReplicaRedis,
+    ReplicaSet,
+    close_pools,
+    on_primary,
+)
+
+PRIMARY = 6390
+REPLICAS = ["localhost:6391", "localhost:6392"]
+SENTINELS = ["localhost:26390"]
+
+
+def servers_available():
+    try:
+        return (
+            redis.Redis(port=PRIMARY).info("replication")["connected_slaves"] == 2
+            and redis.Redis(port=26390).ping()
+        )
+    except redis.RedisError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(
+    not servers_available(),
+    reason="needs a primary on 6390, replicas on 6391-6392 and Sentinel on 26390",
+)
+
+
+@pytest.fixture
+def er():
+    er = EasyRedis(port=PRIMARY, replicas=REPLICAS, sticky_seconds=0)
+    yield er
+    er.client.replicas.close()
+    redis.Redis(port=PRIMARY).flushdb()
+
+
+@pytest.fixture
+def app_space(er):
+    """Fixture to create an AppSpace instance reading from replicas."""
+    return er.app("test_app")
+
+
+def replicated():
+    """Wait until both replicas have every write."""
+    redis.Redis(port=PRIMARY).wait(2, 1000)
+
+
+def reads():
+    """GET and HGETALL calls served so far by the primary and each replica."""
+    counts = []
+    for port in (PRIMARY, 6391, 6392):
+        stats = redis.Redis(port=port).info("commandstats")
+        counts.append(
+            sum(
+                stats.get(f"cmdstat_{c}", {}).get("calls", 0)
+                for c in ("get", "hgetall")
+            )
+        )
+    return counts
+
+
+def served(fn):
+    """How many reads the primary and each replica served while fn ran."""
+    before = reads()
+    fn()
+    return [after - b for after, b in zip(reads(), before)]
+
+
+class TestReplicaReads:
+    """Test EasyRedis(replicas=...)."""
+
+    def test_reads_go_to_replicas(self, app_space):
+        """Test that reads take turns on the replicas and writes don't."""
+        app_space.save("a", "1")
+        app_space.save_dict("d", {"x": "1"})
+        replicated()
+        assert served(lambda: [app_space.load("a") for _ in range(4)]) == [0, 2, 2]
+        assert served(lambda: app_space.load_dict("d")) in ([0, 1, 0], [0, 0, 1])
+        assert app_space.load("a") == "1"
+        assert sorted(app_space.list_all()) == ["a", "d"]
+
+    def test_read_your_writes(self, er):
+        """Test that a thread reads from the primary right after writing."""
+        er.client.sticky_seconds = 60
+        app = er.app("test_app")
+        app.save("a", "1")
+        assert served(lambda: app.load("a")) == [1, 0, 0]
+        # Other threads haven't written, so they still use replicas
+        replicated()
+        thread = threading.Thread(target=app.load, args=("a",))
+        assert served(lambda: (thread.start(), thread.join())) != [1, 0, 0]
+
+    def test_consistency(self, er, app_space):
+        """Test per-call, per-block and per-app reads from the primary."""
+        app_space.save("a", "1")
+        replicated()
+        assert served(lambda: app_space.load("a", consistency="primary")) == [1, 0, 0]
+        with on_primary():
+            assert served(lambda: app_space.load("a")) == [1, 0, 0]
+        primary_app = er.app("test_app", consistency="primary")
+        assert served(lambda: primary_app.load("a")) == [1, 0, 0]
+        assert served(lambda: app_space.load("a", consistency="replica"))[0] == 0
+        with pytest.raises(ValueError):
+            app_space.load("a", consistency="latest")
+        with pytest.raises(ValueError):
+            er.app("test_app", consistency="latest")
+
+    def test_batches(self, app_space):
+        """Test that read-only batches go to a replica, others to the primary."""
+        app_space.save("a", "1")
+        replicated()
+
+        def read_batch():
+            with app_space.batch() as b:
+                b.load("a")
+                b.load("a")
+
+        def mixed_batch():
+            with app_space.batch() as b:
+                b.load("a")
+                b.save("b", "2")
+
+        def primary_batch():
+            with app_space.batch() as b:
+                b.load("a", consistency="primary")
+
+        assert sorted(served(read_batch)) == [0, 0, 2]
+        assert served(mixed_batch) == [1, 0, 0]
+        assert served(primary_batch) == [1, 0, 0]
+
+    def test_codec_app(self, er):
+        """Test the bytes-mode client and iterators pinned to one replica."""
+        app = er.app("test_app", codec="json")
+        app.save_many({f"k{i}": {"n": i} for i in range(20)})
+        app.save_dict("d", {f"f{i}": i for i in range(20)})
+        replicated()
+        assert app.load_many(["k3", "k7"]) == {"k3": {"n": 3}, "k7": {"n": 7}}
+        assert dict(app.iter_dict("d", count=5)) == {f"f{i}": i for i in range(20)}
+        assert len(app.list_all()) == 21
+        assert er.raw_client.replicas is er.client.replicas
+
+    def test_hooks(self, er):
+        """Test that hooks count the round trips to replicas."""
+        metrics = MetricsCollector()
+        app = er.app("test_app", hooks=[metrics])
+        app.save_many({f"k{i}": "x" for i in range(20)})
+        replicated()
+        app.load_many([f"k{i}" for i in range(20)])
+        app.list_all()
+        stats = metrics.stats()["test_app"]
+        assert stats["load_many"]["round_trips"] == 1
+        assert stats["list_all"]["round_trips"] >= 1
+
+    def test_internal_reads_use_primary(self, app_space):
+        """Test that sessions and config read their own state from the primary."""
+        sessions = app_space.sessions()
+        sid = sessions.create("user_42")
+        config = app_space.config()
+        try:
+            config.set(mode="fast")
+            replicated()
+
+            def internal_reads():
+                assert sessions.user_sessions("user_42") == [sid]
+                assert config.refresh(force=True)
+
+            def replica_calls():
+                return sum(
+                    redis.Redis(port=port)
+                    .info("commandstats")
+                    .get(f"cmdstat_{c}", {})
+                    .get("calls", 0)
+                    for port in (6391, 6392)
+                    for c in ("smembers", "exists", "hgetall", "get")
+                )
+
+            before = replica_calls()
+            internal_reads()
+            assert replica_calls() == before
+        finally:
+            config.close()
+
+    def test_near_cache_reads_primary(self, er):
+        """Test that near-cache apps read from the primary they track."""
+        app = er.app("test_app", near_cache=LRU())
+        assert not isinstance(app.client, ReplicaRedis)
+
+    def test_warmup(self, er):
+        """Test that the primary and every replica get connections."""
+        assert er.warmup(2) == 6
+
+    def test_replica_sets_are_shared(self, er):
+        """Test that instances for the same replicas share one probe thread."""
+        threads = threading.active_count()
+        others = [
+            EasyRedis(port=PRIMARY, replicas=REPLICAS, sticky_seconds=0)
+            for _ in range(20)
+        ]
+        assert threading.active_count() == threads
+        assert all(other.client.replicas is er.client.replicas for other in others)
+        sentinel = [EasyRedis(sentinels=SENTINELS) for _ in range(5)]
+        assert threading.active_count() == threads + 1
+        assert sentinel[0].client.replicas is sentinel[4].client.replicas
+        close_pools()
+        assert threading.active_count() == threads - 1
+        assert er.client.replicas.closed
+        # A closed set isn't handed out again
+        fresh = EasyRedis(port=PRIMARY, replicas=REPLICAS)
+        assert not fresh.client.replicas.closed
+        fresh.client.replicas.close()
+
+    def test_needs_one_primary(self):
+        """Test that replicas can't be combined with other topologies."""
+        with pytest.raises(ValueError):
+            EasyRedis(replicas=REPLICAS, backend="memory")
+        with pytest.raises(ValueError):
+            EasyRedis(replicas=REPLICAS, shards=["localhost:6380"])
+        with pytest.raises(ValueError):
+            EasyRedis(port=PRIMARY, replicas=REPLICAS, read_from="nearest")
+
+
+class TestReplicaSet:
+    """Test picking replicas."""
+
+    def test_replica_down(self, er, app_space):
+        """Test that a replica that stops answering is skipped."""
+        replicas = ReplicaSet(["localhost:6391", "localhost:6399"])
+        try:
+            assert replicas.down == {"localhost:6399"}
+            assert {replicas.pick() for _ in range(4)} == {"localhost:6391"}
+            client = ReplicaRedis(er.client.primary, replicas, sticky_seconds=0)
+            # Pretend it came back, then fails on the next read
+            replicas.down = set()
+            replicas._update()
+            client.set("test_app:a", "1")
+            replicated()
+            assert [client.get("test_app:a") for _ in range(4)] == ["1"] * 4
+            assert replicas.down == {"localhost:6399"}
+        finally:
+            replicas.close()
+
+    def test_no_replica_up(self, er):
+        """Test that reads go to the primary when no replica answers."""
+        replicas = ReplicaSet(["localhost:6399"], probe_seconds=60)
+        try:
+            client = ReplicaRedis(er.client.primary, replicas, sticky_seconds=0)
+            assert replicas.pick() is None
+            client.set("a", "1")
+            assert served(lambda: client.get("a")) == [1, 0, 0]
+        finally:
+            replicas.close()
+
+    def test_least_latency(self):
+        """Test that least_latency always picks the fastest replica."""
+        replicas = ReplicaSet(REPLICAS, read_from="least_latency", probe_seconds=60)
+        try:
+            replicas.latency = {"localhost:6391": 0.002, "localhost:6392": 0.001}
+            replicas._update()
+            assert {replicas.pick() for _ in range(4)} == {"localhost:6392"}
+            with pytest.raises(ValueError):
+                ReplicaSet(REPLICAS, read_from="random")
+        finally:
+            replicas.close()
+
+
+class TestSentinel:
+    """Test EasyRedis(sentinels=...)."""
+
+    def test_discovery(self):
+        """Test that Sentinel gives the primary and its replicas."""
+        er = EasyRedis(sentinels=SENTINELS, sticky_seconds=0)
+        try:
+            assert sorted(er.client.replicas.nodes) == [
+                "127.0.0.1:6391",
+                "127.0.0.1:6392",
+            ]
+            assert er.client.primary.connection_pool.get_master_address()[1] == PRIMARY
+            app = er.app("test_app", codec="json")
+            app.save("a", {"n": 1})
+            replicated()
+            assert served(lambda: app.load("a"))[0] == 0
+            assert app.load("a") == {"n": 1}
+        finally:
+            er.client.replicas.close()
+            redis.Redis(port=PRIMARY).flushdb()
+
+    def test_near_cache(self):
+        """Test that near-cache entries are evicted by writes to the primary."""
+        er = EasyRedis(sentinels=SENTINELS, read_from="primary")
+        cache = LRU()
+        try:
+            app = er.app("test_app", near_cache=cache)
+            app.save("a", "1")
+            assert app.load("a") == "1"
+            assert app.load("a") == "1"
+            assert cache.hits == 1
+            redis.Redis(port=PRIMARY).set("test_app:a", "2")
+            time.sleep(0.1)
+            assert app.load("a") == "2"
+            assert cache.invalidations == 1
+            # When Sentinel names another primary, the listener reconnects
+            # and forgets what it cached from the old one
+            assert len(cache) == 1
+            cache._tracker._find_primary = lambda: ("127.0.0.1", 6391)
+            time.sleep(1.2)
+            assert len(cache) == 0
+        finally:
+            cache.close()
+            redis.Redis(port=PRIMARY).flushdb()
+
+    def test_read_from_primary(self):
+        """Test Sentinel failover support without replica reads."""
+        er = EasyRedis(sentinels=SENTINELS, read_from="primary")
+        assert isinstance(er.client, redis.Redis)
+        er.client.set("test_app:a", "1")
+        assert er.app("test_app").load("a") == "1"
+        er.client.flushdb()
@@ -0,0 +1,167 @@
+import time
+
+import pytest
+from easy_redis import EasyRedis
+
+
+@pytest.fixture
+def easy_redis():
+    """Fixture to create an EasyRedis instance."""
+    er = EasyRedis()
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def app_space(easy_redis):
+    """Fixture to create an AppSpace instance for testing."""
+    return easy_redis.app("test_app")
+
+
+@pytest.fixture
+def sessions(app_space):
+    """Fixture to create a session store."""
+    return app_space.sessions(expire_seconds=60)
+
+
+class TestSessionStore:
+    """Test the session store."""
+
+    def test_create_and_get(self, sessions):
+        """Test storing a session and reading it back."""
+        sid = sessions.create("user_42", {"role": "admin", "theme": "dark"})
+        assert len(sid) >= 32
+        assert sessions.get(sid) == {"role": "admin", "theme": "dark"}
+        assert sessions.user_of(sid) == "user_42"
+
+    def test_int_user_id(self, sessions):
+        """Test that user ids can be ints, like other AppSpace names."""
+        sid = sessions.create(42, {"role": "admin"})
+        assert sessions.user_of(sid) == "42"
+        assert sessions.user_sessions(42) == [sid]
+        assert sessions.revoke_user(42) == 1
+        assert sessions.get(sid) is None
+
+    def test_missing_session(self, sessions):
+        """Test that unknown sessions return None."""
+        assert sessions.get("nope") is None
+        assert sessions.user_of("nope") is None
+
+    def test_custom_session_id(self, sessions, app_space):
+        """Test choosing the session id."""
+        assert sessions.create("user_42", session_id="abc") == "abc"
+        assert app_space.exists("session:abc")
+        assert sessions.get("abc") == {}
+
+    def test_get_extends_expiration(self, app_space):
+        """Test that reading a session restarts its TTL."""
+        sessions = app_space.sessions(expire_seconds=0.3)
+        sid = sessions.create("user_42", {"a": "1"})
+        for _ in range(3):
+            time.sleep(0.15)
+            assert sessions.get(sid) == {"a": "1"}
+        time.sleep(0.35)
+        assert sessions.get(sid) is None
+
+    def test_get_without_touch(self, app_space):
+        """Test reading a session without extending it."""
+        sessions = app_space.sessions(expire_seconds=0.3)
+        sid = sessions.create("user_42", {"a": "1"})
+        time.sleep(0.2)
+        assert sessions.get(sid, touch=False) == {"a": "1"}
+        time.sleep(0.15)
+        assert sessions.get(sid) is None
+
+    def test_update(self, sessions):
+        """Test changing some fields."""
+        sid = sessions.create("user_42", {"role": "user", "theme": "dark"})
+        assert sessions.update(sid, {"role": "admin"}, cart="3")
+        assert sessions.get(sid) == {"role": "admin", "theme": "dark", "cart": "3"}
+
+    def test_update_missing_session(self, sessions, app_space):
+        """Test that updating a gone session doesn't bring it back."""
+        assert not sessions.update("gone", role="admin")
+        assert not app_space.exists("session:gone")
+
+    def test_touch(self, app_space):
+        """Test restarting the expiration."""
+        sessions = app_space.sessions(expire_seconds=100)
+        sid = sessions.create("user_42")
+        app_space.set_expire(f"session:{sid}", 5)
+        assert sessions.touch(sid)
+        assert app_space.get_ttl(f"session:{sid}") > 90
+        assert not sessions.touch("gone")
+
+    def test_user_index_expires(self, app_space):
+        """Test that a user's index outlives their sessions but not forever."""
+        index = "session:by_user:user_42"
+        sessions = app_space.sessions(expire_seconds=100)
+        sid = sessions.create("user_42")
+        assert 90 < app_space.get_ttl(index) <= 100
+        for extend in (sessions.touch, sessions.get, sessions.update):
+            app_space.set_expire(index, 5)
+            extend(sid)
+            assert app_space.get_ttl(index) > 90
+        # A store with shorter sessions doesn't cut the index short
+        app_space.sessions(expire_seconds=10).create("user_42")
+        assert app_space.get_ttl(index) > 90
+
+    def test_revoke(self, sessions):
+        """Test ending one session."""
+        sid = sessions.create("user_42")
+        other = sessions.create("user_42")
+        assert sessions.revoke(sid)
+        assert not sessions.revoke(sid)
+        assert sessions.get(sid) is None
+        assert sessions.user_sessions("user_42") == [other]
+
+    def test_revoke_user(self, sessions):
+        """Test ending every session of one user."""
+        mine = [sessions.create("user_42") for _ in range(3)]
+        theirs = sessions.create("user_7")
+        assert sorted(sessions.user_sessions("user_42")) == sorted(mine)
+        assert sessions.revoke_user("user_42") == 3
+        assert all(sessions.get(sid) is None for sid in mine)
+        assert sessions.user_sessions("user_42") == []
+        assert sessions.get(theirs) == {}
+
+    def test_user_sessions_prunes_expired(self, app_space):
+        """Test that expired sessions drop out of the user index."""
+        sessions = app_space.sessions(expire_seconds=0.1)
+        sessions.create("user_42")
+        time.sleep(0.15)
+        live = sessions.create("user_42", session_id="live")
+        assert sessions.user_sessions("user_42") == [live]
+        assert app_space.client.scard("test_app:session:by_user:user_42") == 1
+
+    def test_codec(self, easy_redis):
+        """Test that field values go through the app codec."""
+        sessions = easy_redis.app("test_app", codec="json").sessions()
+        sid = sessions.create("user_42", {"roles": ["admin"], "age": 30})
+        assert sessions.update(sid, age=31)
+        assert sessions.get(sid) == {"roles": ["admin"], "age": 31}
+        assert sessions.user_of(sid) == "user_42"
+        assert sessions.user_sessions("user_42") == [sid]
+
+
+class TestLoadWithExpire:
+    """Test load(expire_seconds=...) for string sessions."""
+
+    def test_resets_ttl(self, app_space):
+        """Test that reading resets the expiration."""
+        app_space.save("token", "abc", expire_seconds=5)
+        assert app_space.load("token", expire_seconds=100) == "abc"
+        assert app_space.get_ttl("token") > 90
+
+    def test_missing(self, app_space):
+        """Test that missing keys still return None."""
+        assert app_space.load("nope", expire_seconds=100) is None
+
+    def test_codec_and_batch(self, easy_redis):
+        """Test GETEX with a codec and inside a batch."""
+        app = easy_redis.app("test_app", codec="json")
+        app.save("token", {"user": 42})
+        with app.batch() as b:
+            token = b.load("token", expire_seconds=100)
+        assert token.value == {"user": 42}
+        assert app.get_ttl("token") > 90
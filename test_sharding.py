@@ -0,0 +1,313 @@
+import time
+from collections import Counter
+
+import pytest
+import redis
+from easy_redis import LRU, EasyRedis, HashRing, MetricsCollector, ShardedRedis
+
+SHARDS = ["localhost:6380", "localhost:6381"]
+SPARE = "localhost:6382"
+
+
+def servers_available():
+    try:
+        return all(redis.Redis(port=port).ping() for port in (6380, 6381, 6382))
+    except redis.RedisError:
+        return False
+
+
+needs_servers = pytest.mark.skipif(
+    not servers_available(), reason="needs Redis on ports 6380-6382"
+)
+
+
+@pytest.fixture
+def er():
+    er = EasyRedis(shards=SHARDS)
+    yield er
+    for port in (6380, 6381, 6382):
+        redis.Redis(port=port).flushdb()
+
+
+@pytest.fixture
+def app_space(er):
+    """Fixture to create an AppSpace instance spread over the shards."""
+    return er.app("test_app")
+
+
+def server(node):
+    host, port = node.split(":")
+    return redis.Redis(host=host, port=int(port), decode_responses=True)
+
+
+class TestHashRing:
+    """Test the consistent hash ring."""
+
+    def test_every_slot_owned(self):
+        """Test that slots are spread over every node."""
+        ring = HashRing(["a:1", "b:1", "c:1"])
+        counts = Counter(ring.owners)
+        assert len(ring.owners) == 16384
+        assert set(counts) == {"a:1", "b:1", "c:1"}
+        assert min(counts.values()) > 16384 / 3 * 0.7
+
+    def test_add_moves_a_share(self):
+        """Test that a new node takes about 1/N of the slots, from the others."""
+        ring = HashRing(["a:1", "b:1", "c:1"])
+        before = list(ring.owners)
+        moved = ring.add("d:1")
+        changed = [(old, new) for old, new in zip(before, ring.owners) if old != new]
+        assert moved == len(changed)
+        assert 16384 / 4 * 0.6 < moved < 16384 / 4 * 1.4
+        assert {new for _, new in changed} == {"d:1"}
+
+    def test_remove_moves_only_its_slots(self):
+        """Test that removing a node leaves the other slots alone."""
+        ring = HashRing(["a:1", "b:1", "c:1"])
+        before = list(ring.owners)
+        ring.remove("b:1")
+        for old, new in zip(before, ring.owners):
+            assert new == old or old == "b:1"
+        assert ring.retired == ["b:1"]
+        with pytest.raises(ValueError):
+            ring.remove("b:1")
+
+    def test_hash_tags(self):
+        """Test that keys with the same hash tag share a node."""
+        ring = HashRing(["a:1", "b:1", "c:1"])
+        assert len({ring.node_for(f"{{app}}:{i}") for i in range(100)}) == 1
+        assert len({ring.node_for(f"app:{i}") for i in range(100)}) == 3
+
+    def test_same_nodes_same_map(self):
+        """Test that every process builds the same ring."""
+        assert HashRing(["a:1", ("b", 1)]).owners == HashRing(["b:1", "a:1"]).owners
+
+
+@needs_servers
+class TestShardedRedis:
+    """Test EasyRedis(shards=...)."""
+
+    def test_keys_go_to_their_shard(self, er, app_space):
+        """Test that each key is stored only on the node owning it."""
+        app_space.save_many({f"k{i}": str(i) for i in range(50)})
+        for i in range(50):
+            key = app_space._key(f"k{i}")
+            owner = er.client.ring.node_for(key)
+            assert server(owner).get(key) == str(i)
+            for other in SHARDS:
+                if other != owner:
+                    assert server(other).exists(key) == 0
+        assert {
+            er.client.ring.node_for(app_space._key(f"k{i}")) for i in range(50)
+        } == set(SHARDS)
+
+    def test_bulk(self, app_space):
+        """Test bulk operations fanned out over the shards."""
+        values = {f"k{i}": str(i) for i in range(100)}
+        app_space.save_many(values, chunk_size=30)
+        app_space.save_many({"t": "x"}, expire_seconds=60)
+        assert app_space.load_many(list(values) + ["missing"]) == {
+            **values,
+            "missing": None,
+        }
+        assert app_space.exists_many(["k1", "k2", "nope"]) == {
+            "k1": True,
+            "k2": True,
+            "nope": False,
+        }
+        app_space.save_dict("d1", {"a": "1"})
+        app_space.save_dict("d2", {"b": "2"})
+        assert app_space.load_dicts(["d1", "d2", "d3"]) == {
+            "d1": {"a": "1"},
+            "d2": {"b": "2"},
+            "d3": {},
+        }
+        assert 0 < app_space.get_ttl("t") <= 60
+        assert sorted(app_space.list_all()) == sorted([*values, "t", "d1", "d2"])
+        assert app_space.delete_all(chunk_size=7) == 103
+        assert app_space.list_all() == []
+
+    def test_multi_key_commands(self, er):
+        """Test MGET/DEL/EXISTS over keys on different shards."""
+        client = er.client
+        keys = [f"key{i}" for i in range(20)]
+        assert client.mset({key: key.upper() for key in keys})
+        assert client.mget(keys + ["nope"]) == [key.upper() for key in keys] + [None]
+        assert client.exists(*keys, "nope") == 20
+        assert client.dbsize() == 20
+        assert client.delete(*keys[:5]) == 5
+        assert client.unlink(*keys) == 15
+
+    def test_pipeline_order(self, er):
+        """Test that replies from all shards come back in queue order."""
+        pipe = er.client.pipeline(transaction=False)
+        for i in range(20):
+            pipe.set(f"p{i}", i)
+        pipe.mget([f"p{i}" for i in range(20)])
+        for i in range(20):
+            pipe.incrby(f"p{i}", 100)
+        assert len(pipe) == 41
+        replies = pipe.execute()
+        assert replies[:20] == [True] * 20
+        assert replies[20] == [str(i) for i in range(20)]
+        assert replies[21:] == [100 + i for i in range(20)]
+        assert pipe.execute() == []
+
+    def test_pipeline_error(self, er):
+        """Test that errors are raised after every command ran."""
+        er.client.set("s", "text")
+        pipe = er.client.pipeline()
+        pipe.set("a", "1")
+        pipe.incrby("s", 1)
+        pipe.set("b", "1")
+        with pytest.raises(redis.ResponseError, match="Command # 2"):
+            pipe.execute()
+        assert er.client.exists("a", "b") == 2
+
+    def test_batch(self, app_space):
+        """Test batches across shards."""
+        with app_space.batch() as b:
+            for i in range(10):
+                b.save(f"b{i}", str(i))
+            b.incr("count", expire_seconds=60)
+            last = b.load("b9")
+        assert last.value == "9"
+        assert app_space.load("count") == "1"
+
+    def test_codec_app(self, er):
+        """Test the bytes-mode sharded client."""
+        app = er.app("test_app", codec="json")
+        app.save_many({f"k{i}": {"n": i} for i in range(20)})
+        assert app.load_many(["k3", "k7"]) == {"k3": {"n": 3}, "k7": {"n": 7}}
+        assert er.raw_client.ring is er.client.ring
+
+    def test_hooks(self, er):
+        """Test that parallel fan-out still reports its round trips."""
+        metrics = MetricsCollector()
+        app = er.app("test_app", hooks=[metrics])
+        app.save_many({f"k{i}": "x" for i in range(20)})
+        app.load_many([f"k{i}" for i in range(20)])
+        app.list_all()
+        stats = metrics.stats()["test_app"]
+        assert stats["save_many"]["round_trips"] == 2
+        assert stats["load_many"]["round_trips"] == 2
+        assert stats["list_all"]["round_trips"] >= 2
+
+    def test_scripts_and_pubsub(self, er):
+        """Test Lua-based features on a hash-tagged app."""
+        app = er.app("test_app", hash_tag=True)
+        limiter = app.rate_limiter(limit=2, window_seconds=10, algorithm="sliding")
+        assert [limiter.check("u").allowed for _ in range(3)] == [True, True, False]
+        jobs = app.work_queue("emails", visibility_timeout=5)
+        jobs.enqueue("welcome")
+        job = jobs.dequeue(timeout=1)
+        assert jobs.ack(job) == 1
+        with app.config("flags") as flags:
+            other = app.config("flags")
+            flags.set(beta="true")
+            for _ in range(100):
+                if other.get("beta") == "true":
+                    break
+                time.sleep(0.01)
+            assert other.get("beta") == "true"
+            other.close()
+
+    def test_scripts_across_shards(self, er):
+        """Test that a script whose keys are on several shards is refused."""
+        keys = ["a", "b", "c", "d", "e", "f"]
+        assert len({er.client.ring.node_for(key) for key in keys}) > 1
+        with pytest.raises(redis.ResponseError, match="CROSSSLOT"):
+            er.client.eval("return 1", len(keys), *keys)
+        script = er.client.register_script("return #KEYS")
+        with pytest.raises(redis.ResponseError, match="CROSSSLOT"):
+            script(keys=keys)
+        assert script(keys=["{t}a", "{t}b"]) == 2
+
+    def test_lua_features_need_hash_tag(self, app_space):
+        """Test that features scripting several app keys need hash_tag=True."""
+        for feature in (
+            lambda: app_space.work_queue("jobs"),
+            lambda: app_space.sessions(),
+            lambda: app_space.config(),
+            lambda: app_space.cached()(lambda: 1),
+        ):
+            with pytest.raises(ValueError, match="hash_tag=True"):
+                feature()
+
+    def test_near_cache_rejected(self, er):
+        """Test that near caches (which need one server) are refused."""
+        with pytest.raises(ValueError):
+            er.app("test_app", near_cache=LRU())
+
+    def test_shard_methods_need_shards(self):
+        """Test that shard helpers are only on sharded instances."""
+        with pytest.raises(ValueError):
+            EasyRedis().rebalance()
+        with pytest.raises(ValueError):
+            EasyRedis(shards=SHARDS, cluster_nodes=["localhost:7000"])
+
+
+@needs_servers
+class TestRebalance:
+    """Test adding and removing shards."""
+
+    def test_add_shard(self, er, app_space):
+        """Test that only the keys of moved slots migrate, TTLs included."""
+        app_space.save_many({f"k{i}": str(i) for i in range(300)})
+        app_space.save("ttl", "x", expire_seconds=100)
+        before = {key: er.client.ring.node_for(key) for key in er.client.scan_iter()}
+        moved_slots = er.add_shard(SPARE)
+        assert 0 < moved_slots < 16384 / 2
+        totals = []
+        moved = er.rebalance(progress=totals.append)
+        should_move = [k for k, n in before.items() if er.client.ring.node_for(k) != n]
+        assert moved == len(should_move) == totals[-1]
+        assert 0 < moved < 301 / 2
+        assert server(SPARE).dbsize() == moved
+        assert app_space.load_many([f"k{i}" for i in range(300)]) == {
+            f"k{i}": str(i) for i in range(300)
+        }
+        assert 90 <= app_space.get_ttl("ttl") <= 100
+        assert er.rebalance() == 0
+
+    def test_write_before_rebalance(self, er, app_space):
+        """Test that a write to the new shard isn't overwritten by the old copy."""
+        app_space.save_many({f"k{i}": "old" for i in range(100)})
+        before = {
+            f"k{i}": er.client.ring.node_for(f"test_app:k{i}") for i in range(100)
+        }
+        er.add_shard(SPARE)
+        moving = [
+            k
+            for k, n in before.items()
+            if er.client.ring.node_for(f"test_app:{k}") != n
+        ]
+        assert len(moving) > 1
+        app_space.save(moving[0], "new")
+        assert er.rebalance() == len(moving) - 1
+        assert app_space.load_many(moving) == {
+            k: "new" if k == moving[0] else "old" for k in moving
+        }
+        assert server(before[moving[0]]).exists(f"test_app:{moving[0]}") == 0
+        assert er.rebalance() == 0
+
+    def test_remove_shard(self, er, app_space):
+        """Test draining a removed shard."""
+        er.add_shard(SPARE)
+        app_space.save_many({f"k{i}": str(i) for i in range(100)})
+        assert server(SPARE).dbsize() > 0
+        er.remove_shard(SPARE)
+        assert er.rebalance() > 0
+        assert server(SPARE).dbsize() == 0
+        assert er.client.ring.retired == []
+        assert len(app_space.list_all()) == 100
+
+    def test_client_without_easy_redis(self):
+        """Test using ShardedRedis directly."""
+        client = ShardedRedis(HashRing(SHARDS))
+        try:
+            client.set("a", "1")
+            assert client.get("a") == "1"
+            assert client.ping()
+        finally:
+            client.flushdb()
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+from easy_redis import EasyRedis, Message
+
+
+@pytest.fixture
+def easy_redis():
+    """Fixture to create an EasyRedis instance."""
+    er = EasyRedis()
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def stream(easy_redis):
+    """Fixture to create a stream."""
+    return easy_redis.app("test_app").stream("events")
+
+
+class TestStream:
+    """Test Redis Streams with consumer groups."""
+
+    def test_publish_and_read(self, stream):
+        """Test that published messages can be replayed in order."""
+        first = stream.publish({"n": "1"})
+        rest = stream.publish_many([{"n": "2"}, {"n": "3"}])
+        assert stream.read() == [
+            Message(first, {"n": "1"}),
+            Message(rest[0], {"n": "2"}),
+            Message(rest[1], {"n": "3"}),
+        ]
+        assert stream.length() == 3
+        assert stream.read(count=1) == [Message(first, {"n": "1"})]
+
+    def test_maxlen_trims(self, easy_redis):
+        """Test that the stream is trimmed to about maxlen."""
+        stream = easy_redis.app("test_app").stream("events", maxlen=10)
+        stream.publish_many([{"n": str(i)} for i in range(1000)])
+        assert stream.length() < 1000
+
+    def test_consume(self, stream):
+        """Test reading new messages as a group."""
+        stream.publish_many([{"n": str(i)} for i in range(5)])
+        batch = stream.consume("group", "c1", count=3)
+        assert [m.fields["n"] for m in batch] == ["0", "1", "2"]
+        assert [m.fields["n"] for m in stream.consume("group", "c1")] == ["3", "4"]
+        assert stream.consume("group", "c1") == []
+
+    def test_consumers_share_a_group(self, stream):
+        """Test that consumers in a group each get different messages."""
+        stream.publish_many([{"n": str(i)} for i in range(4)])
+        one = stream.consume("group", "c1", count=2)
+        two = stream.consume("group", "c2", count=2)
+        assert {m.id for m in one}.isdisjoint(m.id for m in two)
+        assert len(one) + len(two) == 4
+
+    def test_groups_fan_out(self, stream):
+        """Test that every group sees every message."""
+        stream.publish({"text": "hello"})
+        assert len(stream.consume("mailer", "c1")) == 1
+        assert len(stream.consume("pusher", "c1")) == 1
+
+    def test_acks_batched_with_next_read(self, stream):
+        """Test that queued acks go out with the next consume."""
+        stream.publish_many([{"n": "1"}, {"n": "2"}])
+        messages = stream.consume("group", "c1")
+        stream.ack("group", *[m.id for m in messages])
+        assert stream.app.client.xpending(stream.key, "group")["pending"] == 2
+        stream.consume("group", "c1")
+        assert stream.app.client.xpending(stream.key, "group")["pending"] == 0
+
+    def test_flush_acks(self, stream):
+        """Test sending queued acks right away."""
+        stream.publish({"n": "1"})
+        (message,) = stream.consume("group", "c1")
+        stream.ack("group", message.id)
+        assert stream.flush_acks() == 1
+        assert stream.flush_acks() == 0
+        assert stream.pending("group") == 0
+
+    def test_blocking_consume(self, stream):
+        """Test that consume waits for a message to arrive."""
+        stream.create_group("group", start="$")
+        threading.Timer(0.1, stream.publish, [{"n": "late"}]).start()
+        start = time.monotonic()
+        messages = stream.consume("group", "c1", block=2)
+        assert [m.fields["n"] for m in messages] == ["late"]
+        assert time.monotonic() - start < 1.5
+
+    def test_create_group_from_now(self, stream):
+        """Test that a group created at "$" skips older messages."""
+        stream.publish({"n": "old"})
+        stream.create_group("group", start="$")
+        stream.create_group("group", start="$")
+        stream.publish({"n": "new"})
+        assert [m.fields["n"] for m in stream.consume("group", "c1")] == ["new"]
+
+    def test_claim(self, stream):
+        """Test taking over messages a dead consumer never acked."""
+        stream.publish_many([{"n": "1"}, {"n": "2"}])
+        stream.consume("group", "dead")
+        assert stream.claim("group", "alive", min_idle_seconds=60) == []
+        time.sleep(0.05)
+        claimed = stream.claim("group", "alive", min_idle_seconds=0.01)
+        assert [m.fields["n"] for m in claimed] == ["1", "2"]
+        stream.ack("group", *[m.id for m in claimed])
+        assert stream.pending("group") == 0
+
+    def test_claim_past_busy_messages(self, easy_redis, stream):
+        """Test that stuck messages behind many busy ones are still found."""
+        ids = stream.publish_many([{"n": str(i)} for i in range(28)])
+        stream.consume("group", "dead", count=28)
+        time.sleep(0.15)
+        # The first 25 are being worked on again, so they aren't idle
+        easy_redis.client.xclaim(stream.key, "group", "busy", 0, ids[:25])
+        claimed = stream.claim("group", "alive", min_idle_seconds=0.1, count=2)
+        assert [m.fields["n"] for m in claimed] == ["25", "26"]
+        claimed = stream.claim("group", "alive", min_idle_seconds=0.1, count=2)
+        assert [m.fields["n"] for m in claimed] == ["27"]
+
+    def test_recreates_deleted_stream(self, stream):
+        """Test that consume still works after the stream is deleted."""
+        stream.publish({"n": "1"})
+        stream.consume("group", "c1")
+        stream.app.delete("events")
+        stream.publish({"n": "2"})
+        assert [m.fields["n"] for m in stream.consume("group", "c1")] == ["2"]
+
+    def test_codec(self, easy_redis):
+        """Test that field values go through the app codec."""
+        stream = easy_redis.app("test_app", codec="json").stream("events")
+        stream.publish({"user": 42, "tags": ["a", "b"]})
+        (message,) = stream.consume("group", "c1")
+        assert message.fields == {"user": 42, "tags": ["a", "b"]}
+        assert isinstance(message.id, str)
+        assert stream.read()[0].fields == {"user": 42, "tags": ["a", "b"]}
+
+    def test_delete(self, stream):
+        """Test deleting the stream."""
+        stream.publish({"n": "1"})
+        stream.delete()
+        assert stream.length() == 0
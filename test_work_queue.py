@@ -0,0 +1,211 @@
+import threading
+import time
+
+import pytest
+import redis
+from easy_redis import EasyRedis
+
+
+@pytest.fixture
+def easy_redis():
+    """Fixture to create an EasyRedis instance."""
+    er = EasyRedis()
+    yield er
+    er.client.flushdb()
+
+
+@pytest.fixture
+def queue(easy_redis):
+    """Fixture to create a work queue."""
+    return easy_redis.app("test_app").work_queue("jobs")
+
+
+def fail_on_bad(data):
+    """Handler that raises for one job."""
+    if data == "bad":
+        raise ValueError(data)
+    return data
+
+
+class TestWorkQueue:
+    """Test the reliable work queue."""
+
+    def test_fifo(self, queue):
+        """Test that jobs come out in the order they went in."""
+        ids = queue.enqueue_many(["a", "b", "c"])
+        jobs = [queue.dequeue() for _ in range(3)]
+        assert [job.data for job in jobs] == ["a", "b", "c"]
+        assert [job.id for job in jobs] == ids
+        assert queue.dequeue() is None
+
+    def test_data_with_separator(self, queue):
+        """Test that job data may contain colons."""
+        queue.enqueue("email:42:welcome")
+        assert queue.dequeue().data == "email:42:welcome"
+
+    def test_dequeue_many(self, queue):
+        """Test taking several jobs in one call."""
+        queue.enqueue_many(range(5))
+        assert [job.data for job in queue.dequeue_many(3)] == ["0", "1", "2"]
+        assert len(queue.dequeue_many(10)) == 2
+        assert queue.dequeue_many(0) == []
+
+    def test_ack(self, queue):
+        """Test that acked jobs are gone for good."""
+        queue.enqueue("a")
+        job = queue.dequeue()
+        assert queue.stats() == {"pending": 0, "processing": 1, "failed": 0}
+        assert queue.ack(job) == 1
+        assert queue.ack(job) == 0
+        assert queue.stats() == {"pending": 0, "processing": 0, "failed": 0}
+
+    def test_nack(self, queue):
+        """Test giving jobs back or failing them."""
+        queue.enqueue_many(["a", "b"])
+        first, second = queue.dequeue_many(2)
+        assert queue.nack(first) == 1
+        assert queue.nack(second, requeue=False) == 1
+        assert queue.stats() == {"pending": 1, "processing": 0, "failed": 1}
+        assert queue.dequeue().data == "a"
+
+    def test_blocking_dequeue(self, queue):
+        """Test that dequeue waits for a job to arrive."""
+        threading.Timer(0.1, queue.enqueue, ["late"]).start()
+        start = time.monotonic()
+        job = queue.dequeue(timeout=2)
+        assert job.data == "late"
+        assert time.monotonic() - start < 1.5
+        assert queue.stats()["processing"] == 1
+
+    def test_blocking_dequeue_times_out(self, queue):
+        """Test that dequeue gives up after the timeout."""
+        start = time.monotonic()
+        assert queue.dequeue_many(5, timeout=0.2) == []
+        assert time.monotonic() - start >= 0.15
+
+    def test_blocking_dequeue_fails_after_wait(self, queue, monkeypatch):
+        """Test that a job stays queued if taking it fails after the wait."""
+        take = queue._take_items
+
+        def fail_after_wait(count):
+            if queue.app.client.llen(queue._pending):
+                raise redis.ConnectionError("lost")
+            return take(count)
+
+        monkeypatch.setattr(queue, "_take_items", fail_after_wait)
+        threading.Timer(0.1, queue.enqueue, ["late"]).start()
+        with pytest.raises(redis.ConnectionError):
+            queue.dequeue(timeout=2)
+        assert queue.stats() == {"pending": 1, "processing": 0, "failed": 0}
+        monkeypatch.undo()
+        assert queue.dequeue().data == "late"
+
+    def test_stale_jobs_requeued(self, easy_redis):
+        """Test that jobs held past the visibility timeout go back."""
+        app = easy_redis.app("test_app")
+        crashed = app.work_queue("jobs", visibility_timeout=0.1)
+        crashed.enqueue_many(["a", "b"])
+        crashed.dequeue()
+        other = app.work_queue("jobs")
+        assert other.requeue_stale() == 0
+        time.sleep(0.15)
+        assert other.requeue_stale() == 1
+        # Requeued jobs go to the front
+        assert other.dequeue().data == "a"
+
+    def test_late_ack_after_requeue(self, easy_redis):
+        """Test that a worker can't ack a job it lost."""
+        queue = easy_redis.app("test_app").work_queue("jobs", visibility_timeout=0.1)
+        queue.enqueue("a")
+        job = queue.dequeue()
+        time.sleep(0.15)
+        queue.requeue_stale()
+        assert queue.ack(job) == 0
+        assert queue.stats()["pending"] == 1
+
+    def test_extend(self, easy_redis):
+        """Test that a renewed lease keeps the job with its worker."""
+        queue = easy_redis.app("test_app").work_queue("jobs", visibility_timeout=0.2)
+        queue.enqueue("a")
+        job = queue.dequeue()
+        for _ in range(3):
+            time.sleep(0.1)
+            assert queue.extend(job) == 1
+            assert queue.requeue_stale() == 0
+        assert queue.ack(job) == 1
+        assert queue.extend(job) == 0
+
+    def test_recover(self, easy_redis):
+        """Test that a restarted worker requeues what it held."""
+        app = easy_redis.app("test_app")
+        before = app.work_queue("jobs", worker_id="worker-1")
+        before.enqueue_many(["a", "b", "c"])
+        before.dequeue_many(2)
+        after = app.work_queue("jobs", worker_id="worker-1")
+        assert after.recover() == 2
+        assert after.stats() == {"pending": 3, "processing": 0, "failed": 0}
+        assert [job.data for job in after.dequeue_many(3)] == ["a", "b", "c"]
+
+    def test_workers_have_separate_lists(self, easy_redis):
+        """Test that one worker can't settle another's jobs."""
+        app = easy_redis.app("test_app")
+        one, two = app.work_queue("jobs"), app.work_queue("jobs")
+        one.enqueue("a")
+        job = one.dequeue()
+        assert two.ack(job) == 0
+        assert one.ack(job) == 1
+
+    def test_codec(self, easy_redis):
+        """Test that job data round-trips through the app codec."""
+        queue = easy_redis.app("test_app", codec="json").work_queue("jobs")
+        queue.enqueue({"to": "a@example.com", "tries": 1})
+        job = queue.dequeue(timeout=1)
+        assert job.data == {"to": "a@example.com", "tries": 1}
+        assert isinstance(job.id, str)
+        assert queue.ack(job) == 1
+
+    def test_run_threads(self, queue):
+        """Test handling jobs on a thread pool."""
+        seen = []
+        lock = threading.Lock()
+
+        def handler(data):
+            with lock:
+                seen.append(data)
+
+        queue.enqueue_many(range(20))
+        assert queue.run(handler, workers=4, max_jobs=20) == 20
+        assert sorted(seen, key=int) == [str(i) for i in range(20)]
+        assert queue.stats() == {"pending": 0, "processing": 0, "failed": 0}
+
+    def test_run_failures(self, queue):
+        """Test that jobs whose handler raises go to the failed list."""
+        queue.enqueue_many(["ok", "bad", "ok"])
+        assert queue.run(fail_on_bad, workers=2, max_jobs=3) == 3
+        assert queue.stats() == {"pending": 0, "processing": 0, "failed": 1}
+
+    def test_run_processes(self, queue):
+        """Test handling jobs on a process pool."""
+        queue.enqueue_many(["a", "b", "c"])
+        assert queue.run(fail_on_bad, workers=2, processes=True, max_jobs=3) == 3
+        assert queue.stats()["processing"] == 0
+
+    def test_run_slow_handler(self, easy_redis):
+        """Test that jobs running past the visibility timeout aren't requeued."""
+        queue = easy_redis.app("test_app").work_queue("jobs", visibility_timeout=0.3)
+        calls = []
+
+        def slow(data):
+            calls.append(data)
+            time.sleep(1)
+
+        queue.enqueue_many(["a", "b"])
+        assert queue.run(slow, workers=2, max_jobs=2) == 2
+        assert sorted(calls) == ["a", "b"]
+        assert queue.stats() == {"pending": 0, "processing": 0, "failed": 0}
+
+    def test_run_stops(self, queue):
+        """Test that run returns when the stop event is set."""
+        stop = threading.Event()
+        threading.Timer(0.2, stop.set).start()
+        assert queue.run(str, stop=stop, poll_seconds=0.05) == 0